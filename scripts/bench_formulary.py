@@ -0,0 +1,99 @@
+"""
+Benchmark the drug formulary on a synthetic national-size formulary.
+
+Builds N drugs with random names and classes, then times index build and
+typeahead queries (prefix, prefix + class, prefix + in_formulary),
+checking results against a brute-force scan.
+
+Usage:
+    python scripts/bench_formulary.py [--drugs 300000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.formulary import Formulary, name_keys
+
+CLASSES = ['Biguanide', 'ACE Inhibitor', 'Statin', 'Antiplatelet', 'GLP-1 RA', 'SGLT2 Inhibitor',
+           'Beta Blocker', 'Calcium Channel Blocker', 'Diuretic', 'Antibiotic', 'Corticosteroid',
+           'Bronchodilator', 'Levothyroxine', 'Proton Pump Inhibitor', 'Anticoagulant']
+SYLLABLES = ['met', 'for', 'min', 'lis', 'ino', 'pril', 'ator', 'va', 'sta', 'tin', 'sema', 'glu',
+             'tide', 'empa', 'gli', 'flo', 'zin', 'amlo', 'di', 'pine', 'pro', 'lol', 'xa', 'ban']
+
+
+def make_drugs(n, rng):
+    drugs = []
+    for i in range(n):
+        brand = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        generic = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        drugs.append({
+            'id': f"d-{i:07d}",
+            'name': f"{brand} ({generic})" if rng.random() < 0.5 else brand,
+            'class': rng.choice(CLASSES),
+            'in_formulary': rng.random() < 0.7,
+            'details': '',
+        })
+    return drugs
+
+
+def brute_force(drugs, prefix, drug_class, in_formulary, limit):
+    matches = []
+    for drug in drugs:
+        if drug_class and drug['class'].lower() != drug_class.lower():
+            continue
+        if in_formulary is not None and drug['in_formulary'] != in_formulary:
+            continue
+        if any(key.startswith(prefix) for key in name_keys(drug['name'])):
+            matches.append((drug['name'].strip().lower(), drug['id']))
+    return [drug_id for _, drug_id in sorted(matches)[:limit]]
+
+
+def timed(label, fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30}: {elapsed / len(queries) * 1000:7.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--drugs', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    drugs = make_drugs(args.drugs, rng)
+
+    start = time.perf_counter()
+    formulary = Formulary(drugs)
+    print(f"index build ({args.drugs:,} drugs): {time.perf_counter() - start:.2f}s\n")
+
+    prefixes = [rng.choice(SYLLABLES)[:rng.randint(1, 3)] + rng.choice(string.ascii_lowercase[:5])
+                for _ in range(args.queries)]
+    classes = [rng.choice(CLASSES) for _ in range(args.queries)]
+
+    timed("prefix", lambda i: formulary.search(prefix=prefixes[i]), range(args.queries))
+    timed("prefix + class", lambda i: formulary.search(prefix=prefixes[i], drug_class=classes[i]),
+          range(args.queries))
+    timed("prefix + class + in_formulary",
+          lambda i: formulary.search(prefix=prefixes[i], drug_class=classes[i], in_formulary=True),
+          range(args.queries))
+
+    # Correctness: results must match a brute-force scan (same name order)
+    mismatches = 0
+    for i in range(20):
+        for drug_class, in_formulary in ((None, None), (classes[i], None), (classes[i], False)):
+            got = [d['id'] for d in formulary.search(prefixes[i], drug_class, in_formulary)]
+            mismatches += got != brute_force(drugs, prefixes[i], drug_class, in_formulary, 10)
+    print(f"\nsearch vs brute force: {mismatches} mismatches in 60 queries")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the patient journal: cost per write and restart time.
+
+Writes N synthetic records through PatientStore + PatientJournal into a
+temporary directory, snapshots, appends a log tail, then times recovery.
+
+Usage:
+    python scripts/bench_journal.py [--patients 1000000] [--tail 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.persistence import PatientJournal
+from api.records import PatientRecord
+from api.store import PatientStore
+
+
+def make_record(i):
+    report = {
+        'detection_mode': 'auto',
+        'detected_diseases': [{
+            'disease_type': 'diabetes', 'disease_name': 'Diabetes',
+            'confidence_score': 40.0, 'ml_model_score': None, 'symptom_score': 15,
+            'final_risk_score': 30.0, 'matched_symptoms': ['tired', 'thirsty', 'blurred'],
+            'symptom_count': 3, 'model_used': False, 'risk_category': 'LOW'
+        }]
+    }
+    return PatientRecord(
+        patient_id=f"P{1001 + i}",
+        patient_info={'name': f"Patient {i}", 'age': 40, 'gender': 'Female', 'phone': ''},
+        symptoms='tired, thirsty and blurred vision',
+        health_data={'Glucose': 120, 'BMI': 27.5, 'Age': 40},
+        primary_diagnosis='Diabetes',
+        overall_risk=0.3,
+        report=report
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--tail', type=int, default=50000, help="writes left in the log after the snapshot")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PatientStore(PatientJournal(directory, snapshot_every=float('inf')))
+        store.open()
+
+        records = [make_record(i) for i in range(args.patients + args.tail)]
+
+        start = time.perf_counter()
+        for record in records[:args.patients]:
+            store.add(record)
+        elapsed = time.perf_counter() - start
+        print(f"writes   : {args.patients:,} in {elapsed:.2f}s "
+              f"({elapsed / args.patients * 1e6:.1f} µs/write)")
+
+        start = time.perf_counter()
+        store.journal.snapshot()
+        print(f"snapshot : {time.perf_counter() - start:.2f}s")
+
+        for record in records[args.patients:]:
+            store.add(record)
+        store.close()
+
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"on disk  : {size / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        restored = PatientStore(PatientJournal(directory))
+        high_water = restored.open()
+        elapsed = time.perf_counter() - start
+        restored.close()
+        print(f"restart  : {len(restored):,} records in {elapsed:.2f}s (next ID after P{high_water})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the provider directory on a synthetic regional directory.
+
+Builds N providers scattered around Kolkata, then times index build and
+text / specialty / nearest-N queries, checking nearest-N against a
+brute-force scan.
+
+Usage:
+    python scripts/bench_providers.py [--providers 50000] [--queries 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.providers import DISEASE_SPECIALTIES, ProviderDirectory, haversine_km
+
+CENTER = (22.5726, 88.3639)
+SPECIALTIES = sorted(set(DISEASE_SPECIALTIES.values())) + ['General Physician', 'Urologist']
+CLINICS = ['Apollo Clinic', 'Fortis Hospital', 'Medica Superspecialty', 'CMRI', 'Manipal Hospital',
+           'AMRI Hospital', 'Ruby General', 'Peerless Hospital', 'Woodlands', 'Belle Vue Clinic']
+SURNAMES = ['Das', 'Sen', 'Roy', 'Ghosh', 'Bose', 'Basu', 'Mitra', 'Deb', 'Dutta', 'Chatterjee',
+            'Banerjee', 'Mukherjee', 'Saha', 'Paul', 'Kar', 'Nandi']
+
+
+def make_providers(n, rng):
+    providers = []
+    for i in range(n):
+        providers.append({
+            'id': f"pr-{i:06d}",
+            'kind': 'specialist',
+            'specialty': rng.choice(SPECIALTIES),
+            'name': f"Dr. {rng.choice('ABCDEGKPRS')}. {rng.choice(SURNAMES)}",
+            'clinic': f"{rng.choice(CLINICS)}, Branch {rng.randint(1, 200)}",
+            'phone': '+91 98300 XXXXX',
+            'lat': CENTER[0] + rng.gauss(0, 0.4),
+            'lon': CENTER[1] + rng.gauss(0, 0.4),
+        })
+    return providers
+
+
+def timed(label, fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}: {elapsed / len(queries) * 1000:7.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--providers', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    providers = make_providers(args.providers, rng)
+
+    start = time.perf_counter()
+    directory = ProviderDirectory(providers)
+    print(f"index build ({args.providers:,} providers): {time.perf_counter() - start:.2f}s\n")
+
+    points = [(CENTER[0] + rng.gauss(0, 0.3), CENTER[1] + rng.gauss(0, 0.3)) for _ in range(args.queries)]
+    diseases = [rng.choice(list(DISEASE_SPECIALTIES)) for _ in range(args.queries)]
+
+    timed("text prefix ('das apo')", lambda _: directory.search(query='das apo'), points)
+    timed("nearest 10 (any)", lambda p: directory.search(lat=p[0], lon=p[1]), points)
+    timed("nearest 10 for disease_type",
+          lambda i: directory.search(specialty=DISEASE_SPECIALTIES[diseases[i]],
+                                     lat=points[i][0], lon=points[i][1]),
+          range(args.queries))
+    far = [(-lat, lon - 180) for lat, lon in points[:100]]
+    timed("nearest 10, far from data", lambda p: directory.search(lat=p[0], lon=p[1]), far)
+
+    # Correctness: nearest-N must match a brute-force scan, near and far
+    mismatches = 0
+    for lat, lon in points[:40] + far[:10]:
+        got = [p['id'] for p in directory.search(specialty='Cardiologist', lat=lat, lon=lon)]
+        expected = sorted(
+            (p for p in providers if p['specialty'] == 'Cardiologist'),
+            key=lambda p: haversine_km(lat, lon, p['lat'], p['lon']))[:10]
+        mismatches += got != [p['id'] for p in expected]
+    print(f"\nnearest-N vs brute force: {mismatches} mismatches in 50 queries")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
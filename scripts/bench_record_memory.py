@@ -0,0 +1,118 @@
+"""
+Measure bytes held per stored patient: legacy dict record vs PatientRecord.
+
+Synthetic requests are scored once with make_prediction; each measured run
+then parses the request and report from JSON so every record holds fresh
+objects, as it would in a live server.
+
+Usage:
+    python scripts/bench_record_memory.py [--patients 20000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ml.predict import make_prediction
+from api.records import PatientRecord
+
+SYMPTOMS = [
+    'fatigue', 'thirsty', 'blurred vision', 'chest pain', 'dizzy', 'cough',
+    'wheezing', 'nausea', 'swelling', 'jaundice', 'back pain', 'fever'
+]
+
+
+def make_requests(n, seed=42):
+    """Returns: list of (request_json, report_json) pairs"""
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(n):
+        data = {
+            'patient_info': {'name': f"Patient {i}", 'age': rng.randint(18, 90),
+                             'gender': rng.choice(['Male', 'Female']), 'phone': ''},
+            'symptoms': 'I have ' + ', '.join(rng.sample(SYMPTOMS, 4)),
+            'health_data': {'Glucose': rng.randint(70, 200), 'BMI': 27.5, 'Age': 40}
+        }
+        result = make_prediction('auto', data['health_data'], data['symptoms'])
+        pairs.append((json.dumps(data), json.dumps(result, default=float)))
+    return pairs
+
+
+def legacy_record(patient_id, data, result):
+    """The dict built by predict() before PatientRecord existed."""
+    patient_info = data['patient_info']
+    detected = result['detected_diseases']
+    overall_risk = max(d['final_risk_score'] for d in detected) / 100
+    record = {
+        'patient_id': patient_id,
+        'name': patient_info.get('name', 'Anonymous'),
+        'age': patient_info.get('age', 'N/A'),
+        'gender': patient_info.get('gender', 'N/A'),
+        'phone': patient_info.get('phone', ''),
+        'symptoms': data['symptoms'],
+        'health_data': data['health_data'],
+        'primary_diagnosis': max(detected, key=lambda d: d['final_risk_score'])['disease_name'],
+        'overall_risk': round(overall_risk, 2),
+        'detected_diseases': result.get('detected_diseases', [result]),
+        'timestamp': datetime.now().isoformat(),
+        'last_seen': datetime.now().strftime('%Y-%m-%d'),
+        'full_report': result
+    }
+    result['patient_info'] = patient_info
+    result['patient_id'] = patient_id
+    result['symptoms'] = data['symptoms']
+    result['health_data'] = data['health_data']
+    return record
+
+
+def compact_record(patient_id, data, result):
+    detected = result['detected_diseases']
+    return PatientRecord(
+        patient_id=patient_id,
+        patient_info=data['patient_info'],
+        symptoms=data['symptoms'],
+        health_data=data['health_data'],
+        primary_diagnosis=max(detected, key=lambda d: d['final_risk_score'])['disease_name'],
+        overall_risk=round(max(d['final_risk_score'] for d in detected) / 100, 2),
+        report=result
+    )
+
+
+def measure(build, requests):
+    """Bytes still allocated after storing one record per request."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = []
+    for i, (body, report) in enumerate(requests):
+        store.append(build(f"P{1001 + i}", json.loads(body), json.loads(report)))
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20000)
+    args = parser.parse_args()
+
+    requests = make_requests(args.patients)
+    legacy_bytes, legacy_store = measure(legacy_record, requests)
+    del legacy_store
+    compact_bytes, compact_store = measure(compact_record, requests)
+
+    print(f"\n--- Memory per stored patient ({args.patients} records) ---")
+    print(f"dict record   : {legacy_bytes / args.patients:8.0f} bytes/patient")
+    print(f"PatientRecord : {compact_bytes / args.patients:8.0f} bytes/patient "
+          f"({100 * (1 - compact_bytes / legacy_bytes):.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark response serialization for large list and batch payloads.
+
+Compares the stdlib encoder (what Flask's jsonify uses) against
+api.serialization, and reports bytes on the wire for each encoding.
+
+Usage:
+    python scripts/bench_serialization.py [--patients 5000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api import serialization
+
+DISEASES = ['diabetes', 'cardio', 'respiratory', 'cancer', 'thyroid', 'kidney', 'liver']
+SYMPTOMS = ['fatigue', 'thirsty', 'blurred', 'chest pain', 'dizzy', 'cough', 'wheezing', 'nausea']
+
+
+def make_patient(i, rng):
+    """Build a synthetic record shaped like the one stored by /predict."""
+    detected = []
+    for disease in rng.sample(DISEASES, 3):
+        score = round(rng.uniform(5, 95), 1)
+        detected.append({
+            'disease_type': disease,
+            'disease_name': disease.title(),
+            'confidence_score': round(rng.uniform(10, 90), 1),
+            'ml_model_score': None,
+            'symptom_score': rng.choice([5, 10, 15, 20]),
+            'final_risk_score': score,
+            'matched_symptoms': rng.sample(SYMPTOMS, 3),
+            'symptom_count': 3,
+            'model_used': False,
+            'risk_category': 'HIGH' if score > 70 else 'MODERATE' if score > 40 else 'LOW'
+        })
+    report = {'detection_mode': 'auto', 'detected_diseases': detected}
+    ts = datetime(2025, 1, 1) + timedelta(minutes=i)
+    return {
+        'patient_id': f"P{1001 + i}",
+        'name': f"Patient {i}",
+        'age': rng.randint(18, 90),
+        'gender': rng.choice(['Male', 'Female']),
+        'phone': '',
+        'symptoms': ' and '.join(rng.sample(SYMPTOMS, 4)),
+        'health_data': {'Glucose': rng.randint(70, 200), 'BMI': round(rng.uniform(18, 40), 1), 'Age': 40},
+        'primary_diagnosis': detected[0]['disease_name'],
+        'overall_risk': round(detected[0]['final_risk_score'] / 100, 2),
+        'detected_diseases': detected,
+        'timestamp': ts.isoformat(),
+        'last_seen': ts.strftime('%Y-%m-%d'),
+        'full_report': report
+    }
+
+
+def jsonify_like(payload):
+    """Mirror the default Flask JSON provider (sorted keys, ASCII-escaped, compact)."""
+    return json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(",", ":")).encode("utf-8")
+
+
+def jsonify_like_order(body):
+    """Re-encode a body as jsonify_like() would, keeping its key order."""
+    return json.dumps(json.loads(body), ensure_ascii=True, separators=(",", ":")).encode("utf-8")
+
+
+def time_it(fn, payload, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = [make_patient(i, rng) for i in range(args.patients)]
+    payloads = {
+        'detail list (full records)': records,
+        'batch response': {'count': len(records), 'results': [r['full_report'] for r in records]},
+    }
+
+    print(f"orjson: {'yes' if serialization.orjson else 'no'} | "
+          f"msgpack: {'yes' if serialization.msgpack else 'no'} | "
+          f"brotli: {'yes' if serialization.brotli else 'no'}")
+
+    for label, payload in payloads.items():
+        print(f"\n--- {label}: {args.patients} items ---")
+        base_t, base_body = time_it(jsonify_like, payload, args.repeat)
+        fast_t, fast_body = time_it(serialization.dumps_response, payload, args.repeat)
+        # Same keys in the same order: only escaping and float formatting may differ
+        same = jsonify_like_order(fast_body) == base_body
+        print(f"jsonify-equivalent : {base_t * 1000:8.1f} ms  {len(base_body):>10,} bytes")
+        print(f"dumps_response     : {fast_t * 1000:8.1f} ms  {len(fast_body):>10,} bytes  "
+              f"({base_t / fast_t:.1f}x faster, {'same' if same else 'DIFFERENT'} document)")
+
+        if serialization.msgpack is not None:
+            mp_t, mp_body = time_it(
+                lambda p: serialization.msgpack.packb(p, use_bin_type=True), payload, args.repeat)
+            print(f"msgpack            : {mp_t * 1000:8.1f} ms  {len(mp_body):>10,} bytes")
+
+        gz_t, gz_body = time_it(lambda b: gzip.compress(b, serialization.GZIP_LEVEL), fast_body, args.repeat)
+        print(f"+ gzip             : {gz_t * 1000:8.1f} ms  {len(gz_body):>10,} bytes  "
+              f"({len(base_body) / len(gz_body):.1f}x smaller)")
+        if serialization.brotli is not None:
+            br_t, br_body = time_it(
+                lambda b: serialization.brotli.compress(b, quality=serialization.BROTLI_QUALITY),
+                fast_body, args.repeat)
+            print(f"+ brotli           : {br_t * 1000:8.1f} ms  {len(br_body):>10,} bytes  "
+                  f"({len(base_body) / len(br_body):.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
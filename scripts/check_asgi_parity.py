@@ -0,0 +1,64 @@
+"""
+Check that the ASGI app (api/asgi.py) and the Flask app (api/main.py)
+return byte-identical bodies for the same requests.
+
+Both apps run in-process against the same in-memory store; requires httpx.
+
+Usage:
+    PATIENT_DATA_DIR= python scripts/check_asgi_parity.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import httpx
+
+from api.main import app as flask_app
+from api.asgi import app as asgi_app
+
+PREDICT_BODY = json.dumps({
+    'patient_info': {'name': 'Parity Check', 'age': 50, 'gender': 'Female'},
+    'symptoms': 'tired, thirsty and some chest pain',
+    'health_data': {'Glucose': 150, 'BMI': 30, 'Age': 50}
+})
+
+
+async def main():
+    flask_client = flask_app.test_client()
+    transport = httpx.ASGITransport(app=asgi_app)
+    failures = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://asgi') as asgi_client:
+        async def compare(method, path, body=None, headers=None, normalize=None):
+            nonlocal failures
+            headers = dict(headers or {}, **({'Content-Type': 'application/json'} if body else {}))
+            flask_response = flask_client.open(path, method=method, data=body, headers=headers)
+            asgi_response = await asgi_client.request(method, path, content=body, headers=headers)
+            flask_body, asgi_body = flask_response.data, asgi_response.content
+            if normalize:
+                flask_body, asgi_body = normalize(flask_body), normalize(asgi_body)
+            same = flask_response.status_code == asgi_response.status_code and flask_body == asgi_body
+            failures += not same
+            print(f"{'OK  ' if same else 'DIFF'} {method:6} {path}")
+            return json.loads(flask_response.data) if not headers.get('Accept-Encoding') else None
+
+        # The two predictions get different patient IDs; compare everything else
+        first = await compare('POST', '/predict', PREDICT_BODY,
+                              normalize=lambda b: json.loads(b) | {'patient_id': None})
+        patient_id = first['patient_id']
+        for path in ['/api/patients', f'/api/patients/{patient_id}', '/api/patients/P0',
+                     '/api/stats', '/health', '/diseases']:
+            await compare('GET', path)
+        await compare('GET', '/api/patients', headers={'Accept-Encoding': 'gzip'})
+        await compare('POST', '/predict', '{"symptoms": ""}')
+        await compare('POST', '/predict/batch', '[]')
+
+    print("\nFAILED" if failures else "\nOK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Compile the pickled models in models/ into array-backed .npz models.
+
+For every disease with a model + scaler pair, flattens the ensemble with
+the scaler folded in (ml.tree_ensemble), checks that it reproduces
+predict_proba on synthetic rows around the training distribution, and
+writes <disease>_model.npz next to the pickles (atomically, so a running
+API hot-reloads it). Also reports latency per batch size, and cold-load
+time and peak RSS of a fresh process loading each form.
+
+Usage:
+    python scripts/compile_models.py [--model-dir models/] [--rows 20000] [--tolerance 1e-6] [--check-only]
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ml.registry import ARTIFACTS, compiled_name, read_pickled
+from ml.tree_ensemble import compile_model
+
+BATCH_SIZES = (1, 8, 64, 256)
+
+
+def synthetic_rows(scaler, count, rng):
+    """Rows around the training mean (±3 std); half rounded to one decimal like form input."""
+    import numpy as np
+
+    rows = rng.standard_normal((count, len(scaler.mean_))) * scaler.scale_ + scaler.mean_
+    rows[::2] = rows[::2].round(1)
+    rows[1::4] = rows[1::4].round()
+    return np.clip(rows, 0, None)
+
+
+def best_ms(fn, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+LOAD_PICKLE = "import joblib; joblib.load({model!r}); joblib.load({scaler!r})"
+LOAD_COMPILED = "from ml.tree_ensemble import TreeEnsemble; TreeEnsemble.load({compiled!r})"
+# VmHWM (Linux) rather than ru_maxrss, which a child inherits from the parent's peak
+PROBE = """
+import re, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+{statement}
+elapsed = (time.perf_counter() - start) * 1000
+print(elapsed, re.search(r'VmHWM:\\s+(\\d+)', open('/proc/self/status').read()).group(1))
+"""
+
+
+def cold_load(statement):
+    """Run `statement` in a fresh interpreter. Returns: (ms including imports, peak RSS in MB)"""
+    env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), '..', 'src'))
+    result = subprocess.run([sys.executable, '-c', PROBE.format(statement=statement)],
+                            capture_output=True, text=True, check=True, env=env)
+    ms, rss_kb = result.stdout.split()
+    return float(ms), int(rss_kb) / 1024
+
+
+def main():
+    import joblib
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', default='models/')
+    parser.add_argument('--rows', type=int, default=20000, help="synthetic rows for the parity check")
+    parser.add_argument('--tolerance', type=float, default=1e-6, help="max |P| difference accepted")
+    parser.add_argument('--rounds', type=int, default=20, help="timing rounds per batch size")
+    parser.add_argument('--check-only', action='store_true', help="do not write .npz files")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=UserWarning)  # feature-name warnings from the scaler
+    rng = np.random.default_rng(7)
+
+    failures = 0
+    for disease_type in ARTIFACTS:
+        try:
+            blobs, version = read_pickled(args.model_dir, disease_type)
+        except FileNotFoundError:
+            continue
+        model = joblib.load(io.BytesIO(blobs[0]))
+        scaler = joblib.load(io.BytesIO(blobs[1]))
+        try:
+            compiled = compile_model(model, scaler, source_version=version)
+        except TypeError as e:
+            print(f"\n⚠️ {disease_type}: {e}")
+            failures += 1
+            continue
+
+        rows = synthetic_rows(scaler, args.rows, rng)
+        diff = float(np.abs(model.predict_proba(scaler.transform(rows)) - compiled.predict_proba(rows)).max())
+        ok = diff <= args.tolerance
+        path = os.path.join(args.model_dir, compiled_name(disease_type))
+        with open(path + '.tmp', 'wb') as f:
+            compiled.save(f)
+        model_path, scaler_path = (os.path.join(args.model_dir, name) for name in ARTIFACTS[disease_type][:2])
+        pickle_ms, pickle_mb = cold_load(LOAD_PICKLE.format(model=model_path, scaler=scaler_path))
+        compiled_ms, compiled_mb = cold_load(LOAD_COMPILED.format(compiled=path + '.tmp'))
+
+        print(f"\n{'✅' if ok else '❌'} {version}: {type(model).__name__}, {compiled.n_trees} trees, "
+              f"{len(compiled.feature):,} nodes, depth {compiled.depth}")
+        print(f"   max |Δp| over {args.rows:,} rows: {diff:.2e} (tolerance {args.tolerance:g})")
+        print(f"   file:      {(len(blobs[0]) + len(blobs[1])) / 1024:,.0f} KB pickles -> "
+              f"{os.path.getsize(path + '.tmp') / 1024:,.0f} KB npz ({compiled.nbytes / 1024:,.0f} KB in memory)")
+        print(f"   cold load: {pickle_ms:,.0f} ms / {pickle_mb:,.0f} MB peak RSS -> "
+              f"{compiled_ms:,.0f} ms / {compiled_mb:,.0f} MB peak RSS")
+        print(f"   {'batch':>7} {'predict_proba ms':>18} {'compiled ms':>12} {'speedup':>8}")
+        for size in BATCH_SIZES:
+            batch = rows[:size]
+            before = best_ms(lambda: model.predict_proba(scaler.transform(batch)), args.rounds)
+            after = best_ms(lambda: compiled.predict_proba(batch), args.rounds)
+            print(f"   {size:>7} {before:>18.3f} {after:>12.3f} {before / after:>7.1f}x")
+
+        if ok and not args.check_only:
+            os.replace(path + '.tmp', path)
+            print(f"   wrote {path}")
+        else:
+            os.remove(path + '.tmp')
+            failures += not ok
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Bulk-import historical patient records into the patient store.
+
+Streams a JSON array (e.g. src/api/mock_db.json) or a JSONL file and
+inserts the records in batches into PATIENT_DATA_DIR, then prints
+throughput. Stop the API first (it owns the journal), or POST the file to
+/api/patients/import instead.
+
+Usage:
+    python scripts/import_patients.py records.jsonl [--replace]
+    python scripts/import_patients.py --generate 100000 > records.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+DIAGNOSES = ['Diabetes Mellitus', 'Cardiovascular Disease', 'Respiratory Disorders',
+             'Thyroid Disorders', 'Kidney Disease', 'Liver Disease', 'No diagnosis']
+
+
+def generate(count, rng):
+    """Write `count` synthetic records in the mock_db.json shape as JSONL to stdout."""
+    for i in range(count):
+        day = rng.randint(1, 28)
+        record = {
+            'patient_id': f"H-{i:07d}",
+            'name': f"Imported Patient {i}",
+            'age': rng.randint(18, 90),
+            'gender': rng.choice(['Male', 'Female']),
+            'primary_diagnosis': rng.choice(DIAGNOSES),
+            'overall_risk': round(rng.random(), 2),
+            'last_seen': f"2025-10-{day:02d}",
+            'vitals': {
+                'timestamps': [f"2025-{month:02d}-{day:02d}" for month in (8, 9, 10)],
+                'blood_pressure_systolic': [rng.randint(100, 170) for _ in range(3)],
+                'glucose': [rng.randint(70, 220) for _ in range(3)],
+                'bmi': [round(rng.uniform(18, 40), 1) for _ in range(3)],
+            }
+        }
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', nargs='?', help="JSON array or JSONL file ('-' for stdin)")
+    parser.add_argument('--replace', action='store_true', help="overwrite existing patient IDs")
+    parser.add_argument('--generate', type=int, metavar='N', help="print N synthetic JSONL records and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.generate, random.Random(3))
+        return
+    if not args.path:
+        parser.error("path is required")
+
+    os.environ.setdefault('MODEL_WARMUP', '0')  # No inference here
+    from api.endpoints import PATIENT_DATA_DIR, PATIENTS_DB, import_patients, open_storage
+
+    open_storage()
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+    with stream:
+        report = import_patients(stream, replace=args.replace)
+    PATIENTS_DB.close()
+
+    print(f"\nImported {report['imported']:,} records into {PATIENT_DATA_DIR or 'memory'} "
+          f"({report['merged']:,} merged into returning patients, {report['skipped']:,} skipped, "
+          f"{report['failed']:,} failed) "
+          f"in {report['seconds']:.2f}s: {report['records_per_second']:,} records/s")
+    for error in report['errors']:
+        print(f"   ⚠️ record {error['index']}: {error['error']}")
+    sys.exit(1 if report['failed'] and not report['imported'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""
+End-to-end load test for the API.
+
+Starts the API locally (Flask or ASGI) against a fresh, throwaway patient
+data directory, drives it with a weighted mix of realistic requests and
+writes a JSON report with throughput, p50/p99 latency, error rate per
+endpoint and the server's RSS over time.
+
+Traffic mix (weights, see --mix):
+    predict_auto       POST /predict, disease_type auto, synthetic symptoms
+    predict_specific   POST /predict for one disease model
+    patients           GET  /api/patients
+    stats              GET  /api/stats
+    detail             GET  /api/patients/<id> of a patient created earlier
+
+With --rate the load is open-loop: requests are scheduled at a fixed rate
+and latency is measured from the scheduled start, so a stalled server
+shows up as latency instead of silently lowering the offered load.
+Without --rate every worker sends back-to-back (closed loop, finds the
+throughput ceiling).
+
+Usage:
+    python scripts/load_test.py --server flask --concurrency 16 --duration 60
+    python scripts/load_test.py --server asgi --rate 50 --output results.json
+    python scripts/load_test.py --url http://127.0.0.1:5000 --pid 1234
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_MIX = "predict_auto=30,predict_specific=10,patients=5,stats=20,detail=35"
+DISEASES = ['diabetes', 'cardio', 'respiratory', 'cancer', 'thyroid', 'kidney', 'liver']
+SYMPTOM_PHRASES = [
+    'always tired', 'very thirsty', 'frequent urination', 'blurred vision', 'slow-healing cuts',
+    'chest pain', 'shortness of breath', 'dizziness', 'palpitations', 'swollen ankles',
+    'persistent cough', 'wheezing', 'unexplained weight loss', 'night sweats', 'lump in neck',
+    'feeling cold', 'hair loss', 'foamy urine', 'back pain', 'yellow skin',
+    'dark urine', 'abdominal swelling', 'nausea'
+]
+# Vague symptoms no keyword matches (mixed in, never alone, so auto mode still detects something)
+VAGUE_PHRASES = ['headache', 'mild fever', 'joint pain', 'puffy face', 'feeling off']
+FIRST_NAMES = ['Asha', 'Ravi', 'Priya', 'Arjun', 'Meera', 'Kabir', 'Sara', 'John', 'Maria', 'Wei']
+
+
+# --- Synthetic traffic ---
+
+def synthetic_prediction(rng, disease_type):
+    age = rng.randint(20, 85)
+    height, weight = rng.randint(150, 190), rng.randint(45, 110)
+    systolic, glucose = rng.randint(95, 180), rng.randint(70, 240)
+    return {
+        'patient_info': {
+            'name': f"{rng.choice(FIRST_NAMES)} Load{rng.randint(1, 99999)}",
+            'age': age,
+            'gender': rng.choice(['Male', 'Female']),
+            'phone': f"+91 9{rng.randint(100000000, 999999999)}"
+        },
+        'symptoms': ', '.join(rng.sample(SYMPTOM_PHRASES, rng.randint(1, 4))
+                              + rng.sample(VAGUE_PHRASES, rng.randint(0, 1))),
+        'disease_type': disease_type,
+        'health_data': {
+            'Pregnancies': rng.randint(0, 4), 'Glucose': glucose, 'BloodPressure': systolic,
+            'SkinThickness': 20, 'Insulin': 80, 'BMI': round(weight / (height / 100) ** 2, 1),
+            'DiabetesPedigreeFunction': 0.5, 'Age': age,
+            'age': age, 'gender': rng.choice([1, 2]), 'height': height, 'weight': weight,
+            'ap_hi': systolic, 'ap_lo': systolic - rng.randint(30, 50), 'cholesterol': rng.randint(1, 3),
+            'gluc': 1 if glucose < 100 else 2 if glucose < 126 else 3,
+            'smoke': rng.randint(0, 1), 'alco': rng.randint(0, 1), 'active': rng.randint(0, 1)
+        }
+    }
+
+
+class Traffic:
+    """Builds the next request of the weighted mix."""
+
+    def __init__(self, mix, seed):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.rng = random.Random(seed)
+        self.patient_ids = []  # Filled from /predict responses, shared by workers
+        self.lock = threading.Lock()
+
+    def next_request(self):
+        """Returns: (kind, method, path, json_body)"""
+        with self.lock:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            if kind == 'detail' and not self.patient_ids:
+                kind = 'predict_auto'
+            if kind == 'predict_auto':
+                return kind, 'POST', '/predict', synthetic_prediction(self.rng, 'auto')
+            if kind == 'predict_specific':
+                return kind, 'POST', '/predict', synthetic_prediction(self.rng, self.rng.choice(DISEASES))
+            if kind == 'patients':
+                return kind, 'GET', '/api/patients', None
+            if kind == 'stats':
+                return kind, 'GET', '/api/stats', None
+            return kind, 'GET', f"/api/patients/{self.rng.choice(self.patient_ids)}", None
+
+    def remember(self, patient_id):
+        with self.lock:
+            self.patient_ids.append(patient_id)
+
+
+# --- Server process ---
+
+def start_server(kind, port, data_dir):
+    env = dict(os.environ, PATIENT_DATA_DIR=data_dir, PYTHONUNBUFFERED='1')
+    if kind == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'api.asgi:app', '--app-dir', 'src',
+                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    else:
+        # Same app as `python src/api/main.py`, without the debug reloader
+        command = [sys.executable, '-c',
+                   "import sys; sys.path.insert(0, 'src'); from api.main import app; "
+                   f"app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"]
+    log = open(os.path.join(data_dir, 'server.log'), 'wb')
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base_url, process, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} during startup")
+        try:
+            # /ready turns 200 once the models are loaded and warm
+            if requests.get(f"{base_url}/ready", timeout=2).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API not ready after {timeout}s")
+
+
+def rss_mb(pid):
+    """Resident set size of a process in MB (psutil if available, else /proc)."""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 1e6
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        return None
+    return None
+
+
+# --- Measurement ---
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, seconds):
+    """samples: list of (kind, latency_s, ok)"""
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2) if seconds > 0 else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []    # (kind, latency_s, ok, finished_at)
+        self.errors = {}     # Sample error messages by kind
+        self.lock = threading.Lock()
+
+    def record(self, kind, latency, ok, error=None):
+        with self.lock:
+            self.samples.append((kind, latency, ok, time.time()))
+            if error and len(self.errors.setdefault(kind, [])) < 5:
+                self.errors[kind].append(error)
+
+
+def worker(base_url, traffic, recorder, schedule, stop_at, timeout):
+    session = requests.Session()
+    while True:
+        scheduled = schedule() if schedule else time.perf_counter()
+        if scheduled is None or time.time() >= stop_at:
+            return
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        kind, method, path, body = traffic.next_request()
+        error = None
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=timeout)
+            ok = response.status_code < 400
+            if not ok:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+            elif method == 'POST':
+                traffic.remember(response.json()['patient_id'])
+        except requests.exceptions.RequestException as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        recorder.record(kind, time.perf_counter() - scheduled, ok, error)
+
+
+def make_schedule(rate, start, stop_at):
+    """Open-loop schedule: the n-th request is due at start + n / rate."""
+    lock = threading.Lock()
+    counter = [0]
+
+    def next_slot():
+        with lock:
+            slot = start + counter[0] / rate
+            counter[0] += 1
+        return slot if time.time() + max(0.0, slot - time.perf_counter()) < stop_at else None
+    return next_slot
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in ('predict_auto', 'predict_specific', 'patients', 'stats', 'detail'):
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask', help="API to start")
+    parser.add_argument('--url', help="test an already running API instead of starting one")
+    parser.add_argument('--pid', type=int, help="server PID to sample RSS from (with --url)")
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent client workers")
+    parser.add_argument('--rate', type=float, help="offered requests/s (open loop); default: as fast as possible")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of measured load")
+    parser.add_argument('--warmup', type=float, default=5, help="seconds of unmeasured load first")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds per time-series point")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=f"load-test-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    args = parser.parse_args()
+
+    process, data_dir = None, None
+    base_url, server_pid = args.url, args.pid
+    if not base_url:
+        data_dir = tempfile.mkdtemp(prefix='load-test-')
+        process = start_server(args.server, args.port, data_dir)
+        base_url, server_pid = f"http://127.0.0.1:{args.port}", process.pid
+    base_url = base_url.rstrip('/')
+
+    try:
+        print(f"⏳ Waiting for API at {base_url} ...")
+        wait_ready(base_url, process)
+        traffic = Traffic(args.mix, args.seed)
+
+        if args.warmup > 0:
+            print(f"🔥 Warm-up for {args.warmup:.0f}s")
+            warm = Recorder()
+            stop_at = time.time() + args.warmup
+            threads = [threading.Thread(target=worker, args=(base_url, traffic, warm, None, stop_at, args.timeout))
+                       for _ in range(args.concurrency)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        mode = f"{args.rate:g} req/s offered" if args.rate else "closed loop"
+        print(f"🚀 {args.concurrency} workers, {mode}, {args.duration:.0f}s")
+        recorder = Recorder()
+        started = time.time()
+        stop_at = started + args.duration
+        schedule = make_schedule(args.rate, time.perf_counter(), stop_at) if args.rate else None
+        threads = [threading.Thread(target=worker, args=(base_url, traffic, recorder, schedule, stop_at, args.timeout),
+                                    daemon=True)
+                   for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+
+        timeline = []
+        last_count = 0
+        while any(t.is_alive() for t in threads):
+            time.sleep(args.interval)
+            with recorder.lock:
+                window = [(k, l, ok) for k, l, ok, _ in recorder.samples[last_count:]]
+                last_count = len(recorder.samples)
+            rss = rss_mb(server_pid) if server_pid else None
+            point = dict(summarize(window, args.interval), t=round(time.time() - started, 1),
+                         rss_mb=round(rss, 1) if rss else None)
+            timeline.append(point)
+            print(f"   t={point['t']:6.1f}s  {point['throughput_rps'] or 0:8.1f} req/s  "
+                  f"p50={point['p50_ms']}ms  p99={point['p99_ms']}ms  "
+                  f"errors={point['error_rate']:.1%}  rss={point['rss_mb']}MB")
+        elapsed = time.time() - started
+
+        samples = [(k, l, ok) for k, l, ok, _ in recorder.samples]
+        report = {
+            'config': {
+                'server': 'external' if args.url else args.server, 'url': base_url,
+                'concurrency': args.concurrency, 'rate': args.rate, 'duration': args.duration,
+                'warmup': args.warmup, 'mix': args.mix, 'seed': args.seed,
+            },
+            'overall': summarize(samples, elapsed),
+            'by_kind': {kind: summarize([s for s in samples if s[0] == kind], elapsed)
+                        for kind in sorted({s[0] for s in samples})},
+            'error_samples': recorder.errors,
+            'timeline': timeline,
+        }
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    overall = report['overall']
+    print(f"\n📊 {overall['requests']:,} requests, {overall['throughput_rps']} req/s, "
+          f"p50={overall['p50_ms']}ms, p99={overall['p99_ms']}ms, errors={overall['error_rate']:.2%}")
+    for kind, stats in report['by_kind'].items():
+        print(f"   {kind:<17} {stats['requests']:>7,}  p50={stats['p50_ms']}ms  p99={stats['p99_ms']}ms  "
+              f"errors={stats['error_rate']:.2%}")
+    print(f"✅ Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
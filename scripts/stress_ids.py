@@ -0,0 +1,110 @@
+"""
+Stress test for patient ID allocation and concurrent store writes.
+
+N threads allocate IDs and add records to one PatientStore (journaled to
+a temp dir) for 1, 2, 4, ... threads; reports throughput and fails on any
+duplicate ID or lost record. A restarted store must then continue above
+every ID written.
+
+Usage:
+    python scripts/stress_ids.py [--ops 20000] [--max-threads 16]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.ids import IdAllocator
+from api.persistence import PatientJournal
+from api.records import PatientRecord
+from api.store import PatientStore
+
+
+def make_record(patient_id):
+    return PatientRecord(
+        patient_id=patient_id,
+        patient_info={'name': 'Stress Test', 'age': 40, 'gender': 'Male', 'phone': ''},
+        symptoms='tired and thirsty',
+        health_data={'Glucose': 120},
+        primary_diagnosis='Diabetes',
+        overall_risk=0.3,
+        report={'detection_mode': 'auto', 'detected_diseases': []}
+    )
+
+
+def run_threads(threads, ops_per_thread, directory):
+    store = PatientStore(PatientJournal(directory))
+    allocator = IdAllocator(floor=max(1000, store.open()))
+    ids = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(slot):
+        barrier.wait()
+        for _ in range(ops_per_thread):
+            patient_id = allocator.allocate()
+            store.add(make_record(patient_id))
+            ids[slot].append(patient_id)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    all_ids = [patient_id for chunk in ids for patient_id in chunk]
+    duplicates = len(all_ids) - len(set(all_ids))
+    lost = len(all_ids) - len(store)
+    return len(all_ids) / elapsed, duplicates, lost
+
+
+def run_restart(count, directory):
+    """Returns: True if a reopened store allocates above every ID written before."""
+    store = PatientStore(PatientJournal(directory))
+    allocator = IdAllocator(floor=max(1000, store.open()))
+    written = [allocator.allocate() for _ in range(count)]
+    for patient_id in written:
+        store.add(make_record(patient_id))
+    store.delete(written[-1])  # A deleted ID must not come back either
+    store.close()
+
+    store = PatientStore(PatientJournal(directory))
+    allocator = IdAllocator(floor=max(1000, store.open()))
+    store.close()
+    return allocator.allocate_number() > max(int(patient_id[1:]) for patient_id in written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ops', type=int, default=20000, help="writes per run, split across threads")
+    parser.add_argument('--max-threads', type=int, default=16)
+    args = parser.parse_args()
+
+    failed = False
+    print("--- Threads: allocate + store.add (journaled) ---")
+    threads = 1
+    while threads <= args.max_threads:
+        with tempfile.TemporaryDirectory() as directory:
+            rate, duplicates, lost = run_threads(threads, args.ops // threads, directory)
+        print(f"{threads:>3} threads: {rate:>10,.0f} writes/s | duplicates: {duplicates} | lost: {lost}")
+        failed |= bool(duplicates or lost)
+        threads *= 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        continues = run_restart(1000, directory)
+    print(f"\n--- Restart: IDs continue above every ID written: {'yes' if continues else 'NO'} ---")
+    failed |= not continues
+
+    print("\nFAILED" if failed else "\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Admission control for the API.
+
+A Budget admits at most `limit` requests at a time; up to `queue_size`
+more wait in arrival order, each for at most its deadline. A request that
+finds the queue full, or whose deadline passes before a slot frees up, is
+rejected at once with Overloaded (503 + Retry-After) instead of queueing
+without bound behind a burst. A freed slot is handed straight to the
+oldest waiter, so newcomers cannot overtake the queue.
+
+Inference (/predict, /predict/batch) and cheap reads (/api/stats, patient
+lookups, ...) get separate budgets, so reads stay fast during an inference
+surge. Clients may shorten the deadline with an X-Request-Timeout header
+(seconds), e.g. to match their own timeout.
+    INFERENCE_CONCURRENCY   concurrent predictions (default: CPU count)
+    INFERENCE_QUEUE         waiting predictions (default 4 x concurrency)
+    INFERENCE_DEADLINE      seconds a prediction may wait for a slot (default 10)
+    READ_CONCURRENCY / READ_QUEUE / READ_DEADLINE   the same for reads (32 / 128 / 2)
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# --- Configuration ---
+INFERENCE_CONCURRENCY = int(os.environ.get('INFERENCE_CONCURRENCY', os.cpu_count() or 4))
+INFERENCE_QUEUE = int(os.environ.get('INFERENCE_QUEUE', 4 * INFERENCE_CONCURRENCY))
+INFERENCE_DEADLINE = float(os.environ.get('INFERENCE_DEADLINE', '10'))
+READ_CONCURRENCY = int(os.environ.get('READ_CONCURRENCY', '32'))
+READ_QUEUE = int(os.environ.get('READ_QUEUE', '128'))
+READ_DEADLINE = float(os.environ.get('READ_DEADLINE', '2'))
+MAX_RETRY_AFTER = 30  # seconds
+
+
+class Overloaded(Exception):
+    """A request was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def request_timeout(headers, default):
+    """The admission deadline: X-Request-Timeout (seconds) if shorter than `default`."""
+    try:
+        requested = float(headers.get('X-Request-Timeout') or default)
+    except ValueError:
+        return default
+    return max(0.0, min(requested, default))
+
+
+class _Waiter:
+    __slots__ = ('event', 'future', 'loop')
+
+    def __init__(self, event=None, future=None, loop=None):
+        self.event = event
+        self.future = future
+        self.loop = loop
+
+    def grant(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Budget:
+    """Concurrency limit with a bounded FIFO wait queue and per-request deadlines."""
+
+    def __init__(self, name, limit, queue_size, deadline):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self.active = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.service_seconds = 0.05   # moving average of time holding a slot
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    # --- Slots ---
+
+    def _enter_or_wait(self, waiter):
+        """Take a free slot (True), or queue `waiter` (False). Caller holds the lock."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_full += 1
+            raise self._overloaded("queue full")
+        self._waiters.append(waiter)
+        return False
+
+    def _give_up(self, waiter):
+        """After a deadline: Returns: True if `waiter` was still queued (and is now removed)"""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False   # A slot was handed over just in time
+            self.rejected_deadline += 1
+        return True
+
+    def acquire(self, timeout=None):
+        """Wait for a slot. Raises: Overloaded"""
+        timeout = self.deadline if timeout is None else timeout
+        waiter = _Waiter(event=threading.Event())
+        with self._lock:
+            if self._enter_or_wait(waiter):
+                return
+        if not waiter.event.wait(timeout) and self._give_up(waiter):
+            raise self._overloaded("deadline exceeded while queued")
+
+    async def acquire_async(self, timeout=None):
+        """acquire() for the event loop. Raises: Overloaded"""
+        timeout = self.deadline if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(future=loop.create_future(), loop=loop)
+        with self._lock:
+            if self._enter_or_wait(waiter):
+                return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._give_up(waiter):
+                raise self._overloaded("deadline exceeded while queued")
+        except asyncio.CancelledError:
+            # Client went away: leave the queue, or pass on a slot granted meanwhile
+            if not self._give_up(waiter):
+                self.release()
+            raise
+
+    def release(self, held_seconds=None):
+        with self._lock:
+            if held_seconds is not None:
+                self.service_seconds += 0.1 * (held_seconds - self.service_seconds)
+            if self._waiters:
+                # Hand the slot over: `active` stays the same
+                self.admitted += 1
+                self._waiters.popleft().grant()
+            else:
+                self.active -= 1
+
+    def _overloaded(self, reason):
+        # Time for the queue ahead to drain through the slots
+        retry_after = math.ceil(self.service_seconds * (len(self._waiters) + 1) / self.limit)
+        return Overloaded(f"Server busy ({self.name}: {reason}). Please retry.",
+                          min(max(retry_after, 1), MAX_RETRY_AFTER))
+
+    # --- Reporting ---
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'queued': len(self._waiters),
+            'queue_size': self.queue_size,
+            'deadline_seconds': self.deadline,
+            'admitted': self.admitted,
+            'rejected_queue_full': self.rejected_full,
+            'rejected_deadline': self.rejected_deadline,
+            'avg_service_ms': round(self.service_seconds * 1000, 1)
+        }
+
+
+class Slot:
+    """`with Slot(budget, timeout):` / `async with Slot(...)`: hold one slot of `budget`."""
+
+    __slots__ = ('budget', 'timeout', 'started')
+
+    def __init__(self, budget, timeout=None):
+        self.budget = budget
+        self.timeout = timeout
+        self.started = None
+
+    def __enter__(self):
+        self.budget.acquire(self.timeout)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.budget.release(time.perf_counter() - self.started)
+
+    async def __aenter__(self):
+        await self.budget.acquire_async(self.timeout)
+        self.started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.budget.release(time.perf_counter() - self.started)
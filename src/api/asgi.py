@@ -0,0 +1,332 @@
+"""
+ASGI entry point serving the same routes as the Flask app in api/main.py.
+
+    uvicorn api.asgi:app --app-dir src --host 0.0.0.0 --port 5000
+
+Only handlers that answer from memory without shared locks (health,
+readiness, model and training status) run on the event loop. The others
+are in OFFLOADED_HANDLERS and run in the default executor: they walk
+every stored record, read the archive, append to the journal, or take
+the store and index locks that a bulk import holds for each batch.
+Storing a prediction does all of these, so it is offloaded as well.
+Admission slots (api/admission.py) are awaited, never waited for on the
+event loop: a queued request does not block the others. The CPU-bound
+make_prediction() calls of /predict and /predict/batch are offloaded to a
+bounded executor:
+    ASGI_INFERENCE_EXECUTOR   "thread" (default) or "process"
+    ASGI_INFERENCE_WORKERS    pool size (default: CPU count)
+In "process" mode each worker process loads its own models (see
+model_watch.init_worker()). /ready, /admin/models and the shadow
+evaluator still describe this process only: /ready reports the parent's
+warm-up, not the workers', and shadow candidates see no traffic because
+the scores are computed in the workers. Run shadow evaluation with the
+thread executor.
+Responses go through the same encode_body() as the Flask app, so bodies
+are byte-identical. Streamed bodies (exports) are produced chunk by chunk
+in the default executor, also off the event loop. Handlers that stream
+their request body (@streamed_body, e.g. the bulk import) run in the
+default executor too, reading the body as it arrives: MAX_BODY_BYTES does
+not apply to them.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import io
+import multiprocessing
+import os
+import re
+import sys
+from urllib.parse import parse_qsl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.predict import make_prediction
+from api import endpoints
+from api.endpoints import ROUTES, ApiError, ApiRequest
+from api.model_watch import init_worker
+from api.serialization import StreamingBody, encode_body, encode_stream
+from api.admission import Overloaded, Slot, request_timeout
+
+# --- Configuration ---
+INFERENCE_EXECUTOR = os.environ.get('ASGI_INFERENCE_EXECUTOR', 'thread')
+INFERENCE_WORKERS = int(os.environ.get('ASGI_INFERENCE_WORKERS', os.cpu_count() or 4))
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+
+class Headers:
+    """Case-insensitive, read-only view of ASGI headers."""
+
+    def __init__(self, raw_headers):
+        self._headers = {}
+        for name, value in raw_headers:
+            self._headers.setdefault(name.decode('latin-1').lower(), value.decode('latin-1'))
+
+    def get(self, name, default=None):
+        return self._headers.get(name.lower(), default)
+
+
+def _compile_rule(rule):
+    """'/api/patients/<patient_id>' -> regex with a named group per parameter."""
+    pattern = re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', rule)
+    return re.compile(f'^{pattern}$')
+
+
+# --- Offloaded inference ---
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        if INFERENCE_EXECUTOR == 'process':
+            # Each worker process loads, warms and hot-reloads its own copy of the
+            # models. Spawned, not forked: a fork would copy this process's
+            # threads' locks (journal, store shards) in whatever state they are in
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=INFERENCE_WORKERS, initializer=init_worker,
+                mp_context=multiprocessing.get_context('spawn'))
+        else:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=INFERENCE_WORKERS, thread_name_prefix='inference')
+    return _executor
+
+async def _infer(params):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), make_prediction,
+        params['disease_type'], params['health_data'], params['symptoms']
+    )
+
+def admitted_async(budget):
+    """Async twin of endpoints.admitted(): hold a slot of `budget` while the coroutine runs."""
+    def decorate(handler):
+        async def admitted_handler(req, **path_params):
+            try:
+                async with Slot(budget, request_timeout(req.headers, budget.deadline)):
+                    return await handler(req, **path_params)
+            except Overloaded as e:
+                raise ApiError.overloaded(e)
+        return admitted_handler
+    return decorate
+
+@admitted_async(endpoints.INFERENCE_BUDGET)
+async def predict_async(req):
+    """Async twin of endpoints.predict with inference off the event loop."""
+    params, error = endpoints.parse_prediction_request(req.data())
+    if error:
+        return error
+    result = await _infer(params)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, endpoints.store_prediction, params, result)
+
+@admitted_async(endpoints.INFERENCE_BUDGET)
+async def predict_batch_async(req):
+    """Async twin of endpoints.predict_batch; items are scored concurrently in one slot."""
+    parsed = [endpoints.parse_prediction_request(item) for item in endpoints.batch_items(req.data())]
+    results = iter(await asyncio.gather(*[_infer(params) for params, error in parsed if error is None]))
+
+    def store_all():
+        # Store in request order so IDs are assigned exactly as in the Flask app
+        return [error or endpoints.store_prediction(params, next(results)) for params, error in parsed]
+
+    outcomes = await asyncio.get_running_loop().run_in_executor(None, store_all)
+    return endpoints.batch_response(outcomes), 200
+
+ASYNC_HANDLERS = {
+    endpoints.predict: predict_async,
+    endpoints.predict_batch: predict_batch_async,
+}
+
+# Sync handlers that may block the event loop
+OFFLOADED_HANDLERS = {
+    # Go over every stored record, or every traced allocation
+    endpoints.get_patients,
+    endpoints.get_statistics,
+    endpoints.merge_duplicate_patients,
+    endpoints.get_memory_usage,
+    endpoints.take_memory_snapshot,
+    endpoints.get_memory_snapshot,
+    endpoints.diff_memory_snapshots,
+    # Read the archive, write the journal or outcome log, or wait for the
+    # store/index locks held per import batch (and build indexes on first use)
+    endpoints.get_patient_details,
+    endpoints.delete_patient,
+    endpoints.confirm_outcome,
+    endpoints.get_statistics_timeseries,
+    endpoints.get_vitals_range,
+    endpoints.get_vitals_rolling,
+    endpoints.get_vitals_slope,
+    endpoints.get_vitals_latest,
+    # Load their directory from disk on first use
+    endpoints.search_providers,
+    endpoints.search_drugs,
+}
+
+def _as_coroutine(handler):
+    """
+    Coroutine function running a sync handler: in the default executor if it
+    is slow (or reads a streamed body), with its admission slot awaited.
+    """
+    budget = getattr(handler, 'budget', None)
+    run = handler.__wrapped__ if budget is not None else handler
+    offloaded = getattr(handler, 'streams_body', False) or handler in OFFLOADED_HANDLERS
+
+    async def run_handler(req, **path_params):
+        if offloaded:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(run, req, **path_params))
+        return run(req, **path_params)
+    return run_handler if budget is None else admitted_async(budget)(run_handler)
+
+_ROUTES = [
+    (route.method, _compile_rule(route.rule), route.handler,
+     ASYNC_HANDLERS.get(route.handler) or _as_coroutine(route.handler))
+    for route in ROUTES
+]
+
+
+# --- ASGI application ---
+class _BodyStream(io.RawIOBase):
+    """Blocking file view of an ASGI request body, for a handler running in an executor thread."""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._chunk = b''
+        self._position = 0
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._position == len(self._chunk) and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                raise OSError("Client disconnected before the request body was complete.")
+            self._chunk, self._position = message.get('body', b''), 0
+            self._more = message.get('more_body', False)
+        size = min(len(buffer), len(self._chunk) - self._position)
+        buffer[:size] = self._chunk[self._position:self._position + size]
+        self._position += size
+        return size
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError("Request body too large.", 413)
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+async def _send(send, status, body, mimetype, headers):
+    raw_headers = [
+        (b'content-type', mimetype.encode('latin-1')),
+        (b'content-length', str(len(body)).encode('latin-1')),
+    ] + CORS_HEADERS + [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_stream(send, status, chunks, mimetype, headers):
+    raw_headers = [(b'content-type', mimetype.encode('latin-1'))] + CORS_HEADERS + [
+        (k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    loop = asyncio.get_running_loop()
+    chunks = iter(chunks)
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+        if chunk:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, endpoints.init_app)
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': f"{type(e).__name__}: {e}"})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown(wait=True)
+            endpoints.PATIENTS_DB.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    if not endpoints.started():
+        # Servers without lifespan events: start on the first request
+        await asyncio.get_running_loop().run_in_executor(None, endpoints.init_app)
+
+    headers = Headers(scope.get('headers', []))
+
+    def encode(payload):
+        return encode_body(payload, headers.get('accept', ''), headers.get('accept-encoding', ''))
+
+    method = scope['method']
+    if method == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 200, 'headers': CORS_HEADERS + [
+            (b'access-control-allow-methods', b'GET, POST, DELETE, OPTIONS'),
+            (b'access-control-allow-headers', headers.get('access-control-request-headers', '*').encode('latin-1')),
+            (b'content-length', b'0'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    path = scope['path']
+    handler, run_handler, path_params, path_matched = None, None, {}, False
+    for route_method, pattern, route_handler, route_coroutine in _ROUTES:
+        match = pattern.match(path)
+        if match:
+            path_matched = True
+            if route_method == method:
+                handler, run_handler, path_params = route_handler, route_coroutine, match.groupdict()
+                break
+
+    if handler is None:
+        status = 405 if path_matched else 404
+        message = "Method not allowed" if path_matched else "Not found"
+        await _send(send, status, *encode({"error": message}))
+        return
+
+    try:
+        args = {}
+        for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+            args.setdefault(name, value)
+        streams_body = getattr(handler, 'streams_body', False)
+        loop = asyncio.get_running_loop()
+        req = ApiRequest(
+            method=method,
+            args=args,
+            headers=headers,
+            body=None if streams_body else await _read_body(receive),
+            content_type=headers.get('content-type', ''),
+            stream=io.BufferedReader(_BodyStream(receive, loop)) if streams_body else None
+        )
+        payload, status = await run_handler(req, **path_params)
+        extra_headers = {}
+    except ApiError as e:
+        payload, status, extra_headers = {"error": e.message}, e.status, e.headers
+
+    if isinstance(payload, StreamingBody):
+        await _send_stream(send, status, *encode_stream(payload, headers.get('accept-encoding', '')))
+        return
+    body, mimetype, response_headers = encode(payload)
+    await _send(send, status, body, mimetype, dict(response_headers, **extra_headers))
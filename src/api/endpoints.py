@@ -0,0 +1,1164 @@
+"""
+Framework-independent API endpoints.
+
+Every route is a plain function taking an ApiRequest (plus path
+parameters) and returning (payload, status); downloads return a
+serialization.StreamingBody as the payload. Handlers marked with
+@streamed_body read their request body from req.stream, a binary file
+object, instead of req.body, so uploads are never buffered whole. ROUTES
+is served by both the
+Flask app (api/main.py) and the ASGI app (api/asgi.py), so the two entry
+points expose the same routes and produce byte-identical responses.
+
+Importing this module starts nothing: init_app() opens the patient store
+(taking PATIENT_DATA_DIR) and starts the background workers. Both entry
+points call it at startup, and before their first request otherwise.
+"""
+import atexit
+import functools
+import heapq
+import hmac
+import io
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.predict import current_registry, make_prediction
+from api.serialization import StreamingBody, decode_body
+from api.records import PatientRecord, patient_id_number
+from api.store import PatientStore
+from api.persistence import PatientJournal
+from api.retention import PatientArchive, RetentionPolicy, RetentionWorker
+from api.ids import IdAllocator
+from api.identity import IdentityIndex, find_duplicates, identity_key
+from api.providers import DISEASE_SPECIALTIES, get_directory, loaded_directory
+from api.formulary import get_formulary, loaded_formulary
+from api.vitals import METRICS, build_vitals_store, metrics_from_health_data, parse_time, record_readings
+from api.importer import import_records, iter_items
+from api.export import EXPORT_FORMATS, export_chunks, export_rows, supports
+from api.rollups import BUCKETS, build_rollups, record_visits, state_visits
+from api.admission import (
+    INFERENCE_CONCURRENCY, INFERENCE_DEADLINE, INFERENCE_QUEUE, READ_CONCURRENCY, READ_DEADLINE, READ_QUEUE,
+    Budget, Overloaded, Slot, request_timeout
+)
+from api.warmup import WARMUP_ENABLED, Warmup
+from api.model_watch import MODEL_WATCH_INTERVAL, ModelWatcher
+from api.shadow import ShadowEvaluator
+from api.feedback import FEEDBACK_TRAIN_INTERVAL, OUTCOME_DISEASES, FeedbackTrainer, OutcomeLog, is_holdout, model_features
+from api.memory import DEFAULT_TOP, GROUP_BY, MEMORY_DEBUG, AllocationTracer, account, gc_counts, process_memory
+
+# Patient storage: in memory, journaled to PATIENT_DATA_DIR so records
+# survive restarts (set PATIENT_DATA_DIR="" to keep everything in memory)
+PATIENT_DATA_DIR = os.environ.get('PATIENT_DATA_DIR', 'data/processed/patients/')
+PATIENTS_DB = PatientStore(PatientJournal(PATIENT_DATA_DIR) if PATIENT_DATA_DIR else None)
+# IDs continue above the highest patient number the journal has seen
+# (raised by open_storage()); PATIENT_DATA_DIR belongs to this one
+# process (see api/ids.py)
+ID_ALLOCATOR = IdAllocator(floor=1000)
+
+# Cold records move to a compressed on-disk archive (see api/retention.py),
+# opened by open_storage()
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(PATIENT_DATA_DIR, 'archive') if PATIENT_DATA_DIR else '')
+RETENTION_POLICY = RetentionPolicy.from_env()
+ARCHIVE = None
+RETENTION_WORKER = None
+
+# Upper bound on items accepted by /predict/batch
+MAX_BATCH_SIZE = 256
+
+# Largest page of /api/patients?limit=
+MAX_PAGE_SIZE = 500
+
+# Models are loaded and warmed up in the background; /ready gates traffic
+WARMUP = Warmup()
+
+# New model artifacts are picked up without a restart (see api/model_watch.py)
+MODEL_WATCHER = ModelWatcher()
+
+# Candidate models in SHADOW_MODEL_DIR score a copy of live traffic in the
+# background (see api/shadow.py)
+SHADOW = ShadowEvaluator()
+
+# Confirmed outcomes are logged next to the patient journal; a background
+# job continues training the models on them (see api/feedback.py)
+OUTCOMES = OutcomeLog(os.path.join(PATIENT_DATA_DIR, 'outcomes.jsonl') if PATIENT_DATA_DIR else None)
+FEEDBACK_TRAINER = FeedbackTrainer(OUTCOMES, MODEL_WATCHER)
+
+# Admission control (see api/admission.py): predictions and cheap reads
+# each get a bounded number of slots and a bounded wait queue
+INFERENCE_BUDGET = Budget('inference', INFERENCE_CONCURRENCY, INFERENCE_QUEUE, INFERENCE_DEADLINE)
+READ_BUDGET = Budget('reads', READ_CONCURRENCY, READ_QUEUE, READ_DEADLINE)
+
+# On-demand memory accounting and tracemalloc (see api/memory.py); the
+# /admin/memory endpoints are off unless MEMORY_DEBUG=1
+TRACER = AllocationTracer()
+
+# /admin/* endpoints require this token in the X-Admin-Token header; they
+# are disabled when it is not set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# --- Startup ---
+_storage_opened = False
+_started = False
+_startup_lock = threading.RLock()
+
+def open_storage():
+    """
+    Recover the patient store from PATIENT_DATA_DIR (taking its lock), and
+    open the archive and the outcome log. Idempotent.
+    Raises: persistence.DataDirectoryLocked if another process owns the directory
+    """
+    global ARCHIVE, _storage_opened
+    if _storage_opened:
+        return
+    with _startup_lock:
+        if _storage_opened:
+            return
+        ID_ALLOCATOR.advance(PATIENTS_DB.open())
+        atexit.register(PATIENTS_DB.close)
+        if len(PATIENTS_DB):
+            print(f"✅ Restored {len(PATIENTS_DB)} patient records from {PATIENT_DATA_DIR}")
+        ARCHIVE = PatientArchive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+        OUTCOMES.open()
+        atexit.register(OUTCOMES.close)
+        _storage_opened = True
+
+def init_app():
+    """
+    Start the API: open_storage(), then the background workers (model
+    warm-up, model watch, shadow evaluation, retention, continued training).
+    Idempotent.
+    """
+    global RETENTION_WORKER, _started
+    if _started:
+        return
+    with _startup_lock:
+        if _started:
+            return
+        open_storage()
+        if RETENTION_POLICY.enabled and ARCHIVE is not None:
+            RETENTION_WORKER = RetentionWorker(PATIENTS_DB, ARCHIVE, RETENTION_POLICY)
+            RETENTION_WORKER.start()
+        if WARMUP_ENABLED:
+            WARMUP.start()
+        else:
+            WARMUP.skip()
+        if MODEL_WATCH_INTERVAL > 0:
+            MODEL_WATCHER.start()
+        if SHADOW.start():
+            print(f"👥 Shadow evaluation enabled for {', '.join(SHADOW.registry.versions) or 'no models yet'}")
+        if FEEDBACK_TRAIN_INTERVAL > 0:
+            FEEDBACK_TRAINER.start()
+        _started = True
+
+def started():
+    """True once init_app() has run."""
+    return _started
+
+# Vitals time-series (see api/vitals.py), built on first use from the seed
+# file and stored records, then kept current by store_prediction()
+_vitals = None
+_vitals_lock = threading.Lock()
+
+def get_vitals():
+    global _vitals
+    if _vitals is None:
+        with _vitals_lock:
+            if _vitals is None:
+                _vitals = build_vitals_store(PATIENTS_DB.records())
+    return _vitals
+
+# Returning patients (same name + phone) are attached to their existing
+# record (see api/identity.py); the index is built on first use from the
+# stored records and kept current by store_prediction() and the importer
+_identities = None
+_identities_lock = threading.Lock()
+
+def get_identities():
+    global _identities
+    if _identities is None:
+        with _identities_lock:
+            if _identities is None:
+                identities = IdentityIndex()
+                identities.build(PATIENTS_DB.records(), ARCHIVE.iter_states() if ARCHIVE is not None else ())
+                _identities = identities
+    return _identities
+
+# Hourly/daily assessment rollups (see api/rollups.py), built on first use
+# from stored and archived records, then updated on every write and delete.
+# Writes change the store and the rollups under _rollups_lock, which the
+# build holds too, so a build never counts a visit that is then added again
+_rollups = None
+_rollups_lock = threading.Lock()
+
+def get_rollups():
+    global _rollups
+    if _rollups is None:
+        with _rollups_lock:
+            if _rollups is None:
+                _rollups = build_rollups(PATIENTS_DB.records(), ARCHIVE.iter_states() if ARCHIVE is not None else ())
+    return _rollups
+
+
+class ApiError(Exception):
+    """Raised by endpoints to answer with {"error": message}, a status and optional extra headers."""
+
+    def __init__(self, message, status=400, headers=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.headers = headers or {}
+
+    @classmethod
+    def overloaded(cls, error):
+        """503 for a request admission control turned away."""
+        return cls(str(error), 503, {'Retry-After': str(error.retry_after)})
+
+
+class ApiRequest:
+    """The parts of an HTTP request the endpoints need."""
+
+    __slots__ = ('method', 'args', 'headers', 'body', 'content_type', 'stream')
+
+    def __init__(self, method, args, headers, body, content_type, stream=None):
+        self.method = method
+        self.args = args          # Mapping with .get(name, default)
+        self.headers = headers    # Case-insensitive mapping with .get()
+        self.body = body
+        self.content_type = content_type
+        self.stream = stream      # Binary file object for @streamed_body handlers (body is None then)
+
+    def data(self):
+        """Parse a JSON or msgpack request body (empty body -> {})."""
+        try:
+            return decode_body(self.body, self.content_type) or {}
+        except ValueError as e:
+            raise ApiError(f"Invalid request body: {e}", 400)
+
+
+Route = namedtuple('Route', ['method', 'rule', 'handler'])
+
+# --- Helper Functions ---
+def generate_patient_id():
+    return ID_ALLOCATOR.allocate()
+
+def streamed_body(handler):
+    """Mark a handler that reads its (possibly large) body from req.stream."""
+    handler.streams_body = True
+    return handler
+
+def time_range(args):
+    """
+    Parse the from/to query params (ISO date or epoch seconds; None if absent).
+    Raises: ApiError 400, also for times datetime cannot represent
+    """
+    try:
+        start, end = parse_time(args.get('from')), parse_time(args.get('to'))
+        for ts in (start, end):
+            if ts is not None:
+                datetime.fromtimestamp(ts)
+    except (ValueError, OverflowError, OSError):
+        raise ApiError("from and to must be ISO dates or epoch seconds.", 400)
+    return start, end
+
+def admitted(budget):
+    """Run a handler in a slot of `budget`, or answer 503 if it cannot get one in time."""
+    def decorate(handler):
+        @functools.wraps(handler)
+        def admitted_handler(req, **path_params):
+            try:
+                with Slot(budget, request_timeout(req.headers, budget.deadline)):
+                    return handler(req, **path_params)
+            except Overloaded as e:
+                raise ApiError.overloaded(e)
+        # For the ASGI app, which awaits the slot instead (handler is __wrapped__)
+        admitted_handler.budget = budget
+        return admitted_handler
+    return decorate
+
+def require_admin(req):
+    if not ADMIN_TOKEN:
+        raise ApiError("Admin endpoints are disabled (ADMIN_TOKEN is not set).", 403)
+    if not hmac.compare_digest(req.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        raise ApiError("Invalid or missing admin token.", 403)
+
+def require_memory_debug(req):
+    require_admin(req)
+    if not MEMORY_DEBUG:
+        raise ApiError("Memory instrumentation is disabled (MEMORY_DEBUG is not set).", 403)
+
+def calculate_overall_risk(detected_diseases):
+    """Calculate overall risk from multiple diseases"""
+    if not detected_diseases:
+        return 0.0
+
+    # Get highest risk score
+    max_risk = max([d['final_risk_score'] for d in detected_diseases])
+    return max_risk / 100  # Convert to 0-1 scale
+
+def get_primary_diagnosis(detected_diseases):
+    """Get the disease with highest risk as primary diagnosis"""
+    if not detected_diseases:
+        return "No diagnosis"
+
+    sorted_diseases = sorted(detected_diseases, key=lambda x: x['final_risk_score'], reverse=True)
+    return sorted_diseases[0]['disease_name']
+
+def parse_prediction_request(data):
+    """
+    Validate one /predict payload.
+    Returns: (params, None) or (None, (error_payload, status_code))
+    """
+    if not isinstance(data, dict):
+        return None, ({"error": "Each prediction request must be a JSON object."}, 400)
+
+    # Extract data
+    params = {
+        'patient_info': data.get('patient_info', {}),
+        'symptoms': data.get('symptoms') or data.get('unstructured_notes', ''),
+        'disease_type': data.get('disease_type', 'auto'),
+        'health_data': data.get('health_data') or data.get('structured_data', {})
+    }
+
+    # Validation
+    if not params['symptoms'] or not params['symptoms'].strip():
+        return None, ({
+            "error": "Missing symptoms. Please describe your symptoms."
+        }, 400)
+
+    return params, None
+
+def resolve_patient_id(patient_info):
+    """The ID of the returning patient described by patient_info, or a new one."""
+    key = identity_key(patient_info)
+    if key is None:
+        return generate_patient_id()
+    identities = get_identities()
+    patient_id = identities.lookup(key)
+    if patient_id is None:
+        # A concurrent first visit of the same person may claim the key first
+        patient_id = identities.claim(key, generate_patient_id())
+    elif PATIENTS_DB.get(patient_id) is None and ARCHIVE is not None:
+        # Bring an archived patient back before adding the visit
+        state = ARCHIVE.get(patient_id)
+        if state is not None:
+            PATIENTS_DB.merge_add(PatientRecord.from_state(state))
+            ARCHIVE.delete(patient_id)
+    return patient_id
+
+def store_prediction(params, result):
+    """
+    Turn a make_prediction() result into a stored patient record, or a new
+    visit of the returning patient's record.
+    Returns: (payload, status_code)
+    """
+    if "error" in result:
+        return result, 500
+
+    patient_id = resolve_patient_id(params['patient_info'])
+
+    # Calculate overall metrics
+    if result.get('detection_mode') == 'auto' and 'detected_diseases' in result:
+        overall_risk = calculate_overall_risk(result['detected_diseases'])
+        primary_diagnosis = get_primary_diagnosis(result['detected_diseases'])
+    else:
+        overall_risk = result.get('final_risk_score', 0) / 100
+        primary_diagnosis = result.get('disease_name', 'Unknown')
+
+    # Create patient record (the report is stored once; see api/records.py)
+    patient_record = PatientRecord(
+        patient_id=patient_id,
+        patient_info=params['patient_info'],
+        symptoms=params['symptoms'],
+        health_data=params['health_data'],
+        primary_diagnosis=primary_diagnosis,
+        overall_risk=float(round(overall_risk, 2)),
+        report=result
+    )
+
+    # Store patient record
+    with _rollups_lock:
+        stored = PATIENTS_DB.merge_add(patient_record)
+        if _rollups is not None:
+            _rollups.add(record_visits(patient_record))
+    with _vitals_lock:
+        if _vitals is not None:
+            _vitals.append(patient_id, patient_record.created_at,
+                           metrics_from_health_data(params['health_data']))
+
+    # Return the report with patient info attached
+    return stored.full_report(), 200
+
+def run_prediction(data):
+    """
+    Score one prediction request and store the patient record.
+    Returns: (payload, status_code)
+    """
+    params, error = parse_prediction_request(data)
+    if error:
+        return error
+
+    # Call prediction function
+    result = make_prediction(params['disease_type'], params['health_data'], params['symptoms'])
+    return store_prediction(params, result)
+
+def index_imported(entries, replaced=()):
+    """
+    Per-batch index upkeep for bulk imports: ID sequence, identities, vitals
+    and rollups. Runs under _rollups_lock together with the batch's writes;
+    vitals and rollups not built yet will include the batch when they are.
+    """
+    numbers = [patient_id_number(record.patient_id) for record, _ in entries]
+    highest = max((n for n in numbers if n is not None), default=None)
+    if highest is not None:
+        ID_ALLOCATOR.advance(highest)
+
+    identities = get_identities()
+    for record, _ in entries:
+        key = identity_key(record.patient_info)
+        if key is not None:
+            identities.claim(key, record.patient_id)
+
+    with _vitals_lock:
+        if _vitals is not None:
+            _vitals.extend_many(record_readings([record for record, _ in entries]))
+
+    if _rollups is not None:
+        for record in replaced:
+            _rollups.remove(record_visits(record))
+        for record, _ in entries:
+            _rollups.add(record_visits(record))
+
+def import_patients(stream, replace=False):
+    """
+    Bulk-load patient records from a binary stream (JSON array or JSONL).
+    Returns: import report (see api/importer.py)
+    """
+    return import_records(iter_items(stream), PATIENTS_DB, lambda record: resolve_patient_id(record.patient_info),
+                          on_batch=index_imported, replace=replace, write_lock=_rollups_lock)
+
+def batch_items(data):
+    """Validate a /predict/batch payload. Returns: list of item payloads"""
+    items = data.get('requests') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ApiError("Expected a non-empty list of prediction requests.", 400)
+    if len(items) > MAX_BATCH_SIZE:
+        raise ApiError(f"Batch too large (max {MAX_BATCH_SIZE} items).", 413)
+    return items
+
+def batch_response(outcomes):
+    """Combine per-item (payload, status) pairs into the batch payload."""
+    results = []
+    for payload, status in outcomes:
+        if status != 200:
+            payload = dict(payload, status=status)
+        results.append(payload)
+    return {'count': len(results), 'results': results}
+
+# --- API Endpoints ---
+
+@admitted(INFERENCE_BUDGET)
+def predict(req):
+    """
+    Enhanced API endpoint for multi-disease prediction with patient storage.
+    """
+    return run_prediction(req.data())
+
+@admitted(INFERENCE_BUDGET)
+def predict_batch(req):
+    """
+    Batch prediction for machine clients.
+    Accepts a list of /predict payloads (or {"requests": [...]}) and
+    returns one result per item, in order.
+    """
+    items = batch_items(req.data())
+    return batch_response([run_prediction(item) for item in items]), 200
+
+# Worklist filters and orderings of /api/patients
+RISK_FILTERS = {
+    'high': lambda risk: risk > 0.7,
+    'moderate': lambda risk: 0.4 < risk <= 0.7,
+    'low': lambda risk: risk <= 0.4
+}
+PATIENT_ORDERINGS = {
+    'last_seen': lambda p: -p.created_at,
+    'risk': lambda p: (-p.overall_risk, -p.created_at),
+    'name': lambda p: (str(p.name).casefold(), -p.created_at)
+}
+
+def page_args(req):
+    """Parse the worklist query params. Returns: (query, risk, sort, offset, limit)"""
+    args = req.args
+    try:
+        offset = int(args.get('offset') or 0)
+        limit = int(args.get('limit') or 50)
+    except ValueError:
+        raise ApiError("offset and limit must be numbers.", 400)
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        raise ApiError(f"offset must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}.", 400)
+    risk = args.get('risk') or None
+    if risk is not None and risk not in RISK_FILTERS:
+        raise ApiError(f"risk must be one of: {', '.join(RISK_FILTERS)}.", 400)
+    sort = args.get('sort') or 'last_seen'
+    if sort not in PATIENT_ORDERINGS:
+        raise ApiError(f"sort must be one of: {', '.join(PATIENT_ORDERINGS)}.", 400)
+    query = (args.get('q') or '').strip().casefold() or None
+    return query, risk, sort, offset, limit
+
+@admitted(READ_BUDGET)
+def get_patients(req):
+    """
+    Get list of all patients for dashboard.
+    Returns simplified patient list for table view.
+    With any of the query params limit, offset, q (name or ID substring),
+    risk (high/moderate/low) or sort (last_seen/risk/name), returns one page
+    instead: {"total", "offset", "limit", "patients"}.
+    """
+    if not any(req.args.get(name) for name in ('limit', 'offset', 'q', 'risk', 'sort')):
+        # Sort by timestamp (most recent first)
+        patients = sorted(PATIENTS_DB, key=lambda p: p.created_at, reverse=True)
+        patient_list = [patient.summary() for patient in patients]
+
+        return patient_list, 200
+
+    query, risk, sort, offset, limit = page_args(req)
+    patients = PATIENTS_DB.records()
+    if risk is not None:
+        in_band = RISK_FILTERS[risk]
+        patients = [p for p in patients if in_band(p.overall_risk)]
+    if query is not None:
+        patients = [p for p in patients
+                    if query in p.patient_id.casefold() or query in str(p.name).casefold()]
+    # Only the rows up to the end of the page are ordered
+    page = heapq.nsmallest(offset + limit, patients, key=PATIENT_ORDERINGS[sort])[offset:]
+    return {
+        'total': len(patients),
+        'offset': offset,
+        'limit': limit,
+        'patients': [patient.summary() for patient in page]
+    }, 200
+
+@streamed_body
+def bulk_import_patients(req):
+    """
+    Bulk import of historical records (JSON array or JSONL body), parsed
+    as it is received.
+    Query params: replace=true overwrites existing patient IDs (default: skip).
+    """
+    stream = req.stream if req.stream is not None else io.BytesIO(req.body or b'')
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    if not stream.peek(1):
+        raise ApiError("Expected a JSON array or JSONL body of patient records.", 400)
+    report = import_patients(stream, replace=req.args.get('replace') == 'true')
+    return report, 200 if report['imported'] or not report['failed'] else 400
+
+def export_patients(req):
+    """
+    Stream every stored visit as flat rows (see api/export.py).
+    Query params: format (csv/jsonl/parquet, default csv), from/to (ISO date
+    or epoch seconds, on the visit time), risk (high/moderate/low, on the
+    visit's overall risk), archived=false to leave out archived records.
+    """
+    args = req.args
+    export_format = args.get('format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        raise ApiError(f"format must be one of: {', '.join(EXPORT_FORMATS)}.", 400)
+    if not supports(export_format):
+        raise ApiError("Parquet export requires pyarrow on the server.", 501)
+    start, end = time_range(args)
+    risk = args.get('risk') or None
+    if risk is not None and risk not in RISK_FILTERS:
+        raise ApiError(f"risk must be one of: {', '.join(RISK_FILTERS)}.", 400)
+
+    def records():
+        resident = PATIENTS_DB.records()
+        yield from resident
+        if ARCHIVE is not None and args.get('archived') != 'false':
+            resident_ids = {record.patient_id for record in resident}
+            for state in ARCHIVE.iter_states():
+                # Skip records that were brought back from the archive
+                if state['id'] not in resident_ids:
+                    yield PatientRecord.from_state(state)
+
+    rows = export_rows(records(), start, end, RISK_FILTERS.get(risk))
+    filename = f"patients-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingBody(
+        export_chunks(export_format, rows), EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        compressible=export_format != 'parquet'
+    ), 200
+
+@admitted(READ_BUDGET)
+def get_patient_details(req, patient_id):
+    """
+    Get detailed information for a specific patient.
+    """
+    patient = PATIENTS_DB.get(patient_id)
+    if patient is not None:
+        return patient.to_dict(), 200
+
+    # Fall back to the cold archive
+    state = ARCHIVE.get(patient_id) if ARCHIVE is not None else None
+    if state is not None:
+        patient = PatientRecord.from_state(state).to_dict()
+        patient['archived'] = True
+        return patient, 200
+
+    return {"error": "Patient not found"}, 404
+
+def delete_patient(req, patient_id):
+    """
+    Delete a patient record.
+    """
+    with _rollups_lock:
+        record = PATIENTS_DB.delete(patient_id)
+        if record is not None:
+            visits = record_visits(record)
+        else:
+            state = ARCHIVE.get(patient_id) if ARCHIVE is not None else None
+            if state is None or not ARCHIVE.delete(patient_id):
+                return {"error": "Patient not found"}, 404
+            visits = state_visits(state)
+        if _rollups is not None:
+            _rollups.remove(visits)
+
+    with _vitals_lock:
+        if _vitals is not None:
+            _vitals.drop(patient_id)
+    if _identities is not None:
+        _identities.forget(patient_id)
+    OUTCOMES.forget(patient_id)
+    return {"message": "Patient deleted successfully"}, 200
+
+def scored_version(report, disease_type):
+    """Version of the model that scored `disease_type` in a stored report, if one did."""
+    diseases = report.get('detected_diseases', [report])
+    for disease in diseases:
+        if disease.get('disease_type') == disease_type:
+            return disease.get('model_version')
+    return None
+
+def confirm_outcome(req, patient_id):
+    """
+    Attach a confirmed outcome to one of a patient's assessments, for
+    continued training of that disease's model.
+    Body: {"disease_type": "diabetes", "outcome": 1 (confirmed) or 0 (ruled out),
+           "visit": 1 = first visit (default: the latest)}
+    """
+    data = req.data()
+    if not isinstance(data, dict):
+        raise ApiError("Request body must be a JSON object.", 400)
+    disease_type = data.get('disease_type')
+    if disease_type not in OUTCOME_DISEASES:
+        raise ApiError(f"disease_type must be one of: {', '.join(OUTCOME_DISEASES)}.", 400)
+    outcome = data.get('outcome')
+    if outcome not in (0, 1) or isinstance(outcome, str):
+        raise ApiError("outcome must be 1 (confirmed) or 0 (ruled out).", 400)
+
+    record = PATIENTS_DB.get(patient_id)
+    if record is None:
+        state = ARCHIVE.get(patient_id) if ARCHIVE is not None else None
+        if state is None:
+            return {"error": "Patient not found"}, 404
+        record = PatientRecord.from_state(state)
+    visits = (*record.history, record.visit_state())
+    number = data.get('visit')
+    if number is None:
+        number = len(visits)
+    if not isinstance(number, int) or isinstance(number, bool) or not 1 <= number <= len(visits):
+        raise ApiError(f"visit must be between 1 and {len(visits)}.", 400)
+    visit = visits[number - 1]
+
+    features, trainable = model_features(disease_type, visit['health'] or {})
+    entry = {
+        'patient_id': patient_id,
+        'disease_type': disease_type,
+        'outcome': int(outcome),
+        'visit': number,
+        'visit_ts': visit['ts'],
+        'features': features,
+        'trainable': trainable,
+        'model_version': scored_version(visit['report'], disease_type),
+        'confirmed_at': time.time()
+    }
+    OUTCOMES.add(entry)
+    if not trainable:
+        used_for = None  # Required model features were not measured at this visit
+    else:
+        used_for = 'validation' if is_holdout(patient_id) else 'training'
+    return dict(entry, used_for=used_for), 200
+
+@admitted(READ_BUDGET)
+def get_statistics(req):
+    """
+    Get overall statistics for dashboard.
+    Counts are per patient (by their latest visit); visits are counted separately.
+    """
+    if not PATIENTS_DB:
+        return {
+            'total_patients': 0,
+            'total_visits': 0,
+            'returning_patients': 0,
+            'high_risk_count': 0,
+            'moderate_risk_count': 0,
+            'low_risk_count': 0,
+            'disease_distribution': {},
+            'archived_patients': len(ARCHIVE) if ARCHIVE is not None else 0
+        }, 200
+
+    patients = PATIENTS_DB.records()
+    total = len(patients)
+    visits = [p.visit_count for p in patients]
+    high_risk = sum(1 for p in patients if p.overall_risk > 0.7)
+    moderate_risk = sum(1 for p in patients if 0.4 < p.overall_risk <= 0.7)
+    low_risk = sum(1 for p in patients if p.overall_risk <= 0.4)
+
+    # Disease distribution
+    disease_counts = {}
+    for patient in patients:
+        diagnosis = patient.primary_diagnosis
+        disease_counts[diagnosis] = disease_counts.get(diagnosis, 0) + 1
+
+    return {
+        'total_patients': total,
+        'total_visits': sum(visits),
+        'returning_patients': sum(1 for count in visits if count > 1),
+        'high_risk_count': high_risk,
+        'moderate_risk_count': moderate_risk,
+        'low_risk_count': low_risk,
+        'disease_distribution': disease_counts,
+        'archived_patients': len(ARCHIVE) if ARCHIVE is not None else 0
+    }, 200
+
+@admitted(READ_BUDGET)
+def get_statistics_timeseries(req):
+    """
+    Assessment counts, risk bands and primary diagnoses per hour or day.
+    Query params: bucket (hour/day, default day), from/to (ISO date or epoch
+    seconds; default the last 7 days for hour, 90 days for day).
+    """
+    args = req.args
+    bucket = args.get('bucket') or 'day'
+    if bucket not in BUCKETS:
+        raise ApiError(f"bucket must be one of: {', '.join(BUCKETS)}.", 400)
+    start, end = time_range(args)
+    end = time.time() if end is None else end
+    start = end - (7 if bucket == 'hour' else 90) * 86400 if start is None else start
+    if start > end:
+        raise ApiError("from must not be after to.", 400)
+    try:
+        # The default start, 7 or 90 days before `to`, may itself be out of range
+        period = datetime.fromtimestamp(start).isoformat(), datetime.fromtimestamp(end).isoformat()
+    except (OverflowError, OSError, ValueError):
+        raise ApiError("from and to must be ISO dates or epoch seconds.", 400)
+    try:
+        series = get_rollups().series(bucket, start, end)
+    except ValueError as e:
+        raise ApiError(f"Range too long: {e}.", 400)
+    return {
+        'bucket': bucket,
+        'from': period[0],
+        'to': period[1],
+        'assessments': sum(point['assessments'] for point in series),
+        'series': series
+    }, 200
+
+@admitted(READ_BUDGET)
+def search_providers(req):
+    """
+    Search the provider directory (hospitals, specialists, ambulances, pharmacies).
+    Query params: q, specialty, kind, disease_type, lat, lon, limit.
+    With lat/lon the nearest providers come first.
+    """
+    args = req.args
+    try:
+        lat = float(args.get('lat')) if args.get('lat') else None
+        lon = float(args.get('lon')) if args.get('lon') else None
+        limit = int(args.get('limit') or 10)
+    except ValueError:
+        raise ApiError("lat, lon and limit must be numbers.", 400)
+    if lat is not None and not (math.isfinite(lat) and -90 <= lat <= 90):
+        raise ApiError("lat must be between -90 and 90.", 400)
+    if lon is not None and not (math.isfinite(lon) and -180 <= lon <= 180):
+        raise ApiError("lon must be between -180 and 180.", 400)
+
+    disease_type = args.get('disease_type')
+    specialty = args.get('specialty') or DISEASE_SPECIALTIES.get(disease_type)
+    directory = get_directory()
+    providers = directory.search(
+        query=args.get('q'), specialty=specialty, kind=args.get('kind'),
+        lat=lat, lon=lon, limit=limit
+    )
+    return {
+        'count': len(providers),
+        'total_providers': len(directory),
+        'specialty': specialty,
+        'providers': providers
+    }, 200
+
+@admitted(READ_BUDGET)
+def search_drugs(req):
+    """
+    Typeahead lookup in the drug formulary.
+    Query params: prefix, class, in_formulary (true/false), limit.
+    """
+    args = req.args
+    in_formulary = args.get('in_formulary')
+    if in_formulary:
+        if in_formulary.lower() not in ('true', 'false', '1', '0'):
+            raise ApiError("in_formulary must be true or false.", 400)
+        in_formulary = in_formulary.lower() in ('true', '1')
+    else:
+        in_formulary = None
+    try:
+        limit = int(args.get('limit') or 10)
+    except ValueError:
+        raise ApiError("limit must be a number.", 400)
+
+    formulary = get_formulary()
+    drugs = formulary.search(
+        prefix=args.get('prefix'), drug_class=args.get('class'),
+        in_formulary=in_formulary, limit=limit
+    )
+    return {
+        'count': len(drugs),
+        'total_drugs': len(formulary),
+        'drugs': drugs
+    }, 200
+
+def vitals_args(req, metric_required=False):
+    """Parse the shared from/to/metric query params of the vitals endpoints."""
+    args = req.args
+    start, end = time_range(args)
+    metric = args.get('metric')
+    if metric_required and metric not in METRICS:
+        raise ApiError(f"metric must be one of: {', '.join(METRICS)}.", 400)
+    return start, end, metric
+
+@admitted(READ_BUDGET)
+def get_vitals_range(req, patient_id):
+    """
+    Vitals readings for a patient in [from, to].
+    Query params: from, to, metrics (comma-separated).
+    """
+    start, end, _ = vitals_args(req)
+    metrics = [m for m in (req.args.get('metrics') or '').split(',') if m] or list(METRICS)
+    if any(m not in METRICS for m in metrics):
+        raise ApiError(f"metrics must be among: {', '.join(METRICS)}.", 400)
+    vitals = get_vitals().range(patient_id, start, end, metrics)
+    if vitals is None:
+        return {"error": "No vitals for this patient"}, 404
+    return dict(vitals, patient_id=patient_id), 200
+
+@admitted(READ_BUDGET)
+def get_vitals_rolling(req, patient_id):
+    """
+    Trailing rolling mean of one metric.
+    Query params: metric, window_days (default 30), from, to.
+    """
+    start, end, metric = vitals_args(req, metric_required=True)
+    try:
+        window_days = float(req.args.get('window_days') or 30)
+    except ValueError:
+        raise ApiError("window_days must be a number.", 400)
+    rolling = get_vitals().rolling_mean(patient_id, metric, window_days, start, end)
+    if rolling is None:
+        return {"error": "No vitals for this patient"}, 404
+    return dict(rolling, patient_id=patient_id), 200
+
+@admitted(READ_BUDGET)
+def get_vitals_slope(req, patient_id):
+    """
+    Linear trend of one metric (units per day).
+    Query params: metric, from, to.
+    """
+    start, end, metric = vitals_args(req, metric_required=True)
+    slope = get_vitals().slope(patient_id, metric, start, end)
+    if slope is None:
+        return {"error": "No vitals for this patient"}, 404
+    return dict(slope, patient_id=patient_id), 200
+
+@admitted(READ_BUDGET)
+def get_vitals_latest(req):
+    """
+    Latest value of each metric per patient.
+    Query params: ids (comma-separated; default all patients with vitals).
+    """
+    ids = [p for p in (req.args.get('ids') or '').split(',') if p] or None
+    latest = get_vitals().latest(ids)
+    return {'count': len(latest), 'patients': latest}, 200
+
+def health_check(req):
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "message": "AI Health Detective API is running",
+        "total_patients": len(PATIENTS_DB),
+        "admission": {"inference": INFERENCE_BUDGET.stats(), "reads": READ_BUDGET.stats()},
+        "supported_diseases": [
+            "diabetes", "cardio", "respiratory", "cancer",
+            "thyroid", "kidney", "liver"
+        ]
+    }, 200
+
+def readiness_check(req):
+    """
+    Readiness for load balancers: 200 once the models are loaded and warm,
+    503 while warm-up is still running (or failed). Includes per-disease model status.
+    """
+    status = WARMUP.status()
+    return status, 200 if status['ready'] else 503
+
+def get_model_registry(req):
+    """Admin: loaded model versions and hot-reload status."""
+    require_admin(req)
+    return MODEL_WATCHER.status(), 200
+
+def reload_model_registry(req):
+    """
+    Admin: load new artifacts from MODEL_DIR in the background, smoke-test
+    them and swap them in (202). Poll GET /admin/models for the outcome.
+    """
+    require_admin(req)
+    started = MODEL_WATCHER.reload_async()
+    status = MODEL_WATCHER.status()
+    status['started'] = started
+    return status, 202
+
+def get_shadow_stats(req):
+    """Admin: primary vs candidate score deltas and agreement from shadow evaluation."""
+    require_admin(req)
+    return SHADOW.stats(), 200
+
+def reset_shadow_stats(req):
+    """Admin: clear the shadow evaluation stats (e.g. after promoting a candidate)."""
+    require_admin(req)
+    SHADOW.reset()
+    return {'message': 'Shadow stats reset'}, 200
+
+def merge_duplicate_patients(req):
+    """
+    Fold records stored before identity matching (same name + phone, several
+    IDs) into the earliest ID of each person; the other IDs are deleted.
+    Query params: dry_run=true lists the groups without changing anything.
+    """
+    require_admin(req)
+    groups = find_duplicates(PATIENTS_DB.records())
+    dry_run = req.args.get('dry_run') == 'true'
+    merged = []
+    for group in groups:
+        keeper, duplicates = group[0], group[1:]
+        merged.append({'patient_id': keeper.patient_id, 'merged_ids': [r.patient_id for r in duplicates],
+                       'visit_count': sum(r.visit_count for r in group)})
+        if dry_run:
+            continue
+        identities = get_identities()
+        for duplicate in duplicates:
+            # A rollup build must not find the visits in both records
+            with _rollups_lock:
+                if PATIENTS_DB.merge_add(duplicate, keeper.patient_id) is None:
+                    break  # Keeper deleted meanwhile
+                PATIENTS_DB.delete(duplicate.patient_id)
+            identities.forget(duplicate.patient_id)
+        stored = PATIENTS_DB.get(keeper.patient_id)
+        key = identity_key(keeper.patient_info)
+        if stored is not None and key is not None:
+            identities.claim(key, keeper.patient_id)
+        with _vitals_lock:
+            if _vitals is not None:
+                for record in group:
+                    _vitals.drop(record.patient_id)
+                if stored is not None:
+                    _vitals.extend_many(record_readings([stored]))
+    return {
+        'dry_run': dry_run,
+        'patients': len(merged),
+        'records_merged': sum(len(group['merged_ids']) for group in merged),
+        'merged': merged
+    }, 200
+
+def get_training_status(req):
+    """Admin: confirmed outcomes per disease and the last continued-training runs."""
+    require_admin(req)
+    return FEEDBACK_TRAINER.status(), 200
+
+def run_training(req):
+    """
+    Admin: continue training on new outcomes now, in the background (202).
+    Poll GET /admin/training for the outcome.
+    """
+    require_admin(req)
+    started = FEEDBACK_TRAINER.run_async()
+    return dict(FEEDBACK_TRAINER.status(), started=started), 202
+
+def get_memory_usage(req):
+    """
+    Admin: process RSS and the estimated bytes held by each subsystem
+    (walks every stored record, so it can take seconds on a large store).
+    An object shared by two subsystems is counted in the first listed.
+    """
+    require_memory_debug(req)
+    started = time.perf_counter()
+    subsystems = account((
+        ('model_registry', current_registry()),
+        ('shadow_evaluation', SHADOW),
+        ('patient_store', PATIENTS_DB),
+        ('patient_archive_index', ARCHIVE),
+        ('identity_index', _identities),
+        ('vitals', _vitals),
+        ('rollups', _rollups),
+        ('provider_directory', loaded_directory()),
+        ('drug_formulary', loaded_formulary())
+    ))
+    process = process_memory()
+    accounted = sum(entry['bytes'] for entry in subsystems.values() if entry is not None)
+    return {
+        'process': process,
+        'subsystems': subsystems,
+        'accounted_bytes': accounted,
+        # Interpreter, libraries, native allocations and fragmentation
+        'unaccounted_bytes': process['rss_bytes'] - accounted if process['rss_bytes'] is not None else None,
+        'gc': gc_counts(),
+        'tracemalloc': TRACER.status(),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }, 200
+
+def trace_args(req):
+    """Parse group_by and limit for allocation statistics. Returns: (group_by, limit)"""
+    group_by = req.args.get('group_by') or 'lineno'
+    if group_by not in GROUP_BY:
+        raise ApiError(f"group_by must be one of: {', '.join(GROUP_BY)}.", 400)
+    try:
+        limit = int(req.args.get('limit') or DEFAULT_TOP)
+    except ValueError:
+        raise ApiError("limit must be a number.", 400)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ApiError(f"limit must be between 1 and {MAX_PAGE_SIZE}.", 400)
+    return group_by, limit
+
+def snapshot_id_arg(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(f"{name} must be a snapshot id.", 400)
+
+def start_tracemalloc(req):
+    """
+    Admin: start tracing allocations. Tracing slows every allocation down
+    until it is stopped with DELETE.
+    Query params: frames (traceback depth, default 1)
+    """
+    require_memory_debug(req)
+    try:
+        frames = int(req.args.get('frames') or 1)
+    except ValueError:
+        raise ApiError("frames must be a number.", 400)
+    if not 1 <= frames <= 100:
+        raise ApiError("frames must be between 1 and 100.", 400)
+    started = TRACER.start(frames)
+    return dict(TRACER.status(), started=started), 200
+
+def stop_tracemalloc(req):
+    """Admin: stop tracing allocations and drop the snapshots."""
+    require_memory_debug(req)
+    TRACER.stop()
+    return TRACER.status(), 200
+
+def take_memory_snapshot(req):
+    """
+    Admin: snapshot the traced allocations and return its top sites.
+    Query params: group_by (lineno, filename, traceback), limit
+    """
+    require_memory_debug(req)
+    group_by, limit = trace_args(req)
+    try:
+        snapshot_id = TRACER.snapshot()
+    except RuntimeError as e:
+        raise ApiError(str(e), 409)
+    return {'snapshot_id': snapshot_id, 'group_by': group_by, 'top': TRACER.top(snapshot_id, group_by, limit)}, 200
+
+def get_memory_snapshot(req, snapshot_id):
+    """Admin: top allocation sites of a snapshot (group_by, limit as above)."""
+    require_memory_debug(req)
+    group_by, limit = trace_args(req)
+    snapshot_id = snapshot_id_arg(snapshot_id, 'snapshot_id')
+    try:
+        top = TRACER.top(snapshot_id, group_by, limit)
+    except KeyError:
+        return {"error": "Snapshot not found"}, 404
+    return {'snapshot_id': snapshot_id, 'group_by': group_by, 'top': top}, 200
+
+def diff_memory_snapshots(req):
+    """
+    Admin: allocation sites that grew or shrank most between two snapshots.
+    Query params: from (snapshot id), to (snapshot id; default: a new
+    snapshot taken now), group_by, limit
+    """
+    require_memory_debug(req)
+    group_by, limit = trace_args(req)
+    old_id = snapshot_id_arg(req.args.get('from'), 'from')
+    try:
+        new_id = snapshot_id_arg(req.args['to'], 'to') if req.args.get('to') else TRACER.snapshot()
+    except RuntimeError as e:
+        raise ApiError(str(e), 409)
+    try:
+        changes = TRACER.diff(old_id, new_id, group_by, limit)
+    except KeyError:
+        return {"error": "Snapshot not found"}, 404
+    return {'from': old_id, 'to': new_id, 'group_by': group_by, 'changes': changes}, 200
+
+def list_diseases(req):
+    """List all supported diseases"""
+    diseases = {
+        "diabetes": "Diabetes Mellitus",
+        "cardio": "Cardiovascular Disease",
+        "respiratory": "Respiratory Disorders",
+        "cancer": "Cancer Detection",
+        "thyroid": "Thyroid Disorders",
+        "kidney": "Kidney Disease",
+        "liver": "Liver Disease"
+    }
+    return diseases, 200
+
+# Path parameters use Flask's <name> syntax
+ROUTES = [
+    Route('POST', '/predict', predict),
+    Route('POST', '/predict/batch', predict_batch),
+    Route('GET', '/api/patients', get_patients),
+    Route('POST', '/api/patients/import', bulk_import_patients),
+    Route('GET', '/api/patients/export', export_patients),
+    Route('GET', '/api/patients/<patient_id>', get_patient_details),
+    Route('DELETE', '/api/patients/<patient_id>', delete_patient),
+    Route('POST', '/api/patients/<patient_id>/outcome', confirm_outcome),
+    Route('GET', '/api/stats', get_statistics),
+    Route('GET', '/api/stats/timeseries', get_statistics_timeseries),
+    Route('GET', '/api/providers', search_providers),
+    Route('GET', '/api/drugs', search_drugs),
+    Route('GET', '/api/vitals/latest', get_vitals_latest),
+    Route('GET', '/api/vitals/<patient_id>', get_vitals_range),
+    Route('GET', '/api/vitals/<patient_id>/rolling', get_vitals_rolling),
+    Route('GET', '/api/vitals/<patient_id>/slope', get_vitals_slope),
+    Route('GET', '/health', health_check),
+    Route('GET', '/ready', readiness_check),
+    Route('GET', '/diseases', list_diseases),
+    Route('GET', '/admin/models', get_model_registry),
+    Route('POST', '/admin/models/reload', reload_model_registry),
+    Route('GET', '/admin/shadow', get_shadow_stats),
+    Route('DELETE', '/admin/shadow', reset_shadow_stats),
+    Route('POST', '/admin/patients/merge', merge_duplicate_patients),
+    Route('GET', '/admin/training', get_training_status),
+    Route('POST', '/admin/training/run', run_training),
+    Route('GET', '/admin/memory', get_memory_usage),
+    Route('POST', '/admin/memory/tracemalloc', start_tracemalloc),
+    Route('DELETE', '/admin/memory/tracemalloc', stop_tracemalloc),
+    Route('POST', '/admin/memory/snapshots', take_memory_snapshot),
+    Route('GET', '/admin/memory/snapshots/diff', diff_memory_snapshots),
+    Route('GET', '/admin/memory/snapshots/<snapshot_id>', get_memory_snapshot),
+]
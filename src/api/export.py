@@ -0,0 +1,220 @@
+"""
+Flat exports of stored patient records for analytics.
+
+Every visit of every patient becomes one row per detected disease (one row
+with empty disease columns when nothing was detected), with the patient
+and visit fields repeated, so the output has a fixed set of COLUMNS
+whatever the report shape. Rows are generated lazily from a list of
+records and encoded CHUNK_ROWS at a time, so an export never holds more
+than one chunk (or one Parquet row group) of output in memory.
+
+Parquet needs pyarrow; CSV and JSON Lines have no extra dependencies.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from operator import itemgetter
+
+from api.serialization import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# --- Configuration ---
+CHUNK_ROWS = 1000             # rows per streamed CSV/JSONL chunk
+PARQUET_ROW_GROUP = 20000     # rows per Parquet row group
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# (column, Parquet type)
+COLUMNS = (
+    ('patient_id', 'string'),
+    ('name', 'string'),
+    ('age', 'int64'),
+    ('gender', 'string'),
+    ('phone', 'string'),
+    ('visit', 'int64'),               # 1 = first visit
+    ('visit_count', 'int64'),
+    ('timestamp', 'string'),          # ISO 8601, local time like the rest of the API
+    ('symptoms', 'string'),
+    ('health_data', 'string'),        # JSON object
+    ('primary_diagnosis', 'string'),
+    ('overall_risk', 'float64'),
+    ('detection_mode', 'string'),
+    ('disease_type', 'string'),
+    ('disease_name', 'string'),
+    ('final_risk_score', 'float64'),
+    ('ml_model_score', 'float64'),
+    ('risk_category', 'string'),
+    ('matched_symptoms', 'string'),   # "; "-separated
+    ('model_used', 'bool_'),
+    ('model_version', 'string')
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+_row_values = itemgetter(*COLUMN_NAMES)
+
+_NO_DISEASE = dict.fromkeys(('disease_type', 'disease_name', 'final_risk_score', 'ml_model_score',
+                             'risk_category', 'matched_symptoms', 'model_used', 'model_version'))
+
+
+def _age(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _disease_fields(disease):
+    symptoms = disease.get('matched_symptoms', disease.get('detected_symptoms'))
+    return {
+        'disease_type': disease.get('disease_type'),
+        'disease_name': disease.get('disease_name'),
+        'final_risk_score': disease.get('final_risk_score'),
+        'ml_model_score': disease.get('ml_model_score'),
+        'risk_category': disease.get('risk_category'),
+        'matched_symptoms': '; '.join(symptoms) if symptoms else None,
+        'model_used': disease.get('model_used'),
+        'model_version': disease.get('model_version')
+    }
+
+
+def record_rows(record, start=None, end=None, risk=None):
+    """
+    Yield the export rows of one PatientRecord.
+    start/end: epoch seconds bounding the visit time; risk: predicate on a visit's overall risk
+    """
+    # Same defaults as the detail view (PatientRecord.to_dict), except that
+    # age stays a number column: a missing age is null, not 'N/A'
+    patient = {
+        'patient_id': record.patient_id,
+        'name': record.name,
+        'age': _age(record.age),
+        'gender': record.gender,
+        'phone': record.phone,
+        'visit_count': record.visit_count
+    }
+    for number, visit in enumerate((*record.history, record.visit_state()), start=1):
+        if (start is not None and visit['ts'] < start) or (end is not None and visit['ts'] > end):
+            continue
+        if risk is not None and not risk(visit['risk']):
+            continue
+        report = visit['report']
+        row = dict(
+            patient,
+            visit=number,
+            timestamp=datetime.fromtimestamp(visit['ts']).isoformat(),
+            symptoms=visit['symptoms'],
+            health_data=json.dumps(visit['health'], default=str) if visit['health'] else None,
+            primary_diagnosis=visit['dx'],
+            overall_risk=visit['risk'],
+            detection_mode=report.get('detection_mode'),
+            **_NO_DISEASE
+        )
+        # Auto-detection reports list diseases; single-disease reports are the disease
+        if 'detected_diseases' in report:
+            diseases = report['detected_diseases']
+        else:
+            diseases = [report] if 'disease_type' in report else []
+        if not diseases:
+            yield row
+        for disease in diseases:
+            yield dict(row, **_disease_fields(disease))
+
+
+def export_rows(records, start=None, end=None, risk=None):
+    for record in records:
+        yield from record_rows(record, start, end, risk)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for batch in _batches(rows, CHUNK_ROWS):
+        writer.writerows(map(_row_values, batch))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')  # Header only: no rows matched
+
+
+def jsonl_chunks(rows):
+    for batch in _batches(rows, CHUNK_ROWS):
+        yield b''.join(dumps(dict(zip(COLUMN_NAMES, _row_values(row)))) + b'\n' for row in batch)
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter that hands out what was written so far."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(rows):
+    schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in COLUMNS])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema, compression='zstd')
+    for batch in _batches(rows, PARQUET_ROW_GROUP):
+        columns = {name: [row[name] for row in batch] for name in COLUMN_NAMES}
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def supports(export_format):
+    """False for formats whose optional dependency is missing."""
+    return export_format != 'parquet' or pyarrow is not None
+
+
+def export_chunks(export_format, rows):
+    """Encode rows in EXPORT_FORMATS[export_format]. Returns: iterator of bytes"""
+    if export_format == 'csv':
+        return csv_chunks(rows)
+    if export_format == 'jsonl':
+        return jsonl_chunks(rows)
+    return parquet_chunks(rows)
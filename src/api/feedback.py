@@ -0,0 +1,294 @@
+"""
+Confirmed outcomes and the background job that learns from them.
+
+POST /api/patients/<id>/outcome attaches a confirmed diagnosis (0/1 for
+one disease) to a visit of a stored patient. The OutcomeLog keeps the
+label together with the model features of that visit, so training never
+needs the record again (it may have been archived by then). It is an
+append-only JSON-lines file; deleting a patient appends a tombstone that
+drops their outcomes.
+
+FeedbackTrainer periodically extends each disease's model with the
+outcomes confirmed since its last update (ml/incremental.py) and hot
+reloads it. One patient in HOLDOUT_EVERY is never trained on: their
+outcomes, with train.py's hold-out split of the original dataset, are the
+validation sets, and an update that makes either worse is not published.
+Run the job in one worker process only (FEEDBACK_TRAIN_INTERVAL=0 on the
+others); they pick up the new model files through their model watchers.
+    FEEDBACK_TRAIN_INTERVAL   seconds between runs (default 3600; 0 disables)
+    FEEDBACK_MIN_ROWS         new trainable outcomes needed for an update (default 50)
+    FEEDBACK_ROUNDS           trees added per update (default 20)
+    FEEDBACK_TOLERANCE        accepted relative increase in validation log loss (default 0.01)
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+
+from api.serialization import dumps, loads
+from ml import predict
+from ml.registry import ARTIFACTS, read_pickled
+
+# --- Configuration ---
+FEEDBACK_TRAIN_INTERVAL = float(os.environ.get('FEEDBACK_TRAIN_INTERVAL', '3600'))
+FEEDBACK_MIN_ROWS = int(os.environ.get('FEEDBACK_MIN_ROWS', '50'))
+FEEDBACK_ROUNDS = int(os.environ.get('FEEDBACK_ROUNDS', '20'))
+FEEDBACK_TOLERANCE = float(os.environ.get('FEEDBACK_TOLERANCE', '0.01'))
+HOLDOUT_EVERY = 5          # 1 patient in 5 is kept for validation
+MIN_VALIDATION_ROWS = 20   # fewer held-out outcomes are not used for validation
+
+# Diseases with a trainable model
+OUTCOME_DISEASES = tuple(ARTIFACTS)
+
+
+def is_holdout(patient_id):
+    """Stable per patient, so all of a patient's visits fall on the same side."""
+    return int(hashlib.sha256(patient_id.encode()).hexdigest()[:8], 16) % HOLDOUT_EVERY == 0
+
+
+def model_features(disease_type, health_data):
+    """
+    The numeric model features present in a visit's health_data.
+    Returns: (features dict, True if every required feature is present)
+    """
+    config = predict.FEATURE_CONFIGS[disease_type]
+    features = {}
+    for key in config['features']:
+        try:
+            features[key] = float(health_data[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return features, all(key in features for key in config['required'])
+
+
+class OutcomeLog:
+    """Confirmed outcomes by (patient, disease, visit); the newest label of a visit wins."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._outcomes = {}   # (patient_id, disease_type, visit_ts) -> entry
+        self._trained = {}    # disease_type -> {'through': confirmed_at, 'version': ...}
+        self._file = None
+
+    def open(self):
+        """Load the logged outcomes and append new ones to the file (in memory only without a path)."""
+        if self.path and self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._load()
+            self._file = open(self.path, 'ab')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    self._apply(loads(line))
+
+    def _apply(self, entry):
+        if 'forget' in entry:
+            for key in [key for key in self._outcomes if key[0] == entry['forget']]:
+                del self._outcomes[key]
+        elif 'trained' in entry:
+            self._trained[entry['trained']] = {'through': entry['through'], 'version': entry['version']}
+        else:
+            self._outcomes[(entry['patient_id'], entry['disease_type'], entry['visit_ts'])] = entry
+
+    def _append(self, entry):
+        with self._lock:
+            self._apply(entry)
+            if self._file is not None:
+                self._file.write(dumps(entry) + b'\n')
+                self._file.flush()
+
+    def add(self, entry):
+        """Record an outcome entry (see confirm_outcome() in api/endpoints.py)."""
+        self._append(entry)
+
+    def forget(self, patient_id):
+        """Drop every outcome of a deleted patient."""
+        with self._lock:
+            known = any(key[0] == patient_id for key in self._outcomes)
+        if known:
+            self._append({'forget': patient_id})
+
+    def mark_trained(self, disease_type, through, version):
+        """Outcomes confirmed up to `through` are in model `version`."""
+        self._append({'trained': disease_type, 'through': through, 'version': version, 'at': time.time()})
+
+    def trained(self, disease_type):
+        """Returns: {'through', 'version'} of the last published update, or None"""
+        return self._trained.get(disease_type)
+
+    def labeled(self, disease_type):
+        """Trainable outcomes for a disease, oldest confirmation first."""
+        with self._lock:
+            entries = [entry for entry in self._outcomes.values()
+                       if entry['disease_type'] == disease_type and entry['trainable']]
+        return sorted(entries, key=lambda entry: entry['confirmed_at'])
+
+    def for_patient(self, patient_id):
+        with self._lock:
+            return [entry for key, entry in self._outcomes.items() if key[0] == patient_id]
+
+    def __len__(self):
+        return len(self._outcomes)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class FeedbackTrainer:
+    """Background job that continues training the models on confirmed outcomes."""
+
+    def __init__(self, outcomes, watcher, interval=FEEDBACK_TRAIN_INTERVAL, min_rows=FEEDBACK_MIN_ROWS,
+                 rounds=FEEDBACK_ROUNDS, tolerance=FEEDBACK_TOLERANCE):
+        self.outcomes = outcomes
+        self.watcher = watcher     # api.model_watch.ModelWatcher that publishes the new files
+        self.interval = interval
+        self.min_rows = min_rows
+        self.rounds = rounds
+        self.tolerance = tolerance
+        self.running = False
+        self.last_run = {}         # disease -> result of its last train()
+        self._attempted = {}       # disease -> newest confirmed_at of a rejected update
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def train(self, disease_type):
+        """
+        Extend one disease's model with its new outcomes, validate and publish.
+        Returns: result dict; 'status' is published, rejected, failed or skipped
+        """
+        from ml.incremental import (continue_training, dataset_holdout, feature_matrix, restore_model,
+                                    validate, write_model)
+
+        entries = self.outcomes.labeled(disease_type)
+        trained = self.outcomes.trained(disease_type)
+        through = trained['through'] if trained else 0
+        new = [e for e in entries if not is_holdout(e['patient_id']) and e['confirmed_at'] > through]
+        holdout = [e for e in entries if is_holdout(e['patient_id'])]
+        result = {'disease_type': disease_type, 'at': time.time(), 'new_outcomes': len(new),
+                  'holdout_outcomes': len(holdout)}
+
+        if len(new) < self.min_rows:
+            return dict(result, status='skipped', reason=f"{len(new)} new outcomes, {self.min_rows} needed")
+        if len({e['outcome'] for e in new}) < 2:
+            return dict(result, status='skipped', reason="new outcomes are all of one class")
+        newest = new[-1]['confirmed_at']
+        if self._attempted.get(disease_type) == newest:
+            return dict(result, status='skipped', reason="no new outcomes since the last rejected update")
+        try:
+            blobs, version = read_pickled(predict.MODEL_DIR, disease_type)
+        except FileNotFoundError:
+            return dict(result, status='skipped', reason="no pickled model to continue from")
+
+        import joblib
+
+        model = joblib.load(io.BytesIO(blobs[0]))
+        scaler = joblib.load(io.BytesIO(blobs[1]))   # reused as fitted
+        X = scaler.transform(feature_matrix(disease_type, [e['features'] for e in new]))
+        try:
+            updated = continue_training(model, X, [e['outcome'] for e in new], self.rounds)
+        except TypeError as e:
+            return dict(result, status='skipped', reason=str(e))
+
+        validation_sets = []
+        if len(holdout) >= MIN_VALIDATION_ROWS:
+            X_holdout = scaler.transform(feature_matrix(disease_type, [e['features'] for e in holdout]))
+            validation_sets.append(('feedback_holdout', X_holdout, [e['outcome'] for e in holdout]))
+        original = dataset_holdout(disease_type)
+        if original is not None:
+            validation_sets.append(('dataset_holdout', scaler.transform(original[0]), original[1]))
+        accepted, report = validate(model, updated, validation_sets, self.tolerance)
+        result.update(base_version=version, validation=report)
+        if not accepted:
+            self._attempted[disease_type] = newest
+            reason = "validation log loss regressed" if validation_sets else "no validation data"
+            return dict(result, status='rejected', reason=reason)
+
+        try:
+            new_version, previous_compiled = write_model(
+                predict.MODEL_DIR, disease_type, updated, scaler, blobs[1], blobs[0], version)
+        except TypeError as e:
+            return dict(result, status='skipped', reason=str(e))
+        try:
+            self.watcher.reload()
+        except Exception as e:
+            restore_model(predict.MODEL_DIR, disease_type, blobs[0], previous_compiled)
+            self._attempted[disease_type] = newest
+            return dict(result, status='failed', reason=f"{type(e).__name__}: {e}")
+        self.outcomes.mark_trained(disease_type, newest, new_version)
+        print(f"✅ {new_version} published: {version} continued on {len(new)} confirmed outcomes.")
+        return dict(result, status='published', version=new_version)
+
+    def run_once(self):
+        """Train every disease with enough new outcomes. Returns: {disease: result}"""
+        with self._lock:
+            if self.running:
+                return {}
+            self.running = True
+        return self._run()
+
+    def _run(self):
+        """Body of run_once(); the caller has set `running` under the lock."""
+        try:
+            for disease_type in OUTCOME_DISEASES:
+                try:
+                    self.last_run[disease_type] = self.train(disease_type)
+                except Exception as e:
+                    self.last_run[disease_type] = {'disease_type': disease_type, 'at': time.time(),
+                                                   'status': 'failed', 'reason': f"{type(e).__name__}: {e}"}
+                    print(f"⚠️ WARNING: Training {disease_type} on outcomes failed: {e}")
+            return dict(self.last_run)
+        finally:
+            self.running = False
+
+    def run_async(self):
+        """Run run_once() in a background thread. Returns: False if a run is already in progress"""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+        threading.Thread(target=self._run, name="feedback-train", daemon=True).start()
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="feedback-train", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        diseases = {}
+        for disease_type in OUTCOME_DISEASES:
+            entries = self.outcomes.labeled(disease_type)
+            trained = self.outcomes.trained(disease_type)
+            through = trained['through'] if trained else 0
+            diseases[disease_type] = {
+                'trainable_outcomes': len(entries),
+                'positive': sum(e['outcome'] for e in entries),
+                'pending': sum(1 for e in entries if not is_holdout(e['patient_id']) and e['confirmed_at'] > through),
+                'last_update': trained,
+                'last_run': self.last_run.get(disease_type)
+            }
+        return {
+            'train_interval': self.interval if self._thread is not None else None,
+            'running': self.running,
+            'min_rows': self.min_rows,
+            'rounds': self.rounds,
+            'tolerance': self.tolerance,
+            'outcomes': len(self.outcomes),
+            'diseases': diseases
+        }
@@ -0,0 +1,100 @@
+"""
+Drug formulary lookup for typeahead.
+
+Drugs are loaded once from FORMULARY_DB_PATH. Every drug is indexed under
+its full lowercased name and under each later word of the name, so
+"sema" finds "Ozempic (Semaglutide)". Each (class, in_formulary) filter
+combination, including "any", has its own sorted key array, so a query is
+a hash lookup on the filters plus a bisect on the prefix. The keys matching
+the prefix are in word order, not name order, so the hits are ranked by
+name before the limit is applied: the cost grows with the number of
+matches (all of them for an empty prefix), not with the formulary size.
+"""
+import bisect
+import heapq
+import os
+import re
+import threading
+
+from api.serialization import loads
+
+# --- Configuration ---
+FORMULARY_DB_PATH = os.environ.get(
+    "FORMULARY_DB_PATH", os.path.join(os.path.dirname(__file__), "mock_drug_db.json"))
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+
+def name_keys(name):
+    """Index keys for a drug name: the full name plus every later word."""
+    name = (name or "").strip().lower()
+    return [name] + _WORD.findall(name)[1:]
+
+
+class Formulary:
+    """In-memory formulary with a sorted name index per class / in_formulary filter."""
+
+    def __init__(self, drugs):
+        self.drugs = drugs
+        self._sort_names = [(drug.get('name') or '').strip().lower() for drug in drugs]
+        entries = sorted(
+            (key, i) for i, drug in enumerate(drugs) for key in name_keys(drug.get('name'))
+        )
+
+        # (class or None, in_formulary or None) -> (sorted keys, drug indexes)
+        buckets = {}
+        for key, i in entries:
+            drug = drugs[i]
+            drug_class = (drug.get('class') or '').lower()
+            listed = bool(drug.get('in_formulary'))
+            for bucket in ((None, None), (drug_class, None), (None, listed), (drug_class, listed)):
+                keys, indexes = buckets.setdefault(bucket, ([], []))
+                keys.append(key)
+                indexes.append(i)
+        self._indexes = buckets
+        self.classes = sorted({drug['class'] for drug in drugs if drug.get('class')})
+
+    @classmethod
+    def load(cls, path=FORMULARY_DB_PATH):
+        with open(path, "rb") as f:
+            return cls(loads(f.read()))
+
+    def __len__(self):
+        return len(self.drugs)
+
+    def search(self, prefix=None, drug_class=None, in_formulary=None, limit=DEFAULT_LIMIT):
+        """
+        Drugs whose name (or a later word of it) starts with `prefix`, in name order.
+        drug_class is matched case-insensitively; in_formulary is True, False or None.
+        """
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        bucket = ((drug_class or '').lower() or None, in_formulary)
+        keys, indexes = self._indexes.get(bucket, ((), ()))
+        prefix = (prefix or '').strip().lower()
+
+        matched = set()
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            matched.add(indexes[position])
+            position += 1
+        first = heapq.nsmallest(limit, matched, key=lambda i: (self._sort_names[i], i))
+        return [self.drugs[i] for i in first]
+
+
+_formulary = None
+_formulary_lock = threading.Lock()
+
+def get_formulary():
+    """Load the formulary on first use."""
+    global _formulary
+    if _formulary is None:
+        with _formulary_lock:
+            if _formulary is None:
+                _formulary = Formulary.load()
+    return _formulary
+
+def loaded_formulary():
+    """The formulary, or None if nothing has used it yet (does not load it)."""
+    return _formulary
@@ -0,0 +1,90 @@
+"""
+Returning-patient identity index.
+
+Maps a hash of the normalized name + phone in patient_info to the ID of
+the person's record, so a new assessment of someone already on file is
+attached to their record as another visit (PatientRecord.merge) instead
+of creating a new patient. Only the digest is kept in the index. Records
+without both a usable name and phone number are never matched.
+"""
+import hashlib
+import re
+from operator import itemgetter
+import threading
+import unicodedata
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+_NON_DIGIT = re.compile(r"\D+")
+# Significant trailing digits of a phone number: drops country codes and
+# trunk prefixes ("+1 (555) 010-2233" and "555-010-2233" match)
+PHONE_DIGITS = 10
+MIN_PHONE_DIGITS = 7
+
+
+def normalize_name(name):
+    """Case-, accent-form-, punctuation- and whitespace-insensitive form of a name."""
+    if not isinstance(name, str):
+        return ''
+    return ' '.join(_NON_ALNUM.sub(' ', unicodedata.normalize('NFKC', name).casefold()).split())
+
+def normalize_phone(phone):
+    digits = _NON_DIGIT.sub('', str(phone)) if phone is not None else ''
+    return digits[-PHONE_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else ''
+
+def identity_key(patient_info):
+    """Digest identifying a person, or None if patient_info lacks a name or phone."""
+    if not isinstance(patient_info, dict):
+        return None
+    name = normalize_name(patient_info.get('name'))
+    phone = normalize_phone(patient_info.get('phone'))
+    if not name or not phone or name == 'anonymous':
+        return None
+    return hashlib.sha256(f"{name}\x1f{phone}".encode()).hexdigest()[:32]
+
+
+class IdentityIndex:
+    """Thread-safe identity key -> patient ID map."""
+
+    def __init__(self):
+        self._ids = {}    # identity key -> patient ID
+        self._keys = {}   # patient ID -> identity key
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def build(self, records, archived_states=()):
+        """Index stored records and archived record states; for duplicates the earliest wins."""
+        entries = [(record.created_at, record.patient_info, record.patient_id) for record in records]
+        entries.extend((state['ts'], state['info'], state['id']) for state in archived_states)
+        for _, patient_info, patient_id in sorted(entries, key=itemgetter(0)):
+            key = identity_key(patient_info)
+            if key is not None:
+                self.claim(key, patient_id)
+
+    def lookup(self, key):
+        return self._ids.get(key)
+
+    def claim(self, key, patient_id):
+        """Map `key` to `patient_id` unless it is taken. Returns: the ID the key maps to"""
+        with self._lock:
+            owner = self._ids.setdefault(key, patient_id)
+            if owner == patient_id:
+                self._keys[patient_id] = key
+            return owner
+
+    def forget(self, patient_id):
+        with self._lock:
+            key = self._keys.pop(patient_id, None)
+            if key is not None and self._ids.get(key) == patient_id:
+                del self._ids[key]
+
+
+def find_duplicates(records):
+    """Returns: lists of records of the same person (2+ each), oldest first"""
+    groups = {}
+    for record in records:
+        key = identity_key(record.patient_info)
+        if key is not None:
+            groups.setdefault(key, []).append(record)
+    return [sorted(group, key=lambda r: r.created_at) for group in groups.values() if len(group) > 1]
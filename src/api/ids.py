@@ -0,0 +1,39 @@
+"""
+Patient ID allocation.
+
+IDs are handed out from an in-memory counter under a small lock. The
+counter starts above the highest patient number the journal has ever
+recorded (PatientJournal.high_water, kept in snapshots and replayed from
+the log, so deleted and archived records count too), so IDs are unique
+and increasing across restarts.
+
+The data directory is owned by a single server process (see
+api/persistence.py), so no ID state is shared between processes. An ID
+whose record never reached the journal (the request failed, or the
+machine lost power before the next fsync) may be handed out again after
+a restart.
+"""
+import threading
+
+
+class IdAllocator:
+    """Thread-safe patient ID allocator ('P1001', 'P1002', ...)."""
+
+    def __init__(self, floor=1000, prefix="P"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._next = floor + 1  # Numbers <= floor are never handed out
+
+    def advance(self, number):
+        """Never hand out `number` or anything below it (e.g. IDs of imported records)."""
+        with self._lock:
+            self._next = max(self._next, number + 1)
+
+    def allocate_number(self):
+        with self._lock:
+            number = self._next
+            self._next += 1
+            return number
+
+    def allocate(self):
+        return f"{self.prefix}{self.allocate_number()}"
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Streaming bulk import of patient records.
+
+Accepts a JSON array or JSONL (one record per line) and parses it
+incrementally, so memory stays bounded by BATCH_SIZE records rather than
+the file size. Three record shapes are understood:
+  - the mock_db.json shape (name/age/gender/primary_diagnosis/last_seen/vitals),
+  - the legacy patient_record shape served by /api/patients/<id>,
+  - a /predict response (report keys plus patient_info/symptoms/health_data).
+
+Records are validated, then inserted with PatientStore.add_many() one batch
+at a time; the `on_batch` hook lets the caller update its indexes once per
+batch instead of once per record. A record without a patient ID that
+belongs to a patient already on file (see api/identity.py) is added to
+that patient's record as a visit instead.
+"""
+import codecs
+import contextlib
+import gc
+import io
+import json
+import time
+from datetime import datetime
+
+from api.records import PatientRecord
+from api.serialization import loads
+from api.vitals import check_vitals, parse_time
+
+# --- Configuration ---
+BATCH_SIZE = 1000
+CHUNK_SIZE = 1 << 16
+MAX_REPORTED_ERRORS = 20
+
+_WHITESPACE = b" \t\r\n"
+_PATIENT_INFO_KEYS = ('name', 'age', 'gender', 'phone')
+_RECORD_KEYS = {
+    'patient_id', 'patient_info', 'symptoms', 'health_data', 'primary_diagnosis', 'overall_risk',
+    'mock_risk', 'timestamp', 'last_seen', 'vitals', 'full_report', 'name', 'age', 'gender', 'phone'
+}
+
+
+# --- Streaming parsers ---
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array read from a binary stream."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace, the opening bracket and separators
+        while position < len(buffer):
+            char = buffer[position]
+            if char.isspace() or (started and char == ','):
+                position += 1
+            elif not started and char == '[':
+                started = True
+                position += 1
+            elif not started:
+                raise ValueError("Expected a JSON array")
+            elif char == ']':
+                return
+            else:
+                break
+
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # Only trust a value followed by a delimiter: a number at the
+                # end of the buffer may continue in the next chunk
+                if eof or (end < len(buffer) and buffer[end] in ',] \t\r\n'):
+                    position = end
+                    yield item
+                    continue
+        elif eof:
+            raise ValueError("Unterminated JSON array")
+
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + utf8.decode(chunk, final=eof)
+        position = 0
+
+
+def iter_jsonl(stream):
+    """Yield one JSON value per non-empty line of a binary stream."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield loads(line)
+
+
+def iter_items(stream, chunk_size=CHUNK_SIZE):
+    """Detect the format from the first non-blank byte: '[' is a JSON array, anything else JSONL."""
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    while True:
+        head = stream.peek(1)[:1]
+        if not head or head not in _WHITESPACE:
+            break
+        stream.read(1)
+    if head == b"[":
+        return iter_json_array(stream, chunk_size)
+    return iter_jsonl(stream)
+
+
+# --- Validation ---
+
+def parse_record(item):
+    """
+    Validate one imported item.
+    Returns: (PatientRecord, vitals dict or None); the record's patient_id may be None
+    Raises: ValueError with a message naming the problem
+    """
+    if not isinstance(item, dict):
+        raise ValueError("record must be a JSON object")
+    if not _RECORD_KEYS & item.keys() and 'detected_diseases' not in item:
+        raise ValueError("no recognised patient fields")
+
+    if isinstance(item.get('full_report'), dict):
+        report = dict(item['full_report'])
+    elif 'detected_diseases' in item or 'detection_mode' in item or 'final_risk_score' in item:
+        report = {k: v for k, v in item.items() if k not in _RECORD_KEYS}
+    else:
+        report = {'detection_mode': 'imported', 'detected_diseases': []}
+    for key in ('patient_info', 'patient_id', 'symptoms', 'health_data'):
+        report.pop(key, None)
+
+    patient_info = item.get('patient_info')
+    if patient_info is None:
+        patient_info = {k: item[k] for k in _PATIENT_INFO_KEYS if item.get(k) is not None}
+    if not isinstance(patient_info, dict):
+        raise ValueError("patient_info must be an object")
+    if 'age' in patient_info and not isinstance(patient_info['age'], (int, float)):
+        raise ValueError("age must be a number")
+
+    health_data = item.get('health_data') or {}
+    if not isinstance(health_data, dict):
+        raise ValueError("health_data must be an object")
+    symptoms = item.get('symptoms') or ''
+    if not isinstance(symptoms, str):
+        raise ValueError("symptoms must be a string")
+
+    diseases = report.get('detected_diseases') or ([report] if 'final_risk_score' in report else [])
+    risk = item.get('overall_risk', item.get('mock_risk'))
+    if risk is None:
+        risk = max((d.get('final_risk_score', 0) for d in diseases), default=0) / 100
+    if not isinstance(risk, (int, float)) or not 0 <= risk <= 1:
+        raise ValueError("overall_risk must be a number between 0 and 1")
+    primary_diagnosis = item.get('primary_diagnosis')
+    if primary_diagnosis is None:
+        primary_diagnosis = (max(diseases, key=lambda d: d.get('final_risk_score', 0)).get('disease_name', 'Unknown')
+                             if diseases else "No diagnosis")
+
+    vitals = item.get('vitals')
+    if vitals is not None:
+        check_vitals(vitals)
+        # Kept with the report so the readings are journaled with the record
+        report['vitals'] = vitals
+    seen = item.get('timestamp') or item.get('last_seen') or (vitals['timestamps'][-1] if vitals and vitals['timestamps'] else None)
+    try:
+        created_at = parse_time(seen)
+        if created_at is not None:
+            datetime.fromtimestamp(created_at)  # Representable, so it can be formatted later
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError(f"invalid timestamp {seen!r}")
+
+    patient_id = item.get('patient_id')
+    if patient_id is not None and (not isinstance(patient_id, str) or not patient_id or '/' in patient_id):
+        raise ValueError("patient_id must be a non-empty string without '/'")
+
+    record = PatientRecord(
+        patient_id=patient_id,
+        patient_info=patient_info,
+        symptoms=symptoms,
+        health_data=health_data,
+        primary_diagnosis=str(primary_diagnosis),
+        overall_risk=float(round(risk, 2)),
+        report=report,
+        created_at=created_at
+    )
+    return record, vitals
+
+
+# --- Import ---
+
+def import_records(items, store, allocate_id, on_batch=None, replace=False, batch_size=BATCH_SIZE,
+                   write_lock=None):
+    """
+    Validate and insert records from an iterable of parsed items.
+    Existing patient IDs are skipped unless `replace` is set; records without
+    an ID get one from `allocate_id(record)`: a new ID, or the ID of a known
+    patient, to whose record it is then merged as a visit.
+    `on_batch(entries, replaced)` is called after each inserted batch (and
+    each merged visit) with a list of (record, vitals) pairs and the stored
+    records they replaced, under `write_lock` (if given) together with the
+    writes it reports.
+    Returns: report dict with counts, sample errors and records_per_second
+    """
+    started = time.perf_counter()
+    imported = merged = skipped = failed = 0
+    errors = []
+    batch = []
+    batch_ids = set()
+    write_lock = write_lock or contextlib.nullcontext()
+
+    def flush():
+        nonlocal imported
+        if batch:
+            with write_lock:
+                replaced = store.add_many([record for record, _ in batch])
+                imported += len(batch)
+                if on_batch is not None:
+                    on_batch(batch, replaced)
+            batch.clear()
+            batch_ids.clear()
+            # Imported records are long-lived and acyclic: keep the cyclic GC
+            # from rescanning them on every collection (as PatientStore.open does)
+            gc.freeze()
+
+    items = iter(items)
+    position = -1
+    while True:
+        position += 1
+        # Only the parser's errors are caught here: a failure while writing or
+        # indexing a batch is not a parse error and propagates to the caller
+        try:
+            item = next(items)
+        except StopIteration:
+            break
+        except ValueError as e:
+            # Malformed JSON: keep what was imported so far and report where it stopped
+            errors.append({'index': position, 'error': f"parse error: {e}"})
+            failed += 1
+            break
+
+        try:
+            record, vitals = parse_record(item)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'index': position, 'error': str(e)})
+            continue
+
+        if record.patient_id is None:
+            record.patient_id = allocate_id(record)
+            if record.patient_id in batch_ids or store.get(record.patient_id) is not None:
+                # A returning patient: add the record as a visit
+                if record.patient_id in batch_ids:
+                    flush()
+                with write_lock:
+                    store.merge_add(record)
+                    if on_batch is not None:
+                        on_batch([(record, vitals)], [])
+                merged += 1
+                continue
+        elif not replace and (record.patient_id in batch_ids or store.get(record.patient_id) is not None):
+            skipped += 1
+            continue
+        if record.patient_id in batch_ids:
+            flush()  # Replacing a record from this batch: keep the order of writes
+        batch.append((record, vitals))
+        batch_ids.add(record.patient_id)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'merged': merged,
+        'skipped': skipped,
+        'failed': failed,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'records_per_second': round(imported / seconds) if seconds > 0 else imported
+    }
@@ -0,0 +1,213 @@
+"""
+Memory accounting for the API process.
+
+Nothing here runs unless an admin asks: there is no background sampling
+and tracemalloc stays off until started, so a server that never uses it
+pays nothing. The /admin/memory endpoints are additionally disabled
+unless MEMORY_DEBUG=1.
+
+deep_sizeof() walks an object graph (gc.get_referents) and adds up
+sys.getsizeof() of everything reachable, skipping modules, classes and
+functions. Passing one `seen` set through several calls counts an object
+shared between subsystems once, in the first. It is an estimate: memory
+allocated outside Python objects (e.g. xgboost boosters) is invisible,
+and walking a large store takes a while.
+
+AllocationTracer wraps tracemalloc: start it, take numbered snapshots,
+list the top allocation sites of one, or diff two to see what grew.
+    MEMORY_DEBUG   "1" enables the /admin/memory endpoints (default off)
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Configuration ---
+MEMORY_DEBUG = os.environ.get('MEMORY_DEBUG', '0') != '0'
+MAX_SNAPSHOTS = 8          # oldest snapshots are dropped beyond this
+DEFAULT_TRACE_FRAMES = 1   # frames per traceback; more is slower and bigger
+DEFAULT_TOP = 25
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Shared program structure, not data held by a subsystem
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                  types.MethodType, types.CodeType, types.FrameType)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Bytes held by `obj` and everything reachable from it, except objects
+    already in `seen` (ids; updated in place).
+    Returns: (bytes, objects counted)
+    """
+    seen = set() if seen is None else seen
+    size = count = 0
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        count += 1
+        pending.extend(gc.get_referents(obj))
+        if type(obj) is dict:
+            pending.extend(obj)  # String keys are not reported as referents
+    return size, count
+
+
+def account(subsystems):
+    """
+    Estimated size of each subsystem, in the given order.
+    subsystems: iterable of (name, object or None)
+    Returns: {name: {'bytes', 'objects'}} (None for a subsystem not loaded)
+    """
+    seen = set()
+    report = {}
+    for name, obj in subsystems:
+        if obj is None:
+            report[name] = None
+            continue
+        size, count = deep_sizeof(obj, seen)
+        report[name] = {'bytes': size, 'objects': count}
+    return report
+
+
+def gc_counts():
+    """
+    Objects tracked by the cyclic GC. Frozen objects (gc.freeze(), as after
+    a store load or an import) sit in the permanent generation, which
+    gc.get_objects() leaves out, so they are reported separately.
+    """
+    tracked = len(gc.get_objects())
+    frozen = gc.get_freeze_count()
+    return {
+        'tracked_objects': tracked + frozen,
+        'collectable_objects': tracked,
+        'frozen_objects': frozen,
+        'uncollectable': len(gc.garbage)
+    }
+
+
+def process_memory():
+    """Resident set size now and at its peak, in bytes (None where unknown)."""
+    rss = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    value = int(line.split()[1]) * 1024
+                    if line.startswith('VmRSS:'):
+                        rss = value
+                    else:
+                        peak = value
+    except OSError:
+        pass
+    if peak is None and resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024
+    return {'rss_bytes': rss, 'peak_rss_bytes': peak}
+
+
+def _site(frame):
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def _stat_dict(stat, group_by):
+    entry = {
+        'site': _site(stat.traceback[0]),
+        'size_bytes': stat.size,
+        'count': stat.count
+    }
+    if group_by == 'filename':
+        entry['site'] = stat.traceback[0].filename
+    elif group_by == 'traceback':
+        entry['traceback'] = [_site(frame) for frame in stat.traceback]
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_bytes'] = stat.size_diff
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+
+class AllocationTracer:
+    """tracemalloc on demand, with a bounded set of numbered snapshots."""
+
+    def __init__(self, max_snapshots=MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()   # id -> (taken_at, filtered Snapshot)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, frames=DEFAULT_TRACE_FRAMES):
+        """Returns: False if tracemalloc was already tracing"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        return True
+
+    def stop(self):
+        """Stop tracing and drop the snapshots (they hold a copy of every trace)."""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def snapshot(self):
+        """
+        Take and keep a snapshot.
+        Returns: snapshot id
+        Raises: RuntimeError if tracemalloc is not tracing
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first.")
+        taken = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ))
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (time.time(), taken)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    def _get(self, snapshot_id):
+        """Raises: KeyError for an unknown (or dropped) snapshot"""
+        with self._lock:
+            return self._snapshots[snapshot_id][1]
+
+    def top(self, snapshot_id, group_by='lineno', limit=DEFAULT_TOP):
+        """Largest allocation sites of a snapshot. Raises: KeyError"""
+        stats = self._get(snapshot_id).statistics(group_by)
+        return [_stat_dict(stat, group_by) for stat in stats[:limit]]
+
+    def diff(self, old_id, new_id, group_by='lineno', limit=DEFAULT_TOP):
+        """Sites whose allocations changed most between two snapshots. Raises: KeyError"""
+        stats = self._get(new_id).compare_to(self._get(old_id), group_by)
+        return [_stat_dict(stat, group_by) for stat in stats[:limit]]
+
+    def status(self):
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshots = [{'id': snapshot_id, 'taken_at': taken_at}
+                         for snapshot_id, (taken_at, _) in self._snapshots.items()]
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else None,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+            'snapshots': snapshots
+        }
@@ -0,0 +1,111 @@
+"""
+Hot reload of model artifacts.
+
+ModelWatcher polls the artifact files in MODEL_DIR (size and mtime only)
+and, when they change, calls ml.predict.reload_models() from its own
+thread: the new models are loaded, smoke-tested and swapped in while
+requests keep being scored by the current versions. An artifact that fails
+to load or validate is not retried until its files change again.
+POST /admin/models/reload runs the same reload on demand.
+    MODEL_WATCH_INTERVAL   seconds between polls (default 5; 0 disables the watcher)
+"""
+import os
+import threading
+import time
+
+from ml import predict
+from ml.registry import scan_signatures
+
+# --- Configuration ---
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', '5'))
+
+
+class ModelWatcher:
+    """Reloads the model registry when the files in MODEL_DIR change."""
+
+    def __init__(self, interval=MODEL_WATCH_INTERVAL):
+        self.interval = interval
+        self.reloads = 0
+        self.last_reload = None   # result of the last reload_models() that published something
+        self.last_error = None
+        self.reloading = False
+        self._rejected = None     # signatures of artifacts that failed to load
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self):
+        """
+        Reload now. Returns: reload_models() result
+        Raises: the load or validation error (the current models stay in place)
+        """
+        try:
+            result = predict.reload_models()
+        except Exception as e:
+            self.last_error = {'at': time.time(), 'error': f"{type(e).__name__}: {e}"}
+            print(f"⚠️ WARNING: Model reload failed, keeping current models: {self.last_error['error']}")
+            raise
+        if result['reloaded']:
+            self.reloads += 1
+            self.last_reload = dict(result, at=time.time())
+        return result
+
+    def reload_async(self):
+        """Run reload() in a background thread. Returns: False if a reload is already running"""
+        with self._lock:
+            if self.reloading:
+                return False
+            self.reloading = True
+        threading.Thread(target=self._reload_in_background, name="model-reload", daemon=True).start()
+        return True
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        except Exception:
+            pass  # Recorded in last_error
+        finally:
+            self.reloading = False
+
+    def check(self):
+        """Reload if the artifacts changed since the published registry. Returns: True if reloaded"""
+        registry = predict.current_registry()
+        if registry is None:
+            return False  # Nothing loaded yet: the first load reads the current files anyway
+        signatures = scan_signatures(predict.MODEL_DIR)
+        if signatures == registry.signatures or signatures == self._rejected:
+            return False
+        try:
+            return bool(self.reload()['reloaded'])
+        except Exception:
+            self._rejected = signatures
+            return False
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="model-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        registry = predict.current_registry()
+        return {
+            'registry': registry.describe() if registry is not None else None,
+            'watch_interval': self.interval if self._thread is not None else None,
+            'reloading': self.reloading,
+            'reloads': self.reloads,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error
+        }
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer: warm this process's models and keep them current."""
+    predict.warm_up()
+    if MODEL_WATCH_INTERVAL > 0:
+        ModelWatcher().start()
@@ -0,0 +1,314 @@
+"""
+Append-only journal of patient inserts/deletes with periodic snapshots.
+
+Layout of the data directory:
+    wal-<generation>.log        one JSON op per line ({"op": "put"|"merge"|"del", ...});
+                                a merge holds only the new visit(s) of a patient
+    snapshot-<generation>.jsonl full state *before* wal-<generation>.log
+
+Every write is a single append + flush; a background thread fsyncs the
+log every FSYNC_INTERVAL seconds (group commit), so at most that window
+of writes can be lost on power failure. After SNAPSHOT_EVERY ops the log
+is rotated and a compacted snapshot is written in the background; older
+logs and snapshots are then removed. Startup loads the newest snapshot and
+replays the logs that follow it.
+
+The data directory belongs to one process: from recover() until close()
+the journal holds an exclusive OS lock on its journal.lock file, and a
+second process (or a second journal in the same process) fails fast with
+DataDirectoryLocked instead of interleaving its writes and snapshots with
+the owner's. Creating a journal touches nothing on disk.
+"""
+import glob
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from api.serialization import dumps, loads
+from api.records import PatientRecord, patient_id_number
+
+# --- Configuration ---
+FSYNC_INTERVAL = float(os.environ.get("WAL_FSYNC_INTERVAL", 0.05))
+SNAPSHOT_EVERY = int(os.environ.get("WAL_SNAPSHOT_EVERY", 100000))
+
+LOCK_NAME = "journal.lock"
+
+_WAL_NAME = re.compile(r"wal-(\d+)\.log$")
+_SNAPSHOT_NAME = re.compile(r"snapshot-(\d+)\.jsonl$")
+
+
+def _generation_files(directory, pattern):
+    """Returns: sorted list of (generation, path) for files matching `pattern`."""
+    files = []
+    for path in glob.glob(os.path.join(directory, "*")):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            files.append((int(match.group(1)), path))
+    return sorted(files)
+
+
+class DataDirectoryLocked(RuntimeError):
+    """The data directory is already open in another journal."""
+
+
+def _lock_directory(directory):
+    """
+    Exclusive, non-blocking OS-level lock on a data directory.
+    Returns: the open lock file; closing it releases the lock
+    Raises: DataDirectoryLocked if another process (or journal) holds it
+    """
+    f = open(os.path.join(directory, LOCK_NAME), "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise DataDirectoryLocked(
+            f"Patient data directory {directory} is in use by another process; "
+            "run a single server process per PATIENT_DATA_DIR.") from None
+    return f
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class PatientJournal:
+    """Write-ahead log + snapshots for the patient store."""
+
+    def __init__(self, directory, fsync_interval=FSYNC_INTERVAL, snapshot_every=SNAPSHOT_EVERY):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.high_water = 0  # Highest generated patient number ever written
+
+        self._lock = threading.Lock()       # Guards appends and the open file
+        self._sync_lock = threading.Lock()  # Serializes fsync and rotation
+        self._file = None
+        self._generation = 0
+        self._dirty = False
+        self._ops_since_snapshot = 0
+        self._state_provider = None
+        self._snapshot_thread = None
+        self._stop = threading.Event()
+        self._flusher = None
+        self._directory_lock = None
+
+    # --- Recovery ---
+
+    def recover(self):
+        """
+        Take the data directory, load the newest snapshot and replay the log tail.
+        Returns: dict of patient_id -> state, in insertion order
+        Raises: DataDirectoryLocked
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._directory_lock = _lock_directory(self.directory)
+        states = {}
+        start_generation = 0
+
+        for generation, path in reversed(_generation_files(self.directory, _SNAPSHOT_NAME)):
+            loaded = self._read_snapshot(path)
+            if loaded is not None:
+                states, self.high_water = loaded
+                start_generation = generation
+                break
+
+        last_generation = start_generation
+        for generation, path in _generation_files(self.directory, _WAL_NAME):
+            last_generation = max(last_generation, generation)
+            if generation >= start_generation:
+                self._replay_log(path, states)
+
+        # Always start a fresh log so a torn tail is never appended to
+        self._open_generation(last_generation + 1)
+        return states
+
+    def _read_snapshot(self, path):
+        try:
+            with open(path, "rb") as f:
+                header = loads(f.readline())
+                states = {}
+                for line in f:
+                    state = loads(line)
+                    states[state["id"]] = state
+        except (OSError, ValueError, KeyError):
+            print(f"⚠️ WARNING: Ignoring unreadable snapshot {path}")
+            return None
+        if len(states) != header.get("count", len(states)):
+            print(f"⚠️ WARNING: Ignoring incomplete snapshot {path}")
+            return None
+        return states, header.get("high_water", 0)
+
+    def _replay_log(self, path, states):
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    break  # Torn write at the tail of a crashed log
+                patient_id = entry.get("id")
+                self._track_id(patient_id)
+                if entry.get("op") == "put":
+                    states.pop(patient_id, None)
+                    states[patient_id] = entry["state"]
+                elif entry.get("op") == "merge":
+                    # New visit(s) of a patient (PatientStore.merge_add); merging is
+                    # idempotent, so a visit a snapshot already holds is kept once
+                    stored = states.pop(patient_id, None)
+                    if stored is None:
+                        states[patient_id] = dict(entry["state"], id=patient_id)
+                    else:
+                        states[patient_id] = PatientRecord.from_state(stored).merged(
+                            PatientRecord.from_state(entry["state"])).to_state()
+                elif entry.get("op") == "del":
+                    states.pop(patient_id, None)
+
+    def _track_id(self, patient_id):
+        number = patient_id_number(patient_id)
+        if number is not None and number > self.high_water:
+            self.high_water = number
+
+    # --- Writes ---
+
+    def start(self, state_provider):
+        """
+        Begin background fsync/snapshots.
+        `state_provider()` must return the current list of record states.
+        """
+        self._state_provider = state_provider
+        self._flusher = threading.Thread(target=self._flush_loop, name="patient-journal", daemon=True)
+        self._flusher.start()
+
+    def append_put(self, patient_id, state):
+        self._append({"op": "put", "id": patient_id, "state": state}, patient_id)
+
+    def append_puts(self, items):
+        """Journal many (patient_id, state) puts with a single write + flush."""
+        lines = b"".join(dumps({"op": "put", "id": patient_id, "state": state}) + b"\n"
+                         for patient_id, state in items)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self._dirty = True
+            self._ops_since_snapshot += len(items)
+            for patient_id, _ in items:
+                self._track_id(patient_id)
+
+    def append_merge(self, patient_id, state):
+        """Journal a record `state` merged into patient `patient_id` (only the new visits)."""
+        self._append({"op": "merge", "id": patient_id, "state": state}, patient_id)
+
+    def append_delete(self, patient_id):
+        self._append({"op": "del", "id": patient_id}, patient_id)
+
+    def _append(self, entry, patient_id):
+        line = dumps(entry) + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._dirty = True
+            self._ops_since_snapshot += 1
+            self._track_id(patient_id)
+
+    def sync(self):
+        """fsync everything appended so far."""
+        with self._sync_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                f = self._file
+            os.fsync(f.fileno())
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.sync()
+                if self._ops_since_snapshot >= self.snapshot_every:
+                    self.snapshot_async()
+            except OSError as e:
+                print(f"⚠️ WARNING: Patient journal sync failed: {e}")
+
+    def _open_generation(self, generation):
+        self._generation = generation
+        path = os.path.join(self.directory, f"wal-{generation:08d}.log")
+        self._file = open(path, "ab")
+        _fsync_directory(self.directory)
+
+    # --- Snapshots ---
+
+    def snapshot_async(self):
+        """Start a background snapshot unless one is already running."""
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+        self._snapshot_thread = threading.Thread(target=self.snapshot, name="patient-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def snapshot(self):
+        """Rotate the log and write a compacted snapshot of the current state."""
+        if self._state_provider is None:
+            return
+        with self._sync_lock:
+            with self._lock:
+                old_file = self._file
+                old_file.flush()
+                os.fsync(old_file.fileno())
+                self._open_generation(self._generation + 1)
+                old_file.close()
+                self._dirty = False
+                self._ops_since_snapshot = 0
+                generation = self._generation
+                high_water = self.high_water
+
+        # Ops racing with this capture land in the new log; replaying a put
+        # or delete on top of the snapshot is idempotent.
+        states = self._state_provider()
+
+        path = os.path.join(self.directory, f"snapshot-{generation:08d}.jsonl")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dumps({"generation": generation, "high_water": high_water, "count": len(states)}) + b"\n")
+            for state in states:
+                f.write(dumps(state) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_directory(self.directory)
+
+        for old_generation, old_path in _generation_files(self.directory, _WAL_NAME):
+            if old_generation < generation:
+                os.remove(old_path)
+        for old_generation, old_path in _generation_files(self.directory, _SNAPSHOT_NAME):
+            if old_generation < generation:
+                os.remove(old_path)
+
+    def close(self):
+        """Stop the background thread and fsync the log."""
+        self._stop.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._file is not None and not self._file.closed:
+            self.sync()
+            self._file.close()
+        if self._directory_lock is not None:
+            self._directory_lock.close()
+            self._directory_lock = None
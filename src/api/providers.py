@@ -0,0 +1,206 @@
+"""
+Provider directory behind the Resource Finder.
+
+Providers (hospitals, specialists, ambulances, pharmacies) are loaded once
+from PROVIDER_DB_PATH into:
+  - an inverted index over name / specialty / clinic tokens, with prefix
+    matching through a sorted vocabulary, and
+  - a spatial grid of GRID_CELL_DEG x GRID_CELL_DEG cells for nearest-N
+    queries by coordinates (rings of cells are searched outwards until the
+    next ring cannot hold anything closer; after MAX_RINGS rings, far from
+    the data, the candidates are ranked by a full scan instead).
+"""
+import bisect
+import heapq
+import itertools
+import math
+import os
+import re
+import threading
+
+from api.serialization import loads
+
+# --- Configuration ---
+PROVIDER_DB_PATH = os.environ.get(
+    "PROVIDER_DB_PATH", os.path.join(os.path.dirname(__file__), "mock_provider_db.json"))
+GRID_CELL_DEG = 0.05  # ~5.5 km
+MAX_RINGS = 20  # ~110 km of grid search before falling back to a full scan
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# Specialty to consult for each predicted disease_type
+DISEASE_SPECIALTIES = {
+    'diabetes': 'Endocrinologist',
+    'cardio': 'Cardiologist',
+    'respiratory': 'Pulmonologist',
+    'cancer': 'Oncologist',
+    'thyroid': 'Endocrinologist',
+    'kidney': 'Nephrologist',
+    'liver': 'Hepatologist',
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_INDEXED_FIELDS = ('name', 'specialty', 'clinic')
+
+
+def tokenize(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class ProviderDirectory:
+    """In-memory provider directory with text, specialty and spatial indexes."""
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._postings = {}      # token -> set of provider indexes
+        self._by_specialty = {}  # lowercased specialty -> set of provider indexes
+        self._by_kind = {}       # kind -> set of provider indexes
+        self._grid = {}          # (row, col) -> list of provider indexes
+
+        for i, provider in enumerate(providers):
+            for field in _INDEXED_FIELDS:
+                for token in tokenize(provider.get(field)):
+                    self._postings.setdefault(token, set()).add(i)
+            if provider.get('specialty'):
+                self._by_specialty.setdefault(provider['specialty'].lower(), set()).add(i)
+            self._by_kind.setdefault(provider.get('kind', 'other'), set()).add(i)
+            if provider.get('lat') is not None and provider.get('lon') is not None:
+                self._grid.setdefault(self._cell(provider['lat'], provider['lon']), []).append(i)
+
+        self._vocabulary = sorted(self._postings)
+        rows = [r for r, _ in self._grid] or [0]
+        cols = [c for _, c in self._grid] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    @classmethod
+    def load(cls, path=PROVIDER_DB_PATH):
+        with open(path, "rb") as f:
+            return cls(loads(f.read()))
+
+    def __len__(self):
+        return len(self.providers)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return (math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG))
+
+    def _match_token(self, prefix):
+        """Union of postings for every vocabulary token starting with `prefix`."""
+        matches = set()
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            matches |= self._postings[self._vocabulary[position]]
+            position += 1
+        return matches
+
+    def _filter(self, query=None, specialty=None, kind=None):
+        """Returns: set of matching provider indexes, or None for 'no filter'"""
+        candidates = None
+        filters = []
+        if specialty:
+            filters.append(self._by_specialty.get(specialty.lower(), set()))
+        if kind:
+            filters.append(self._by_kind.get(kind, set()))
+        # Smallest sets first keeps the intersections cheap
+        filters.extend(self._match_token(token) for token in tokenize(query))
+        for matches in sorted(filters, key=len):
+            candidates = set(matches) if candidates is None else candidates & matches
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _ring_cells(row, col, ring):
+        """Cells on the square ring at Chebyshev distance `ring` around (row, col)."""
+        if ring == 0:
+            yield (row, col)
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield (row - ring, c)
+            yield (row + ring, c)
+        for r in range(row - ring + 1, row + ring):
+            yield (r, col - ring)
+            yield (r, col + ring)
+
+    def _rank(self, lat, lon, limit, candidates):
+        """Nearest `limit` providers among `candidates` (None = all) by a full scan."""
+        indexes = range(len(self.providers)) if candidates is None else candidates
+        return heapq.nsmallest(limit, (
+            (haversine_km(lat, lon, self.providers[i]['lat'], self.providers[i]['lon']), i)
+            for i in indexes
+            if self.providers[i].get('lat') is not None and self.providers[i].get('lon') is not None
+        ))
+
+    def _nearest(self, lat, lon, limit, candidates):
+        """Nearest `limit` providers among `candidates` (None = all) by ring search."""
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._bounds
+        max_ring = max(row - min_row, max_row - row, col - min_col, max_col - col, 0)
+        rings = min(max_ring, MAX_RINGS)
+        # Lower bound on a cell's width in km around this latitude
+        cell_km = GRID_CELL_DEG * 111.0 * max(math.cos(math.radians(min(abs(lat) + 1.0, 89.0))), 0.01)
+        best = []  # sorted list of (distance_km, index)
+
+        for ring in range(rings + 1):
+            for cell in self._ring_cells(row, col, ring):
+                for i in self._grid.get(cell, ()):
+                    if candidates is not None and i not in candidates:
+                        continue
+                    provider = self.providers[i]
+                    distance = haversine_km(lat, lon, provider['lat'], provider['lon'])
+                    if len(best) < limit or distance < best[-1][0]:
+                        bisect.insort(best, (distance, i))
+                        del best[limit:]
+            # Anything beyond this ring is at least `ring * cell_km` away
+            if len(best) >= limit and best[-1][0] <= ring * cell_km:
+                return best
+        if rings == max_ring:
+            return best  # Every occupied cell has been searched
+        # Far from the data the rings grow without finding much: scan instead
+        return self._rank(lat, lon, limit, candidates)
+
+    def search(self, query=None, specialty=None, kind=None, disease_type=None,
+               lat=None, lon=None, limit=DEFAULT_LIMIT):
+        """
+        Find providers matching all given filters.
+        With coordinates, results are the nearest first and carry distance_km.
+        """
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        if disease_type and not specialty:
+            specialty = DISEASE_SPECIALTIES.get(disease_type)
+        candidates = self._filter(query, specialty, kind)
+
+        if lat is not None and lon is not None:
+            if candidates is not None and len(candidates) <= limit * 4:
+                # Few candidates: ranking them directly beats walking the grid
+                ranked = self._rank(lat, lon, limit, candidates)
+            else:
+                ranked = self._nearest(lat, lon, limit, candidates)
+            return [dict(self.providers[i], distance_km=round(d, 2)) for d, i in ranked]
+
+        indexes = range(len(self.providers)) if candidates is None else sorted(candidates)
+        return [self.providers[i] for i in itertools.islice(indexes, limit)]
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+def get_directory():
+    """Load the provider directory on first use."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = ProviderDirectory.load()
+    return _directory
+
+def loaded_directory():
+    """The provider directory, or None if nothing has used it yet (does not load it)."""
+    return _directory
@@ -0,0 +1,240 @@
+"""
+Compact in-memory representation of a stored patient assessment.
+
+The prediction report is kept once (the legacy dict held it twice, as
+`detected_diseases` and again inside `full_report`), repeated strings are
+interned and the timestamp is stored as a float. The legacy dict shape is
+rebuilt only when a record is serialized.
+
+A returning patient keeps one record: the latest assessment is held in the
+top-level fields and earlier ones in `history`, oldest first, in the
+compact to_state() shape (see merged() and api/identity.py).
+"""
+import re
+import sys
+import time
+from datetime import datetime
+
+# Keys make_prediction() puts in a report that are worth interning
+_INTERNED_REPORT_KEYS = ('disease_type', 'disease_name', 'risk_category', 'detection_mode', 'model_version')
+
+# IDs handed out by generate_patient_id()
+_GENERATED_ID = re.compile(r'^P(\d+)$')
+
+
+def patient_id_number(patient_id):
+    """Numeric part of a generated 'P1234' ID, or None for other ID formats."""
+    match = _GENERATED_ID.match(patient_id or '')
+    return int(match.group(1)) if match else None
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _compact_report(report):
+    """Intern repeated strings inside a make_prediction() report, in place."""
+    for key in _INTERNED_REPORT_KEYS:
+        if key in report:
+            report[key] = _intern(report[key])
+    for key in ('matched_symptoms', 'detected_symptoms'):
+        if key in report:
+            report[key] = [_intern(s) for s in report[key]]
+    for disease in report.get('detected_diseases', ()):
+        _compact_report(disease)
+    return report
+
+
+def _compact_visit(visit):
+    visit['dx'] = _intern(visit['dx'])
+    _compact_report(visit['report'])
+    return visit
+
+
+class PatientRecord:
+    """A patient's latest assessment plus earlier visits. Serialize with to_dict()/summary()."""
+
+    __slots__ = (
+        'patient_id', 'patient_info', 'symptoms', 'health_data',
+        'primary_diagnosis', 'overall_risk', 'created_at', 'report', 'history'
+    )
+
+    def __init__(self, patient_id, patient_info, symptoms, health_data,
+                 primary_diagnosis, overall_risk, report, created_at=None, history=None):
+        self.patient_id = patient_id
+        self.patient_info = patient_info or {}
+        self.symptoms = symptoms
+        self.health_data = health_data
+        self.primary_diagnosis = _intern(primary_diagnosis)
+        self.overall_risk = overall_risk
+        self.report = _compact_report(report)
+        self.created_at = time.time() if created_at is None else created_at
+        # Earlier visits, oldest first (the shared empty tuple for first-time patients)
+        self.history = tuple(history) if history else ()
+
+        gender = self.patient_info.get('gender')
+        if isinstance(gender, str):
+            self.patient_info['gender'] = sys.intern(gender)
+
+    # --- Derived fields (computed on access, never stored) ---
+
+    @property
+    def name(self):
+        return self.patient_info.get('name', 'Anonymous')
+
+    @property
+    def age(self):
+        return self.patient_info.get('age', 'N/A')
+
+    @property
+    def gender(self):
+        return self.patient_info.get('gender', 'N/A')
+
+    @property
+    def phone(self):
+        return self.patient_info.get('phone', '')
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.created_at).isoformat()
+
+    @property
+    def last_seen(self):
+        return datetime.fromtimestamp(self.created_at).strftime('%Y-%m-%d')
+
+    @property
+    def visit_count(self):
+        return len(self.history) + 1
+
+    @property
+    def first_seen(self):
+        return datetime.fromtimestamp(self.history[0]['ts'] if self.history else self.created_at).isoformat()
+
+    # --- Visits ---
+
+    def visit_state(self):
+        """The latest assessment in the compact per-visit shape used by `history`."""
+        return {
+            'symptoms': self.symptoms,
+            'health': self.health_data,
+            'dx': self.primary_diagnosis,
+            'risk': self.overall_risk,
+            'ts': self.created_at,
+            'report': self.report
+        }
+
+    def merged(self, other):
+        """
+        A new record for this patient ID holding the visits of both records,
+        the latest one on top. Visits with the same timestamp are kept once,
+        so merging a record twice is harmless. patient_info comes from the
+        newer record, with fields it leaves empty filled from the older one.
+        """
+        visits = {}
+        for record in (self, other):
+            for visit in (*record.history, record.visit_state()):
+                visits.setdefault(visit['ts'], visit)
+        *history, latest = (visits[ts] for ts in sorted(visits))
+
+        older, newer = sorted((self, other), key=lambda r: r.created_at)
+        patient_info = dict(older.patient_info)
+        patient_info.update((k, v) for k, v in newer.patient_info.items() if v not in (None, ''))
+        return PatientRecord(
+            patient_id=self.patient_id,
+            patient_info=patient_info,
+            symptoms=latest['symptoms'],
+            health_data=latest['health'],
+            primary_diagnosis=latest['dx'],
+            overall_risk=latest['risk'],
+            report=latest['report'],
+            created_at=latest['ts'],
+            history=history
+        )
+
+    # --- Serialization ---
+
+    def to_state(self):
+        """Compact dict used by the persistence layer (see api/persistence.py)."""
+        state = {
+            'id': self.patient_id,
+            'info': self.patient_info,
+            'symptoms': self.symptoms,
+            'health': self.health_data,
+            'dx': self.primary_diagnosis,
+            'risk': self.overall_risk,
+            'ts': self.created_at,
+            'report': self.report
+        }
+        if self.history:
+            state['history'] = list(self.history)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(
+            patient_id=state['id'],
+            patient_info=state['info'],
+            symptoms=state['symptoms'],
+            health_data=state['health'],
+            primary_diagnosis=state['dx'],
+            overall_risk=state['risk'],
+            report=state['report'],
+            created_at=state['ts'],
+            history=[_compact_visit(visit) for visit in state.get('history', ())]
+        )
+
+    def full_report(self):
+        """The /predict response as it was returned to the client."""
+        full_report = dict(self.report)
+        full_report['patient_info'] = self.patient_info
+        full_report['patient_id'] = self.patient_id
+        full_report['symptoms'] = self.symptoms
+        full_report['health_data'] = self.health_data
+        full_report['visit_count'] = self.visit_count
+        return full_report
+
+    def to_dict(self):
+        """Full record in the legacy patient_record shape."""
+        full_report = self.full_report()
+        return {
+            'patient_id': self.patient_id,
+            'name': self.name,
+            'age': self.age,
+            'gender': self.gender,
+            'phone': self.phone,
+            'symptoms': self.symptoms,
+            'health_data': self.health_data,
+            'primary_diagnosis': self.primary_diagnosis,
+            'overall_risk': self.overall_risk,
+            'detected_diseases': full_report.get('detected_diseases', [full_report]),
+            'timestamp': self.timestamp,
+            'last_seen': self.last_seen,
+            'first_seen': self.first_seen,
+            'visit_count': self.visit_count,
+            'history': [
+                {
+                    'timestamp': datetime.fromtimestamp(visit['ts']).isoformat(),
+                    'symptoms': visit['symptoms'],
+                    'health_data': visit['health'],
+                    'primary_diagnosis': visit['dx'],
+                    'overall_risk': visit['risk'],
+                    'detected_diseases': visit['report'].get('detected_diseases', [visit['report']])
+                }
+                for visit in self.history
+            ],
+            'full_report': full_report
+        }
+
+    def summary(self):
+        """Row for the dashboard patient list."""
+        return {
+            'patient_id': self.patient_id,
+            'name': self.name,
+            'age': self.age,
+            'gender': self.gender,
+            'primary_diagnosis': self.primary_diagnosis,
+            'last_seen': self.last_seen,
+            'mock_risk': self.overall_risk,  # Using 'mock_risk' for compatibility
+            'timestamp': self.timestamp,
+            'visit_count': self.visit_count
+        }
@@ -0,0 +1,246 @@
+"""
+Retention policy and compressed archive for cold patient records.
+
+A background RetentionWorker periodically moves records that are older than
+RETENTION_MAX_AGE_DAYS, or beyond the newest RETENTION_MAX_RESIDENT records,
+out of the in-memory store into a PatientArchive on disk. Archived records
+can still be fetched (and deleted) by patient ID.
+
+Archive layout:
+    archive-<segment>.jsonl.gz  concatenated gzip members, each holding up
+                                to BLOCK_RECORDS record states as JSON lines
+    archive-<segment>.idx       patient_id -> [offset, length] of its member;
+                                written last, so it marks a complete segment
+    tombstones.log              "<patient_id> <segment>": the ID was deleted
+                                from every segment up to that one (a later
+                                segment may archive it again)
+"""
+import glob
+import gzip
+import heapq
+import os
+import re
+import threading
+import time
+
+from api.serialization import dumps, loads
+
+# --- Configuration ---
+RETENTION_MAX_AGE_DAYS = os.environ.get("RETENTION_MAX_AGE_DAYS")
+RETENTION_MAX_RESIDENT = os.environ.get("RETENTION_MAX_RESIDENT")
+RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", 3600))
+BLOCK_RECORDS = 64
+
+_INDEX_NAME = re.compile(r"archive-(\d+)\.idx$")
+
+
+class RetentionPolicy:
+    """Decides which resident records are cold."""
+
+    def __init__(self, max_age_days=None, max_resident=None):
+        self.max_age_days = float(max_age_days) if max_age_days else None
+        self.max_resident = int(max_resident) if max_resident else None
+
+    @classmethod
+    def from_env(cls):
+        return cls(RETENTION_MAX_AGE_DAYS, RETENTION_MAX_RESIDENT)
+
+    @property
+    def enabled(self):
+        return self.max_age_days is not None or self.max_resident is not None
+
+    def select_cold(self, records, now=None):
+        """Returns: list of records to archive, oldest first"""
+        records = list(records)
+        cold = {}
+
+        if self.max_age_days is not None:
+            cutoff = (now or time.time()) - self.max_age_days * 86400
+            for record in records:
+                if record.created_at < cutoff:
+                    cold[record.patient_id] = record
+
+        if self.max_resident is not None:
+            excess = len(records) - len(cold) - self.max_resident
+            if excess > 0:
+                remaining = (r for r in records if r.patient_id not in cold)
+                for record in heapq.nsmallest(excess, remaining, key=lambda r: r.created_at):
+                    cold[record.patient_id] = record
+
+        return sorted(cold.values(), key=lambda r: r.created_at)
+
+
+class PatientArchive:
+    """Append-only, gzip-compressed record archive with an in-memory ID index."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index = {}  # patient_id -> (segment, offset, length)
+        self._tombstones = set()
+        self._next_segment = 1
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        for path in sorted(glob.glob(os.path.join(self.directory, "archive-*.idx"))):
+            segment = int(_INDEX_NAME.search(path).group(1))
+            with open(path, "rb") as f:
+                for patient_id, (offset, length) in loads(f.read()).items():
+                    self._index[patient_id] = (segment, offset, length)
+            self._next_segment = max(self._next_segment, segment + 1)
+
+        tombstone_path = os.path.join(self.directory, "tombstones.log")
+        if os.path.exists(tombstone_path):
+            deleted_up_to = {}
+            with open(tombstone_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    fields = line.split()
+                    if fields:
+                        # Lines without a segment predate re-archiving: they cover every segment
+                        deleted_up_to[fields[0]] = int(fields[1]) if len(fields) > 1 else float('inf')
+            self._tombstones = {
+                patient_id for patient_id, (segment, _, _) in self._index.items()
+                if segment <= deleted_up_to.get(patient_id, 0)
+            }
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"archive-{segment:08d}.jsonl.gz")
+
+    def __len__(self):
+        return len(self._index) - len(self._tombstones & self._index.keys())
+
+    def __contains__(self, patient_id):
+        return patient_id in self._index and patient_id not in self._tombstones
+
+    def write(self, states):
+        """Durably archive a list of record states as one new segment."""
+        if not states:
+            return
+        with self._lock:
+            segment = self._next_segment
+            self._next_segment += 1
+
+        path = self._segment_path(segment)
+        index = {}
+        with open(path + ".tmp", "wb") as f:
+            for start in range(0, len(states), BLOCK_RECORDS):
+                block = states[start:start + BLOCK_RECORDS]
+                data = gzip.compress(b"".join(dumps(state) + b"\n" for state in block))
+                offset = f.tell()
+                f.write(data)
+                for state in block:
+                    index[state["id"]] = [offset, len(data)]
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        index_path = os.path.join(self.directory, f"archive-{segment:08d}.idx")
+        with open(index_path + ".tmp", "wb") as f:
+            f.write(dumps(index))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(index_path + ".tmp", index_path)
+
+        with self._lock:
+            for patient_id, (offset, length) in index.items():
+                self._index[patient_id] = (segment, offset, length)
+                self._tombstones.discard(patient_id)
+
+    def get(self, patient_id):
+        """Returns: the archived record state, or None"""
+        with self._lock:
+            entry = self._index.get(patient_id)
+            if entry is None or patient_id in self._tombstones:
+                return None
+        segment, offset, length = entry
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            block = gzip.decompress(f.read(length))
+        for line in block.splitlines():
+            state = loads(line)
+            if state["id"] == patient_id:
+                return state
+        return None
+
+    def iter_states(self):
+        """Yield every archived record state, reading one compressed block at a time."""
+        with self._lock:
+            blocks = {}
+            for patient_id, entry in self._index.items():
+                if patient_id not in self._tombstones:
+                    blocks.setdefault(entry, set()).add(patient_id)
+        current_segment, f = None, None
+        try:
+            for (segment, offset, length), patient_ids in sorted(blocks.items()):
+                if segment != current_segment:
+                    if f is not None:
+                        f.close()
+                    current_segment, f = segment, open(self._segment_path(segment), "rb")
+                f.seek(offset)
+                for line in gzip.decompress(f.read(length)).splitlines():
+                    state = loads(line)
+                    # A record archived twice is only current in its latest block
+                    if state["id"] in patient_ids:
+                        yield state
+        finally:
+            if f is not None:
+                f.close()
+
+    def delete(self, patient_id):
+        """Returns: True if an archived record was deleted"""
+        with self._lock:
+            if patient_id not in self._index or patient_id in self._tombstones:
+                return False
+            segment = self._index[patient_id][0]
+            with open(os.path.join(self.directory, "tombstones.log"), "a", encoding="utf-8") as f:
+                f.write(f"{patient_id} {segment}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._tombstones.add(patient_id)
+            return True
+
+
+class RetentionWorker:
+    """Background job that moves cold records from the store to the archive."""
+
+    def __init__(self, store, archive, policy, interval=RETENTION_INTERVAL):
+        self.store = store
+        self.archive = archive
+        self.policy = policy
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Archive cold records now. Returns: number of records archived"""
+        cold = self.policy.select_cold(self.store)
+        if not cold:
+            return 0
+        # Archive first: a crash in between leaves a record in both tiers,
+        # never in neither.
+        self.archive.write([record.to_state() for record in cold])
+        for record in cold:
+            if not self.store.discard(record):
+                # Deleted by a client, or given a new visit, while we were
+                # archiving it: the archived copy is stale either way, and a
+                # record with a new visit stays resident until a later pass
+                self.archive.delete(record.patient_id)
+        return len(cold)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                archived = self.run_once()
+                if archived:
+                    print(f"🗄️ Archived {archived} cold patient records.")
+            except OSError as e:
+                print(f"⚠️ WARNING: Retention run failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="patient-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
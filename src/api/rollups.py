@@ -0,0 +1,156 @@
+"""
+Time-bucketed assessment rollups for trend charts.
+
+Every stored visit (an assessment) is counted in one hourly and one daily
+bucket: number of assessments, risk bands (the /api/stats thresholds) and
+primary diagnoses. Buckets follow local wall-clock time, like the
+timestamps the API returns, and are keyed by consecutive integers (hours
+and days since 0001-01-01), so a range query walks the keys from start to
+end without touching any record.
+
+Counts are kept current by add()/remove() as records are written, imported
+and deleted, so a 90-day daily series is 90 dict lookups. Removing a visit
+that was never counted (e.g. written before a rebuild) changes nothing:
+counts never go below zero, and a bucket's bands and diagnoses always sum
+to its assessments.
+"""
+import threading
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+BUCKETS = ('hour', 'day')
+MAX_POINTS = 10000   # buckets per query
+
+# (band, test on the 0-1 overall risk), as in /api/stats
+RISK_BANDS = (
+    ('high_risk', lambda risk: risk > 0.7),
+    ('moderate_risk', lambda risk: 0.4 < risk <= 0.7),
+    ('low_risk', lambda risk: risk <= 0.4)
+)
+
+
+def _band(risk):
+    for band, in_band in RISK_BANDS:
+        if in_band(risk):
+            return band
+    return 'low_risk'
+
+
+def bucket_key(bucket, ts):
+    """Index of the hour or day (local time) containing epoch seconds `ts`."""
+    moment = datetime.fromtimestamp(ts)
+    day = moment.toordinal()
+    return day * 24 + moment.hour if bucket == 'hour' else day
+
+
+def bucket_start(bucket, key):
+    """ISO local time at which bucket `key` starts."""
+    if bucket == 'hour':
+        return (datetime.fromordinal(key // 24) + timedelta(hours=key % 24)).isoformat()
+    return datetime.fromordinal(key).isoformat()
+
+
+def state_visits(state):
+    """(ts, risk, diagnosis) of every visit in a record state (see PatientRecord.to_state)."""
+    for visit in (*state.get('history', ()), state):
+        yield visit['ts'], visit['risk'], visit['dx']
+
+
+def record_visits(record):
+    """(ts, risk, diagnosis) of every visit of a PatientRecord."""
+    for visit in record.history:
+        yield visit['ts'], visit['risk'], visit['dx']
+    yield record.created_at, record.overall_risk, record.primary_diagnosis
+
+
+class _Bucket:
+    __slots__ = ('assessments', 'bands', 'diagnoses')
+
+    def __init__(self):
+        self.assessments = 0
+        self.bands = dict.fromkeys((band for band, _ in RISK_BANDS), 0)
+        self.diagnoses = {}
+
+    def add(self, risk, diagnosis):
+        self.assessments += 1
+        self.bands[_band(risk)] += 1
+        self.diagnoses[diagnosis] = self.diagnoses.get(diagnosis, 0) + 1
+
+    def remove(self, risk, diagnosis):
+        """Returns: False if no visit with this band and diagnosis is counted (nothing changes)"""
+        band = _band(risk)
+        count = self.diagnoses.get(diagnosis, 0)
+        if not count or not self.bands[band]:
+            return False
+        self.assessments -= 1
+        self.bands[band] -= 1
+        if count > 1:
+            self.diagnoses[diagnosis] = count - 1
+        else:
+            del self.diagnoses[diagnosis]
+        return True
+
+    def to_dict(self):
+        return dict(assessments=self.assessments, **self.bands, diagnoses=dict(self.diagnoses))
+
+
+class Rollups:
+    """Hourly and daily assessment counts, updated one visit at a time."""
+
+    def __init__(self):
+        self._buckets = {bucket: {} for bucket in BUCKETS}   # bucket -> key -> _Bucket
+        self._lock = threading.Lock()
+
+    def add(self, visits):
+        """Count an iterable of (ts, risk, diagnosis) visits."""
+        with self._lock:
+            for ts, risk, diagnosis in visits:
+                for bucket, keyed in self._buckets.items():
+                    key = bucket_key(bucket, ts)
+                    entry = keyed.get(key)
+                    if entry is None:
+                        entry = keyed[key] = _Bucket()
+                    entry.add(risk, diagnosis)
+
+    def remove(self, visits):
+        """Uncount an iterable of (ts, risk, diagnosis) visits; ones never counted are ignored."""
+        with self._lock:
+            for ts, risk, diagnosis in visits:
+                for bucket, keyed in self._buckets.items():
+                    key = bucket_key(bucket, ts)
+                    entry = keyed.get(key)
+                    if entry is not None and entry.remove(risk, diagnosis) and not entry.assessments:
+                        del keyed[key]
+
+    def series(self, bucket, start, end):
+        """
+        One point per bucket from the one containing `start` to the one
+        containing `end` (epoch seconds), zeros included.
+        Raises: ValueError if that is more than MAX_POINTS buckets
+        """
+        first, last = bucket_key(bucket, start), bucket_key(bucket, end)
+        if last - first >= MAX_POINTS:
+            raise ValueError(f"at most {MAX_POINTS} {bucket} buckets per query")
+        keyed = self._buckets[bucket]
+        empty = _Bucket()
+        with self._lock:
+            return [
+                dict(start=bucket_start(bucket, key), **keyed.get(key, empty).to_dict())
+                for key in range(first, last + 1)
+            ]
+
+
+def build_rollups(records, archived_states=()):
+    """
+    Rollups of stored records plus archived record states. A record found
+    in both (being archived, or brought back, meanwhile) is counted once.
+    """
+    rollups = Rollups()
+    resident_ids = set()
+    for record in records:
+        resident_ids.add(record.patient_id)
+        rollups.add(record_visits(record))
+    for state in archived_states:
+        if state['id'] not in resident_ids:
+            rollups.add(state_visits(state))
+    return rollups
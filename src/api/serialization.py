@@ -0,0 +1,199 @@
+"""
+Response serialization for the API.
+
+Uses orjson when it is installed and falls back to the standard library
+json module otherwise. Machine clients can ask for msgpack through the
+Accept header, and large bodies are compressed with brotli or gzip when
+the client advertises support for it.
+"""
+import gzip
+import json
+import os
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Configuration ---
+COMPRESSION_MIN_BYTES = int(os.environ.get("API_COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(obj):
+    """Fallback for values the encoders do not know (numpy scalars/arrays, sets)."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps(payload):
+    """Serialize a payload to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_response(payload):
+    """
+    dumps() for response bodies: keys sorted and non-string keys (e.g. int)
+    written as strings, as Flask's jsonify() did, so clients see the same
+    key order and keys as before.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=(
+            orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+    try:
+        text = json.dumps(payload, default=_default, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    except TypeError:
+        # Mixed key types cannot be sorted: sort them as the strings they become
+        text = json.dumps(_str_keys(payload), default=_default, separators=(",", ":"), ensure_ascii=False,
+                          sort_keys=True)
+    return text.encode("utf-8")
+
+
+def _str_keys(obj):
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else json.dumps(key).strip('"'): _str_keys(value)
+                for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_str_keys(value) for value in obj]
+    return obj
+
+
+def loads(data):
+    """Parse JSON bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _header_values(header):
+    """Split an Accept-style header into its media ranges/codings (q=0 entries dropped)."""
+    values = []
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        values.append(token)
+    return values
+
+
+def wants_msgpack(accept_header):
+    """True when the client explicitly accepts msgpack and the encoder is available."""
+    if msgpack is None:
+        return False
+    return any(value in MSGPACK_MIMETYPES for value in _header_values(accept_header))
+
+
+def choose_encoding(accept_encoding, size):
+    """Pick a content coding for a body of `size` bytes, or None to send it as-is."""
+    if size < COMPRESSION_MIN_BYTES:
+        return None
+    codings = _header_values(accept_encoding)
+    if brotli is not None and "br" in codings:
+        return "br"
+    if "gzip" in codings:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def encode_body(payload, accept="", accept_encoding=""):
+    """
+    Encode a payload for the wire.
+
+    Returns: (body_bytes, mimetype, headers_dict)
+    """
+    if wants_msgpack(accept):
+        body = msgpack.packb(payload, default=_default, use_bin_type=True)
+        mimetype = MSGPACK_MIMETYPES[0]
+    else:
+        body = dumps_response(payload)
+        mimetype = JSON_MIMETYPE
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = choose_encoding(accept_encoding, len(body))
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return body, mimetype, headers
+
+
+class StreamingBody:
+    """
+    A response body produced chunk by chunk (exports), returned by a handler
+    in place of a payload. Sent as-is, gzip-compressed on the fly when
+    `compressible` and the client accepts it.
+    """
+
+    __slots__ = ('chunks', 'mimetype', 'headers', 'compressible')
+
+    def __init__(self, chunks, mimetype, headers=None, compressible=True):
+        self.chunks = chunks
+        self.mimetype = mimetype
+        self.headers = headers or {}
+        self.compressible = compressible
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_stream(body, accept_encoding=""):
+    """
+    Encode a StreamingBody for the wire.
+
+    Returns: (chunk_iterator, mimetype, headers_dict)
+    """
+    headers = dict(body.headers, Vary="Accept-Encoding")
+    if body.compressible and "gzip" in _header_values(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        return _gzip_chunks(body.chunks), body.mimetype, headers
+    return body.chunks, body.mimetype, headers
+
+
+def decode_body(data, content_type=""):
+    """Decode a request body sent as JSON or msgpack. Returns None when empty."""
+    if not data:
+        return None
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    if mimetype in MSGPACK_MIMETYPES:
+        if msgpack is None:
+            raise ValueError("msgpack request bodies are not supported on this server")
+        return msgpack.unpackb(data, raw=False)
+    return loads(data)
@@ -0,0 +1,227 @@
+"""
+Shadow evaluation of candidate models.
+
+A candidate is a model + scaler pair in SHADOW_MODEL_DIR with the same file
+names as in models/ (e.g. models/shadow/diabetes_model.pkl and
+diabetes_scaler.pkl); only diseases with a candidate are shadowed. After
+the primary model has scored a request, its raw feature row is put on a
+bounded queue and the response goes out unchanged. A background thread
+scores queued rows with the candidate in batches and aggregates the
+score deltas and agreement per (primary version, candidate version).
+
+The queue never blocks: when it is full the row is dropped and counted.
+Candidate files are re-read when they change, like the primary models.
+    SHADOW_MODEL_DIR    directory of candidate artifacts (default models/shadow/; "" disables)
+    SHADOW_QUEUE_SIZE   rows waiting to be scored before new ones are dropped (default 1000)
+"""
+import os
+import queue
+import threading
+import time
+
+from ml import predict
+from ml.registry import build_registry, scan_signatures
+
+# --- Configuration ---
+SHADOW_MODEL_DIR = os.environ.get('SHADOW_MODEL_DIR', os.path.join(predict.MODEL_DIR, 'shadow'))
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', '1000'))
+SHADOW_BATCH_SIZE = 64
+SHADOW_REFRESH_INTERVAL = 5.0  # seconds between checks for changed candidate files
+
+# Score bands of make_prediction()'s risk_category, applied to model scores
+_BANDS = (40, 70)
+
+
+def _band(score):
+    return sum(score > edge for edge in _BANDS)
+
+
+class _Comparison:
+    """Running totals for one (disease, primary version, candidate version)."""
+
+    __slots__ = ('count', 'sum_delta', 'sum_abs_delta', 'sum_sq_delta', 'max_abs_delta',
+                 'label_agree', 'band_agree', 'primary_positive', 'candidate_positive')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_delta = self.sum_abs_delta = self.sum_sq_delta = self.max_abs_delta = 0.0
+        self.label_agree = self.band_agree = self.primary_positive = self.candidate_positive = 0
+
+    def add(self, primary, candidate):
+        """Add one pair of scores (0-100, as ml_model_score)."""
+        delta = candidate - primary
+        self.count += 1
+        self.sum_delta += delta
+        self.sum_abs_delta += abs(delta)
+        self.sum_sq_delta += delta * delta
+        self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+        self.label_agree += (primary >= 50) == (candidate >= 50)
+        self.band_agree += _band(primary) == _band(candidate)
+        self.primary_positive += primary >= 50
+        self.candidate_positive += candidate >= 50
+
+    def to_dict(self):
+        n = self.count or 1
+        return {
+            'count': self.count,
+            'mean_delta': round(self.sum_delta / n, 3),
+            'mean_abs_delta': round(self.sum_abs_delta / n, 3),
+            'rmse': round((self.sum_sq_delta / n) ** 0.5, 3),
+            'max_abs_delta': round(self.max_abs_delta, 3),
+            'label_agreement': round(self.label_agree / n, 4),
+            'risk_band_agreement': round(self.band_agree / n, 4),
+            'primary_positive_rate': round(self.primary_positive / n, 4),
+            'candidate_positive_rate': round(self.candidate_positive / n, 4)
+        }
+
+
+class ShadowEvaluator:
+    """Scores a copy of live traffic with candidate models in a background thread."""
+
+    def __init__(self, model_dir=SHADOW_MODEL_DIR, queue_size=SHADOW_QUEUE_SIZE):
+        self.model_dir = model_dir
+        self.registry = None      # candidate ModelRegistry (None until loaded)
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.errors = 0
+        self.last_error = None
+        self.score_ms = 0.0       # total candidate scoring time
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._comparisons = {}    # (disease, primary version, candidate version) -> _Comparison
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._refreshed_at = 0.0
+
+    @property
+    def enabled(self):
+        return self._thread is not None
+
+    def refresh(self):
+        """(Re)load candidates whose files changed. Returns: the candidate registry"""
+        self._refreshed_at = time.monotonic()
+        registry = self.registry
+        if registry is None or scan_signatures(self.model_dir) != registry.signatures:
+            try:
+                registry, changed = build_registry(self.model_dir, registry, quiet=True)
+            except Exception as e:
+                self.last_error = f"loading candidates: {type(e).__name__}: {e}"
+                return self.registry
+            if changed:
+                print(f"👥 Shadow candidates: {', '.join(registry.versions[d] for d in changed)}")
+            self.registry = registry
+        return self.registry
+
+    def submit(self, disease_type, features, probability, version):
+        """predict.set_shadow() hook: enqueue one scored row, or drop it if the queue is full."""
+        registry = self.registry
+        if registry is None or disease_type not in registry.models:
+            return
+        try:
+            self._queue.put_nowait((disease_type, features, probability, version))
+            dropped = 0
+        except queue.Full:
+            dropped = 1
+        with self._counter_lock:
+            self.submitted += 1
+            self.dropped += dropped
+
+    def _take_batch(self):
+        """Block for one row (or the refresh interval), then drain up to SHADOW_BATCH_SIZE."""
+        try:
+            batch = [self._queue.get(timeout=SHADOW_REFRESH_INTERVAL)]
+        except queue.Empty:
+            return []
+        while len(batch) < SHADOW_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def score(self, batch):
+        """Score queued rows with their candidates, one predict_proba call per disease."""
+        import numpy as np
+
+        registry = self.registry
+        by_disease = {}
+        for item in batch:
+            by_disease.setdefault(item[0], []).append(item)
+        for disease_type, items in by_disease.items():
+            model = registry.models.get(disease_type)
+            if model is None:
+                continue  # Candidate removed since the row was queued
+            start = time.perf_counter()
+            try:
+                features = np.vstack([item[1] for item in items])
+                candidate = model.predict_proba(registry.scalers[disease_type].transform(features))[:, 1]
+            except Exception as e:
+                self.errors += len(items)
+                self.last_error = f"{registry.versions[disease_type]}: {type(e).__name__}: {e}"
+                continue
+            self.score_ms += (time.perf_counter() - start) * 1000
+            candidate_version = registry.versions[disease_type]
+            with self._lock:
+                for (_, _, probability, version), candidate_probability in zip(items, candidate):
+                    key = (disease_type, version, candidate_version)
+                    comparison = self._comparisons.get(key)
+                    if comparison is None:
+                        comparison = self._comparisons[key] = _Comparison()
+                    comparison.add(float(probability) * 100, float(candidate_probability) * 100)
+                self.scored += len(items)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self.score(batch)
+            if time.monotonic() - self._refreshed_at >= SHADOW_REFRESH_INTERVAL:
+                self.refresh()
+
+    def start(self):
+        """Load the candidates and register with ml.predict. Returns: False if there is nothing to shadow"""
+        if not self.model_dir or not os.path.isdir(self.model_dir):
+            return False
+        self.refresh()
+        self._thread = threading.Thread(target=self._loop, name="shadow-eval", daemon=True)
+        self._thread.start()
+        predict.set_shadow(self.submit)
+        return True
+
+    def stop(self):
+        predict.set_shadow(None)
+        self._stop.set()
+
+    def reset(self):
+        with self._lock, self._counter_lock:
+            self._comparisons.clear()
+            self.submitted = self.dropped = self.scored = self.errors = 0
+            self.score_ms = 0.0
+
+    def stats(self):
+        """Queue counters plus delta and agreement stats per model pair."""
+        registry = self.registry
+        with self._lock:
+            comparisons = [
+                dict(disease_type=disease_type, primary_version=primary, candidate_version=candidate,
+                     **comparison.to_dict())
+                for (disease_type, primary, candidate), comparison in sorted(self._comparisons.items())
+            ]
+        return {
+            'enabled': self.enabled,
+            'model_dir': self.model_dir,
+            'candidates': dict(registry.versions) if registry is not None else {},
+            'queue': {
+                'depth': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'scored': self.scored,
+                'errors': self.errors,
+                'score_ms_per_row': round(self.score_ms / self.scored, 3) if self.scored else None
+            },
+            'last_error': self.last_error,
+            'comparisons': comparisons
+        }
@@ -0,0 +1,168 @@
+"""
+Patient record store: PatientRecord objects indexed by patient ID,
+optionally made durable by a PatientJournal (see api/persistence.py).
+
+Records are spread over SHARDS dicts, each with its own lock, so
+concurrent requests touching different patients do not contend.
+"""
+import gc
+import os
+import threading
+
+from api.records import PatientRecord
+
+# --- Configuration ---
+SHARDS = int(os.environ.get("PATIENT_STORE_SHARDS", 16))
+
+
+class _Shard:
+    __slots__ = ('lock', 'records')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+
+
+class PatientStore:
+    """Thread-safe in-memory patient records with O(1) lookup by ID."""
+
+    def __init__(self, journal=None, shards=SHARDS):
+        self.journal = journal
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, patient_id):
+        return self._shards[hash(patient_id) % len(self._shards)]
+
+    def open(self):
+        """
+        Restore records from the journal and start background syncing.
+        Returns: highest generated patient number seen (0 if none)
+        """
+        if self.journal is None:
+            return 0
+        # Loading allocates millions of containers and none of them are
+        # garbage: keep the cyclic GC from rescanning them during the load
+        # and move the survivors out of its generations afterwards.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            states = self.journal.recover()
+            for patient_id, state in states.items():
+                self._shard(patient_id).records[patient_id] = PatientRecord.from_state(state)
+            del states
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        gc.freeze()
+        self.journal.start(self.snapshot_states)
+        return self.journal.high_water
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def add(self, record):
+        state = record.to_state() if self.journal is not None else None
+        shard = self._shard(record.patient_id)
+        # Journal while holding the shard lock so the log order of ops on
+        # one patient matches the order they were applied. Store first, then
+        # journal: a snapshot racing with this write either contains the
+        # record or finds its put in the next log.
+        with shard.lock:
+            shard.records[record.patient_id] = record
+            if self.journal is not None:
+                self.journal.append_put(record.patient_id, state)
+
+    def add_many(self, records):
+        """
+        Bulk insert: one lock acquisition and one journal write per shard.
+        Returns: the stored records that were replaced
+        """
+        replaced = []
+        by_shard = {}
+        for record in records:
+            by_shard.setdefault(id(self._shard(record.patient_id)), []).append(record)
+        for shard_records in by_shard.values():
+            shard = self._shard(shard_records[0].patient_id)
+            states = [(r.patient_id, r.to_state()) for r in shard_records] if self.journal is not None else None
+            with shard.lock:
+                for record in shard_records:
+                    previous = shard.records.get(record.patient_id)
+                    if previous is not None:
+                        replaced.append(previous)
+                    shard.records[record.patient_id] = record
+                if self.journal is not None:
+                    self.journal.append_puts(states)
+        return replaced
+
+    def merge_add(self, record, patient_id=None):
+        """
+        Store `record` as a new visit of patient `patient_id` (default: its
+        own ID), merged with the stored record if there is one. The merge
+        runs under the shard lock so concurrent visits are never lost. Only
+        `record` is journaled, not the merged history, so the cost of a
+        visit does not grow with the patient's visit count.
+        Returns: the stored record, or None if `patient_id` differs from
+        record.patient_id and is not stored
+        """
+        patient_id = patient_id or record.patient_id
+        state = record.to_state() if self.journal is not None else None
+        shard = self._shard(patient_id)
+        with shard.lock:
+            stored = shard.records.get(patient_id)
+            if stored is not None:
+                merged = stored.merged(record)
+            elif record.patient_id != patient_id:
+                return None
+            else:
+                merged = record
+            shard.records[patient_id] = merged
+            if self.journal is not None:
+                self.journal.append_merge(patient_id, state)
+        return merged
+
+    def get(self, patient_id):
+        return self._shard(patient_id).records.get(patient_id)
+
+    def delete(self, patient_id):
+        """Returns: the removed record, or None"""
+        shard = self._shard(patient_id)
+        with shard.lock:
+            record = shard.records.pop(patient_id, None)
+            if record is None:
+                return None
+            if self.journal is not None:
+                self.journal.append_delete(patient_id)
+        return record
+
+    def discard(self, record):
+        """
+        Delete `record` only if it is still the stored record of its patient
+        (not replaced by a merged visit meanwhile).
+        Returns: True if it was removed
+        """
+        shard = self._shard(record.patient_id)
+        with shard.lock:
+            if shard.records.get(record.patient_id) is not record:
+                return False
+            del shard.records[record.patient_id]
+            if self.journal is not None:
+                self.journal.append_delete(record.patient_id)
+        return True
+
+    def records(self):
+        """Point-in-time list of all records (shard by shard)."""
+        records = []
+        for shard in self._shards:
+            with shard.lock:
+                records.extend(shard.records.values())
+        return records
+
+    def snapshot_states(self):
+        return [record.to_state() for record in self.records()]
+
+    def __len__(self):
+        return sum(len(shard.records) for shard in self._shards)
+
+    def __iter__(self):
+        return iter(self.records())
@@ -0,0 +1,403 @@
+"""
+Columnar vitals time-series.
+
+Each patient's readings live in one float64 timestamp array (epoch
+seconds, sorted) and one (n, len(METRICS)) float64 value array. The arrays
+grow by doubling, so appends are amortized O(1). A missing metric is NaN.
+Range queries, rolling means, slopes and latest values are all
+searchsorted / cumsum / least squares over the arrays, so no per-reading
+dicts are built.
+
+The store is seeded from VITALS_SEED_PATH (the mock_db.json shape: parallel
+`timestamps`, `blood_pressure_systolic`, `glucose`, `bmi` arrays) and from
+stored patient records (their health_data, plus any imported `vitals`).
+"""
+import math
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from api.serialization import loads
+
+# --- Configuration ---
+VITALS_SEED_PATH = os.environ.get(
+    "VITALS_SEED_PATH", os.path.join(os.path.dirname(__file__), "mock_db.json"))
+INITIAL_CAPACITY = 4
+
+METRICS = ('blood_pressure_systolic', 'glucose', 'bmi')
+METRIC_INDEX = {metric: i for i, metric in enumerate(METRICS)}
+
+# health_data keys (as sent to /predict) that carry each metric
+HEALTH_DATA_KEYS = {
+    'blood_pressure_systolic': ('ap_hi', 'BloodPressure'),
+    'glucose': ('Glucose',),
+    'bmi': ('BMI',),
+}
+
+SECONDS_PER_DAY = 86400.0
+
+
+def parse_time(value):
+    """ISO date/datetime string or epoch seconds -> epoch seconds (None passes through)."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def reading_time(value):
+    """parse_time() for one vitals timestamp, which must be a representable time. Raises: ValueError"""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        seconds = parse_time(value)
+        datetime.fromtimestamp(seconds)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError(f"invalid vitals timestamp {value!r}")
+    return seconds
+
+
+def _reading_value(value):
+    """A metric value as a float; None, non-numbers and non-finite numbers are NaN."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return np.nan
+
+
+def check_vitals(vitals):
+    """
+    Validate the mock_db.json shape: a timestamps list and, per metric, a list of
+    numbers (or nulls) of the same length.
+    Raises: ValueError naming the problem
+    """
+    if not (isinstance(vitals, dict) and isinstance(vitals.get('timestamps'), list)):
+        raise ValueError("vitals must be an object with a timestamps list")
+    for timestamp in vitals['timestamps']:
+        reading_time(timestamp)
+    for metric in METRICS:
+        values = vitals.get(metric)
+        if values is None:
+            continue
+        if not isinstance(values, list) or len(values) != len(vitals['timestamps']):
+            raise ValueError(f"vitals {metric} must be a list as long as timestamps")
+        if any(value is not None and math.isnan(_reading_value(value)) for value in values):
+            raise ValueError(f"vitals {metric} must hold numbers or nulls")
+
+
+def format_times(timestamps):
+    return [datetime.fromtimestamp(ts).isoformat() for ts in timestamps.tolist()]
+
+
+def metrics_from_health_data(health_data):
+    """Returns: {metric: value} for the metrics present in a /predict health_data dict"""
+    values = {}
+    for metric, keys in HEALTH_DATA_KEYS.items():
+        for key in keys:
+            value = (health_data or {}).get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[metric] = float(value)
+                break
+    return values
+
+
+class VitalsSeries:
+    """One patient's readings as contiguous arrays."""
+
+    __slots__ = ('_times', '_values', 'size')
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._values = np.full((capacity, len(METRICS)), np.nan, dtype=np.float64)
+        self.size = 0
+
+    @classmethod
+    def from_arrays(cls, times, values):
+        """Wrap already sorted, de-duplicated arrays without copying."""
+        series = cls.__new__(cls)
+        series._times, series._values, series.size = times, values, len(times)
+        return series
+
+    @property
+    def times(self):
+        return self._times[:self.size]
+
+    @property
+    def values(self):
+        return self._values[:self.size]
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self._times))
+        times = np.empty(capacity, dtype=np.float64)
+        values = np.full((capacity, len(METRICS)), np.nan, dtype=np.float64)
+        times[:self.size] = self.times
+        values[:self.size] = self.values
+        self._times, self._values = times, values
+
+    def append(self, timestamp, row):
+        """
+        Add one reading (row: array of len(METRICS), NaN = missing).
+        A reading at an existing timestamp replaces it, so replays are idempotent.
+        """
+        times = self.times
+        if self.size and timestamp <= times[-1]:
+            position = int(np.searchsorted(times, timestamp))
+            if position < self.size and times[position] == timestamp:
+                self._values[position] = row
+                return
+        else:
+            position = self.size
+
+        if self.size == len(self._times):
+            self._grow(self.size + 1)
+        if position < self.size:
+            # Out-of-order reading: shift the tail to keep timestamps sorted
+            self._times[position + 1:self.size + 1] = self._times[position:self.size]
+            self._values[position + 1:self.size + 1] = self._values[position:self.size]
+        self._times[position] = timestamp
+        self._values[position] = row
+        self.size += 1
+
+    def extend(self, times, rows):
+        """
+        Add many readings at once (times: 1-D array, rows: (n, len(METRICS))).
+        As with append(), a later reading at an existing timestamp wins.
+        """
+        if not len(times):
+            return
+        if not self.size and np.all(np.diff(times) > 0):
+            merged_times, merged_values = times, rows
+        else:
+            merged_times = np.concatenate((self.times, times))
+            merged_values = np.concatenate((self.values, rows))
+            order = np.argsort(merged_times, kind='stable')
+            merged_times, merged_values = merged_times[order], merged_values[order]
+            keep = np.append(merged_times[1:] != merged_times[:-1], True)
+            merged_times, merged_values = merged_times[keep], merged_values[keep]
+
+        size = len(merged_times)
+        if size > len(self._times):
+            self._times = np.empty(max(size, 2 * len(self._times)), dtype=np.float64)
+            self._values = np.full((len(self._times), len(METRICS)), np.nan, dtype=np.float64)
+        self._times[:size] = merged_times
+        self._values[:size] = merged_values
+        self.size = size
+
+    def window(self, start=None, end=None):
+        """Returns: slice of readings with start <= t <= end"""
+        times = self.times
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = self.size if end is None else int(np.searchsorted(times, end, side='right'))
+        return slice(lo, hi)
+
+
+class VitalsStore:
+    """Patient ID -> VitalsSeries, with vectorized queries."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._series
+
+    def append(self, patient_id, timestamp, values):
+        """Record one reading; values is {metric: number} (unknown metrics are ignored)."""
+        row = np.full(len(METRICS), np.nan)
+        for metric, value in values.items():
+            if metric in METRIC_INDEX and value is not None:
+                row[METRIC_INDEX[metric]] = value
+        if np.isnan(row).all():
+            return
+        with self._lock:
+            series = self._series.get(patient_id)
+            if series is None:
+                series = self._series[patient_id] = VitalsSeries()
+            series.append(float(timestamp), row)
+
+    def extend(self, patient_id, vitals):
+        """Load the mock_db.json shape: {'timestamps': [...], metric: [...], ...}"""
+        self.extend_many([(patient_id, vitals)])
+
+    def extend_many(self, items):
+        """
+        Bulk form of extend() for (patient_id, vitals) pairs: all readings are
+        converted to arrays in one pass and then split per patient. A reading
+        with a bad timestamp is skipped, and a bad metric value is left missing,
+        so one malformed entry never fails the whole load.
+        """
+        ids, counts, times = [], [], []
+        columns = [[] for _ in METRICS]
+        for patient_id, vitals in items:
+            timestamps = vitals.get('timestamps') if isinstance(vitals, dict) else None
+            if not isinstance(timestamps, list):
+                continue
+            series = [vitals.get(metric) for metric in METRICS]
+            series = [values if isinstance(values, list) else [] for values in series]
+            count = 0
+            for i, timestamp in enumerate(timestamps):
+                try:
+                    times.append(reading_time(timestamp))
+                except ValueError:
+                    continue
+                for column, values in zip(columns, series):
+                    column.append(_reading_value(values[i]) if i < len(values) else np.nan)
+                count += 1
+            if count:
+                ids.append(patient_id)
+                counts.append(count)
+        if not ids:
+            return
+
+        times = np.array(times, dtype=np.float64)
+        rows = np.ascontiguousarray(np.array(columns, dtype=np.float64).T)
+        # Drop readings with no metric at all, then re-count per patient
+        present = ~np.isnan(rows).all(axis=1)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        counts = np.add.reduceat(present.astype(np.int64), starts)
+        times, rows = times[present], rows[present]
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        # A patient's readings are already in order if no step inside its
+        # segment goes backwards (or repeats a timestamp)
+        backward = np.concatenate(([0], np.cumsum(np.diff(times) <= 0)))
+        ordered = backward[np.maximum(ends - 1, starts)] == backward[starts]
+
+        with self._lock:
+            for patient_id, start, end, in_order in zip(ids, starts.tolist(), ends.tolist(), ordered.tolist()):
+                if start == end:
+                    continue
+                series = self._series.get(patient_id)
+                if series is None and in_order:
+                    # New patient: the segment views become the series' arrays
+                    self._series[patient_id] = VitalsSeries.from_arrays(times[start:end], rows[start:end])
+                    continue
+                if series is None:
+                    series = self._series[patient_id] = VitalsSeries()
+                series.extend(times[start:end], rows[start:end])
+
+    def drop(self, patient_id):
+        with self._lock:
+            return self._series.pop(patient_id, None) is not None
+
+    def _snapshot(self, patient_id, start=None, end=None):
+        """Returns: (times, values) views for the window, or None if the patient has no vitals"""
+        with self._lock:
+            series = self._series.get(patient_id)
+            if series is None:
+                return None
+            window = series.window(start, end)
+            # Copy under the lock: a concurrent append may reallocate or shift the arrays
+            return series.times[window].copy(), series.values[window].copy()
+
+    def range(self, patient_id, start=None, end=None, metrics=METRICS):
+        """Readings in [start, end] in the mock_db.json shape."""
+        snapshot = self._snapshot(patient_id, start, end)
+        if snapshot is None:
+            return None
+        times, values = snapshot
+        result = {'timestamps': format_times(times)}
+        for metric in metrics:
+            column = values[:, METRIC_INDEX[metric]]
+            result[metric] = np.where(np.isnan(column), None, column).tolist()
+        return result
+
+    def rolling_mean(self, patient_id, metric, window_days, start=None, end=None):
+        """
+        Trailing time-window mean at each reading: the mean of the metric over
+        (t - window_days, t], ignoring missing values.
+        """
+        snapshot = self._snapshot(patient_id, None, end)
+        if snapshot is None:
+            return None
+        times, values = snapshot
+        column = values[:, METRIC_INDEX[metric]]
+        present = ~np.isnan(column)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(present, column, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(present)))
+
+        # Index of the first reading inside each trailing window
+        first = np.searchsorted(times, times - window_days * SECONDS_PER_DAY, side='right')
+        last = np.arange(1, len(times) + 1)
+        window_counts = counts[last] - counts[first]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (sums[last] - sums[first]) / window_counts
+
+        keep = slice(0, len(times)) if start is None else slice(int(np.searchsorted(times, start)), len(times))
+        means = means[keep]
+        return {
+            'timestamps': format_times(times[keep]),
+            metric: np.where(np.isnan(means), None, np.round(means, 3)).tolist(),
+            'window_days': window_days
+        }
+
+    def slope(self, patient_id, metric, start=None, end=None):
+        """Least-squares trend of the metric over [start, end], in units per day."""
+        snapshot = self._snapshot(patient_id, start, end)
+        if snapshot is None:
+            return None
+        times, values = snapshot
+        column = values[:, METRIC_INDEX[metric]]
+        present = ~np.isnan(column)
+        x = times[present] / SECONDS_PER_DAY
+        y = column[present]
+        slope = None
+        if len(x) >= 2 and np.ptp(x) > 0:
+            x = x - x.mean()
+            slope = float(np.dot(x, y - y.mean()) / np.dot(x, x))
+        return {
+            'metric': metric,
+            'slope_per_day': None if slope is None else round(slope, 5),
+            'readings': int(len(y)),
+            'from': format_times(times[:1])[0] if len(times) else None,
+            'to': format_times(times[-1:])[0] if len(times) else None
+        }
+
+    def latest(self, patient_ids=None):
+        """Returns: {patient_id: {'timestamp': ..., metric: last non-missing value}}"""
+        with self._lock:
+            ids = list(self._series) if patient_ids is None else [p for p in patient_ids if p in self._series]
+            rows = {patient_id: (self._series[patient_id].times.copy(), self._series[patient_id].values.copy())
+                    for patient_id in ids}
+
+        latest = {}
+        for patient_id, (times, values) in rows.items():
+            present = ~np.isnan(values)
+            # Last row holding each metric (argmax on the reversed mask)
+            last = len(values) - 1 - np.argmax(present[::-1], axis=0)
+            entry = {'timestamp': format_times(times[-1:])[0]}
+            for i, metric in enumerate(METRICS):
+                entry[metric] = float(values[last[i], i]) if present[:, i].any() else None
+            latest[patient_id] = entry
+        return latest
+
+
+def build_vitals_store(records=(), seed_path=VITALS_SEED_PATH):
+    """Seed a store from the mock_db.json file and from stored patient records."""
+    store = VitalsStore()
+    if seed_path and os.path.exists(seed_path):
+        with open(seed_path, "rb") as f:
+            store.extend_many((patient.get('patient_id'), patient.get('vitals'))
+                              for patient in loads(f.read()) if isinstance(patient, dict) and patient.get('patient_id'))
+    store.extend_many(record_readings(records))
+    return store
+
+
+def record_readings(records):
+    """Yield (patient_id, vitals) pairs for stored records: imported vitals plus health_data of every visit."""
+    for record in records:
+        for visit in (*record.history, record.visit_state()):
+            if visit['report'].get('vitals'):
+                yield record.patient_id, visit['report']['vitals']
+            metrics = metrics_from_health_data(visit['health'])
+            if metrics:
+                yield record.patient_id, dict(
+                    {metric: [value] for metric, value in metrics.items()}, timestamps=[visit['ts']])
@@ -0,0 +1,84 @@
+"""
+Background model warm-up and readiness.
+
+At startup a background thread loads the models and runs synthetic
+inferences of typical batch sizes through each model and the keyword
+matcher (ml.predict.warm_up). /ready reports 503 until that has finished,
+so a load balancer only routes traffic to warm instances, while /health
+keeps answering for liveness.
+    MODEL_WARMUP               "0" disables warm-up (instance is ready at once)
+    MODEL_WARMUP_BATCH_SIZES   comma-separated batch sizes (default 1,8,64)
+"""
+import os
+import threading
+import time
+
+from ml import predict
+
+# --- Configuration ---
+WARMUP_ENABLED = os.environ.get('MODEL_WARMUP', '1') != '0'
+WARMUP_BATCH_SIZES = tuple(int(n) for n in os.environ.get('MODEL_WARMUP_BATCH_SIZES', '1,8,64').split(','))
+
+
+class Warmup:
+    """Runs the warm-up once in a background thread and tracks its outcome."""
+
+    def __init__(self, batch_sizes=WARMUP_BATCH_SIZES):
+        self.batch_sizes = batch_sizes
+        self.state = 'pending'   # pending -> warming -> ready / failed, or skipped
+        self.error = None
+        self.timings = {}
+        self.started_at = None
+        self.seconds = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def skip(self):
+        self.state = 'skipped'
+
+    def run(self):
+        self.state = 'warming'
+        self.started_at = time.time()
+        try:
+            self.timings = predict.warm_up(self.batch_sizes)
+            self.state = 'ready'
+            print(f"✅ Models warmed up in {time.time() - self.started_at:.1f}s")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = 'failed'
+            print(f"⚠️ WARNING: Model warm-up failed: {self.error}")
+        self.seconds = round(time.time() - self.started_at, 2)
+
+    @property
+    def ready(self):
+        return self.state in ('ready', 'skipped')
+
+    def status(self):
+        """Readiness payload with per-disease model status."""
+        diseases = {}
+        registry = predict.current_registry()
+        for disease_type in predict.DISEASE_KEYWORDS:
+            if predict.model_status:
+                model = predict.model_status.get(disease_type, 'keyword_only')
+            else:
+                model = 'pending' if self.state in ('pending', 'warming') else 'not_loaded'
+            diseases[disease_type] = {
+                'model': model,
+                'version': registry.versions.get(disease_type) if registry is not None else None,
+                'warm': disease_type in self.timings,
+                'warmup_ms': self.timings.get(disease_type)
+            }
+        return {
+            'ready': self.ready,
+            'warmup': self.state,
+            'warmup_seconds': self.seconds,
+            'error': self.error,
+            'models': diseases,
+            'keyword_matcher': {
+                'warm': 'keywords' in self.timings,
+                'warmup_ms': self.timings.get('keywords')
+            }
+        }
@@ -139,15 +139,11 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("**Quick Stats:**")
     
-    # Try to fetch stats from API
+    # Try to fetch stats from API (fails fast while it is down; see api_client.py)
     try:
-        import requests
-        response = requests.get("http://127.0.0.1:5000/api/stats", timeout=2)
-        if response.status_code == 200:
-            stats = response.json()
-            st.metric("Total Patients", stats.get('total_patients', 0))
-            st.metric("High Risk", stats.get('high_risk_count', 0))
-        else:
-            st.info("API not connected")
-    except:
+        from api_client import get_client
+        stats = get_client().get_json("/api/stats")
+        st.metric("Total Patients", stats.get('total_patients', 0))
+        st.metric("High Risk", stats.get('high_risk_count', 0))
+    except Exception:
         st.info("Start API to see stats")
\ No newline at end of file
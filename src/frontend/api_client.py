@@ -0,0 +1,160 @@
+"""
+Shared HTTP client for the Streamlit pages.
+
+One ApiClient per server process (get_client() is a st.cache_resource):
+a pooled requests.Session keeps connections to the API alive across calls
+and reruns. Idempotent requests are retried with exponential backoff on
+connection errors and 502/503/504. A circuit breaker opens after
+API_FAILURE_THRESHOLD consecutive failures: calls then fail immediately
+with ApiUnavailable (pages do not block on a dead API) until a trial call
+after API_RESET_SECONDS succeeds. Meanwhile get_json() serves the last
+good response it saw for the same request.
+    API_BASE_URL          API root (default http://127.0.0.1:5000)
+    API_CONNECT_TIMEOUT   seconds to connect (default 2)
+    API_READ_TIMEOUT      seconds to wait for a response (default 10)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+API_BASE_URL = os.environ.get('API_BASE_URL', 'http://127.0.0.1:5000').rstrip('/')
+API_CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', '2'))
+API_READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', '10'))
+API_RETRIES = 2
+API_BACKOFF = 0.2              # seconds; doubles per retry
+API_FAILURE_THRESHOLD = 3      # consecutive failures that open the circuit
+API_RESET_SECONDS = 15.0       # open circuit: time before a trial call
+POOL_SIZE = 10                 # keep-alive connections (concurrent sessions)
+FALLBACK_ENTRIES = 128         # last good GET responses kept for fallback
+
+
+class ApiUnavailable(requests.exceptions.ConnectionError):
+    """The API is down (or the circuit is open); no request was answered."""
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open after `reset_seconds`."""
+
+    def __init__(self, threshold=API_FAILURE_THRESHOLD, reset_seconds=API_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """Returns: True if a call may go out (one trial call at a time while open)"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ApiClient:
+    """Pooled, retrying client for the backend API. Paths are relative to base_url ('/api/stats')."""
+
+    def __init__(self, base_url=API_BASE_URL, connect_timeout=API_CONNECT_TIMEOUT,
+                 read_timeout=API_READ_TIMEOUT, retries=API_RETRIES):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker()
+        self.session = requests.Session()
+        # POST is not retried: a /predict that reached the server would be stored twice
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=API_BACKOFF, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'HEAD', 'DELETE'}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._fallback = OrderedDict()   # (path, params) -> last good JSON
+        self._fallback_lock = threading.Lock()
+
+    @property
+    def available(self):
+        """False while the circuit is open."""
+        return not self.breaker.is_open
+
+    def request(self, method, path, read_timeout=None, **kwargs):
+        """
+        Send a request. HTTP error statuses are returned, not raised.
+        Raises: ApiUnavailable if the circuit is open or the API did not answer
+        """
+        if not self.breaker.allow():
+            raise ApiUnavailable(f"API at {self.base_url} is unavailable (retrying in a few seconds).")
+        timeout = (self.timeout[0], read_timeout) if read_timeout is not None else self.timeout
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.breaker.failure()
+            raise ApiUnavailable(f"Could not reach the API at {self.base_url}: {e}") from e
+        if response.status_code in (502, 503, 504):
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def get_json(self, path, params=None, **kwargs):
+        """
+        GET and decode a JSON response. While the API is unavailable, returns
+        the last good response to the same request instead, if there is one.
+        Raises: ApiUnavailable, requests.HTTPError
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        try:
+            response = self.get(path, params=params, **kwargs)
+            response.raise_for_status()
+            data = response.json()
+        except ApiUnavailable:
+            with self._fallback_lock:
+                if key in self._fallback:
+                    return self._fallback[key]
+            raise
+        with self._fallback_lock:
+            self._fallback[key] = data
+            self._fallback.move_to_end(key)
+            if len(self._fallback) > FALLBACK_ENTRIES:
+                self._fallback.popitem(last=False)
+        return data
+
+
+@st.cache_resource
+def get_client():
+    """The process-wide ApiClient."""
+    return ApiClient()
@@ -3,6 +3,8 @@ import requests
 from datetime import datetime
 import pandas as pd # Import pandas for the report
 
+from api_client import get_client
+
 # Page config
 st.set_page_config(
     page_title="Patient Analysis",
@@ -19,11 +21,9 @@ if 'report_data' not in st.session_state:
 # API Call Function
 def call_api(payload):
     """Calls the backend API for disease detection"""
-    API_URL = "http://127.0.0.1:5000/predict"
-    
     try:
         with st.spinner('🔍 AI is analyzing your health data...'):
-            response = requests.post(API_URL, json=payload, timeout=30)
+            response = get_client().post("/predict", json=payload, read_timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -288,6 +288,9 @@ def show_report_page():
             with col1:
                 st.markdown("**👨‍⚕️ Recommended Doctors:**")
                 for doc in rec['doctors']: st.markdown(f"• {doc}")
+                if st.button("📞 Find nearby specialists", key=f"find_{rec['disease']}"):
+                    st.session_state['resource_disease'] = rec['disease']
+                    st.switch_page("pages/3_📞_Resource_Finder.py")
                 
                 st.markdown("\n**🌟 Lifestyle Changes:**")
                 for item in rec['lifestyle']: st.markdown(f"• {item}")
@@ -4,11 +4,13 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from api_client import get_client
+
 # Page config
 st.set_page_config(layout="wide", page_title="Admin Dashboard", page_icon="📊")
 
-# API Configuration
-API_BASE_URL = "http://127.0.0.1:5000/api"
+# API Configuration (base URL and timeouts: see api_client.py)
+api = get_client()
 
 # Custom CSS
 st.markdown("""
@@ -27,11 +29,11 @@ st.markdown("""
 
 # --- Data Fetching Functions ---
 @st.cache_data(ttl=30)
-def get_patient_list():
+def get_patient_page(query, risk, sort, offset, limit):
+    """One page of the worklist, filtered and sorted by the API."""
+    params = {'q': query, 'risk': risk, 'sort': sort, 'offset': offset, 'limit': limit}
     try:
-        response = requests.get(f"{API_BASE_URL}/patients", timeout=5)
-        response.raise_for_status()
-        return response.json()
+        return api.get_json("/api/patients", params={k: v for k, v in params.items() if v})
     except requests.exceptions.ConnectionError:
         st.error("❌ Connection Error: Could not connect to API. Is Flask server running?")
         return None
@@ -42,24 +44,28 @@ def get_patient_list():
 @st.cache_data(ttl=30)
 def get_statistics():
     try:
-        response = requests.get(f"{API_BASE_URL}/stats", timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except:
+        return api.get_json("/api/stats")
+    except Exception:
         return None
 
+@st.cache_data(ttl=30)
 def get_patient_details(patient_id):
     try:
-        response = requests.get(f"{API_BASE_URL}/patients/{patient_id}", timeout=5)
-        response.raise_for_status()
-        return response.json()
+        return api.get_json(f"/api/patients/{patient_id}")
     except Exception as e:
         st.error(f"Error fetching patient details: {e}")
         return None
 
+@st.cache_data(ttl=30)
+def get_patient_vitals(patient_id):
+    try:
+        return api.get_json(f"/api/vitals/{patient_id}")
+    except Exception:  # 404: no vitals recorded
+        return None
+
 def delete_patient(patient_id):
     try:
-        response = requests.delete(f"{API_BASE_URL}/patients/{patient_id}", timeout=5)
+        response = api.delete(f"/api/patients/{patient_id}")
         response.raise_for_status()
         return True
     except Exception as e:
@@ -80,8 +86,20 @@ with col3:
     st.page_link("_Home.py", label="🏠 Home", use_container_width=True)
 st.markdown("---")
 
+# Worklist page size and filter options (label -> API query value)
+PAGE_SIZE = 25
+RISK_FILTERS = {"All": None, "High Risk (>70%)": "high", "Moderate Risk (40-70%)": "moderate", "Low Risk (<40%)": "low"}
+SORT_OPTIONS = {"Last Seen": "last_seen", "Risk Score": "risk", "Name": "name"}
+
+if 'worklist_page' not in st.session_state:
+    st.session_state.worklist_page = 0
+
+def reset_page():
+    st.session_state.worklist_page = 0
+
 stats = get_statistics()
-patient_data = get_patient_list()
+if not api.available:
+    st.warning("⚠️ The API is not responding. Showing the last data received; retrying automatically.")
 
 # --- Statistics Cards ---
 if stats:
@@ -111,110 +129,107 @@ if stats:
     st.markdown("---")
 
 # --- Patient List Table ---
-if patient_data:
-    st.subheader("🏥 Patient Worklist")
-    
-    df = pd.DataFrame(patient_data)
-    
-    col1, col2, col3 = st.columns([2, 1, 1])
-    with col1:
-        search_query = st.text_input("🔍 Search Patient (by Name or ID)", "")
-    with col2:
-        risk_filter = st.selectbox("Filter by Risk", ["All", "High Risk (>70%)", "Moderate Risk (40-70%)", "Low Risk (<40%)"])
-    with col3:
-        sort_by = st.selectbox("Sort by", ["Last Seen", "Risk Score", "Name"])
-    
-    # Apply filters
-    filtered_df = df.copy()
-    if search_query:
-        filtered_df = filtered_df[
-            filtered_df['name'].str.contains(search_query, case=False, na=False) | 
-            filtered_df['patient_id'].str.contains(search_query, case=False, na=False)
-        ]
-    if risk_filter == "High Risk (>70%)":
-        filtered_df = filtered_df[filtered_df['mock_risk'] > 0.7]
-    elif risk_filter == "Moderate Risk (40-70%)":
-        filtered_df = filtered_df[filtered_df['mock_risk'] > 0.4]
-    elif risk_filter == "Low Risk (<40%)":
-        filtered_df = filtered_df[filtered_df['mock_risk'] <= 0.4]
-    
-    if sort_by == "Last Seen":
-        filtered_df = filtered_df.sort_values('last_seen', ascending=False)
-    elif sort_by == "Risk Score":
-        filtered_df = filtered_df.sort_values('mock_risk', ascending=False)
-    elif sort_by == "Name":
-        filtered_df = filtered_df.sort_values('name')
-    
-    st.markdown(f"**Showing {len(filtered_df)} of {len(df)} patients**")
-    
-    # Display table headers
-    cols = st.columns([1, 2, 1, 1, 2, 1, 2])
-    headers = ["ID", "Name", "Age/Sex", "Risk", "Diagnosis", "Last Seen", "Actions"]
-    for col, header in zip(cols, headers):
-        col.markdown(f"**{header}**")
-    st.divider()
-
-    # Display table rows
-    for idx, row in filtered_df.iterrows():
-        col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 2, 1, 1, 2, 1, 2])
-        with col1:
-            st.write(f"{row['patient_id']}")
-        with col2:
-            st.write(row['name'])
-        with col3:
-            st.write(f"{row.get('age', 'N/A')}, {row.get('gender', 'N/A')}") # Use .get() for safety
-        with col4:
-            risk_pct = int(row['mock_risk'] * 100)
-            if row['mock_risk'] > 0.7: st.markdown(f"🔴 **{risk_pct}%**")
-            elif row['mock_risk'] > 0.4: st.markdown(f"🟡 **{risk_pct}%**")
-            else: st.markdown(f"🟢 **{risk_pct}%**")
-        with col5:
-            st.write(row['primary_diagnosis'])
-        with col6:
-            st.write(row['last_seen'])
-        with col7:
-            subcol1, subcol2 = st.columns(2)
-            if subcol1.button("👁️ View", key=f"view_{row['patient_id']}", use_container_width=True):
-                st.session_state['selected_patient'] = row['patient_id']
-            if subcol2.button("🗑️ Del", key=f"del_{row['patient_id']}", use_container_width=True):
-                if delete_patient(row['patient_id']):
-                    st.success(f"Deleted {row['name']}")
+# Only the visible page is fetched and drawn, so the page renders in the
+# same time whatever the number of patients
+st.subheader("🏥 Patient Worklist")
+
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    search_query = st.text_input("🔍 Search Patient (by Name or ID)", "", on_change=reset_page)
+with col2:
+    risk_filter = st.selectbox("Filter by Risk", list(RISK_FILTERS), on_change=reset_page)
+with col3:
+    sort_by = st.selectbox("Sort by", list(SORT_OPTIONS), on_change=reset_page)
+
+page = get_patient_page(search_query.strip(), RISK_FILTERS[risk_filter], SORT_OPTIONS[sort_by],
+                        st.session_state.worklist_page * PAGE_SIZE, PAGE_SIZE)
+
+if page and page['total']:
+    page_count = (page['total'] + PAGE_SIZE - 1) // PAGE_SIZE
+    if st.session_state.worklist_page >= page_count:
+        # The list shrank (deletes, merges) past the current page
+        st.session_state.worklist_page = page_count - 1
+        st.rerun()
+
+    df = pd.DataFrame(page['patients'])
+    df['age_sex'] = df['age'].astype(str) + ", " + df['gender'].astype(str)
+    df['risk'] = df['mock_risk'] * 100
+    df['visits'] = df.get('visit_count', 1)
+
+    table_col, detail_col = st.columns([3, 2])
+    with table_col:
+        first = page['offset'] + 1
+        st.markdown(f"**Showing {first}-{first + len(df) - 1} of {page['total']} patients**")
+        selection = st.dataframe(
+            df[['patient_id', 'name', 'age_sex', 'risk', 'primary_diagnosis', 'visits', 'last_seen']],
+            column_config={
+                'patient_id': "ID",
+                'name': "Name",
+                'age_sex': "Age/Sex",
+                'risk': st.column_config.ProgressColumn("Risk", format="%d%%", min_value=0, max_value=100),
+                'primary_diagnosis': "Diagnosis",
+                'visits': "Visits",
+                'last_seen': "Last Seen"
+            },
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"worklist_{st.session_state.worklist_page}"
+        )
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if prev_col.button("◀ Previous", disabled=st.session_state.worklist_page == 0, use_container_width=True):
+            st.session_state.worklist_page -= 1
+            st.rerun()
+        page_col.markdown(f"<div style='text-align: center'>Page {st.session_state.worklist_page + 1} of {page_count}</div>", unsafe_allow_html=True)
+        if next_col.button("Next ▶", disabled=st.session_state.worklist_page >= page_count - 1, use_container_width=True):
+            st.session_state.worklist_page += 1
+            st.rerun()
+
+    # --- Patient Details (loaded for the selected row only) ---
+    with detail_col:
+        selected_rows = selection.selection.rows
+        patient_details = get_patient_details(df.iloc[selected_rows[0]]['patient_id']) if selected_rows else None
+        if patient_details is None:
+            st.info("Select a patient in the table to see their details.")
+        else:
+            st.subheader(f"📋 {patient_details['name']}")
+            st.write(f"**ID:** {patient_details['patient_id']}")
+            st.write(f"**Age:** {patient_details['age']}  ·  **Gender:** {patient_details['gender']}")
+            st.write(f"**Visits:** {patient_details.get('visit_count', 1)}")
+            risk_score = patient_details['overall_risk'] * 100
+            if risk_score > 70: st.error(f"🔴 HIGH RISK: {risk_score:.1f}%")
+            elif risk_score > 40: st.warning(f"🟡 MODERATE RISK: {risk_score:.1f}%")
+            else: st.success(f"🟢 LOW RISK: {risk_score:.1f}%")
+
+            st.markdown("**Symptoms Reported**")
+            st.info(patient_details['symptoms'])
+            st.markdown("**Detected Diseases**")
+            for disease in patient_details['detected_diseases']:
+                st.write(f"• **{disease.get('disease_name', 'N/A')}:** {disease.get('final_risk_score', 0):.1f}% risk")
+
+            vitals = get_patient_vitals(patient_details['patient_id'])
+            if vitals and len(vitals['timestamps']) > 1:
+                st.markdown("**Vitals Trend**")
+                vitals_df = pd.DataFrame({k: v for k, v in vitals.items() if k != 'patient_id'})
+                fig = px.line(vitals_df, x='timestamps', y=['blood_pressure_systolic', 'glucose', 'bmi'], markers=True)
+                fig.update_layout(height=250, margin=dict(l=0, r=0, t=0, b=0), legend_title_text='')
+                st.plotly_chart(fig, use_container_width=True)
+
+            if patient_details.get('history'):
+                st.markdown("**Earlier Visits**")
+                history_df = pd.DataFrame(patient_details['history'])[['timestamp', 'primary_diagnosis', 'overall_risk', 'symptoms']]
+                st.dataframe(history_df.iloc[::-1], hide_index=True, use_container_width=True)
+
+            if st.button("🗑️ Delete Patient", use_container_width=True):
+                if delete_patient(patient_details['patient_id']):
+                    st.success(f"Deleted {patient_details['name']}")
                     st.cache_data.clear()
                     st.rerun()
-        st.divider()
-    
-    # Patient Details Modal (simplified)
-    if 'selected_patient' in st.session_state:
-        patient_details = get_patient_details(st.session_state['selected_patient'])
-        if patient_details:
-            # The 'with st.dialog' error was fixed in the previous turn
-            if st.dialog("Patient Details", width="large"):
-                st.subheader(f"📋 Detailed Report: {patient_details['name']}")
-                
-                col1, col2 = st.columns([1, 2])
-                with col1:
-                    st.markdown("**Patient Information**")
-                    st.write(f"**ID:** {patient_details['patient_id']}")
-                    st.write(f"**Name:** {patient_details['name']}")
-                    st.write(f"**Age:** {patient_details['age']}")
-                    st.write(f"**Gender:** {patient_details['gender']}")
-                    risk_score = patient_details['overall_risk'] * 100
-                    st.markdown("**Overall Risk**")
-                    if risk_score > 70: st.error(f"🔴 HIGH RISK: {risk_score:.1f}%")
-                    elif risk_score > 40: st.warning(f"🟡 MODERATE RISK: {risk_score:.1f}%")
-                    else: st.success(f"🟢 LOW RISK: {risk_score:.1f}%")
-                
-                with col2:
-                    st.markdown("**Symptoms Reported**")
-                    st.info(patient_details['symptoms'])
-                    st.markdown("**Detected Diseases**")
-                    for disease in patient_details['detected_diseases']:
-                        st.write(f"• **{disease.get('disease_name', 'N/A')}:** {disease.get('final_risk_score', 0):.1f}% risk")
-                
-                if st.button("✖️ Close Details"):
-                    del st.session_state['selected_patient']
-                    st.rerun()
 
+elif page is not None and (search_query or RISK_FILTERS[risk_filter]):
+    st.info("No patients match the current filters.")
 else:
     st.warning("⚠️ No patient data available. Patients will appear here after using the Patient Analysis tool.")
     # --- THIS IS THE FIX (Line 221) ---
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 
+from api_client import get_client
+
 # Page config
 st.set_page_config(
     page_title="Resource Finder",
@@ -8,8 +10,37 @@ st.set_page_config(
     layout="wide"
 )
 
+KOLKATA_CENTER = (22.5726, 88.3639)
+
+DISEASE_OPTIONS = {
+    "Any": None, "Diabetes": "diabetes", "Cardiovascular": "cardio", "Respiratory": "respiratory",
+    "Cancer": "cancer", "Thyroid": "thyroid", "Kidney": "kidney", "Liver": "liver"
+}
+KIND_OPTIONS = {
+    "All": None, "👨‍⚕️ Specialists": "specialist", "🏥 Hospitals": "hospital",
+    "🚑 Ambulance": "ambulance", "💊 Medical Shops": "pharmacy"
+}
+
+@st.cache_data(ttl=300)
+def fetch_providers(query, kind, disease_type, lat, lon, limit):
+    """Query the indexed provider directory. Raises if the API is unavailable, so failures are not cached."""
+    params = {"q": query, "kind": kind, "disease_type": disease_type, "limit": limit}
+    if lat is not None and lon is not None:
+        params.update({"lat": lat, "lon": lon})
+    return get_client().get_json(
+        "/api/providers",
+        params={k: v for k, v in params.items() if v not in (None, "")}
+    )
+
+def search_providers(query, kind, disease_type, lat, lon, limit):
+    """Cached provider search. Returns None if the API is unavailable."""
+    try:
+        return fetch_providers(query, kind, disease_type, lat, lon, limit)
+    except Exception:
+        return None
+
 # --- Mock Database for Kolkata ---
-# In a real app, this would come from a database or a Google Maps API
+# Offline fallback when the API is not running
 MOCK_DATA = {
     "Hospitals (Kolkata)": [
         {"name": "Apollo Gleneagles Hospital", "phone": "033-2320-3040", "address": "Canal Circular Rd, Kadapara"},
@@ -54,36 +85,85 @@ st.title("📞 Emergency & Resource Finder")
 st.info("⚠️ This is a demo page with placeholder data for Kolkata. In a real app, this would use your live location.")
 st.markdown("---")
 
-# --- Display Logic ---
-col1, col2 = st.columns(2)
+# --- Search (served by /api/providers) ---
+# The report page can pre-select a disease before switching here: it seeds
+# the keyed selectbox once, after which the widget keeps the user's choice
+if 'resource_disease' in st.session_state:
+    preselected = st.session_state.pop('resource_disease')
+    st.session_state['resource_disease_label'] = next(
+        (label for label, disease_type in DISEASE_OPTIONS.items() if disease_type == preselected), "Any")
 
+col1, col2, col3 = st.columns([2, 1, 1])
 with col1:
-    st.header("🏥 Hospitals & 🚑 Ambulance")
+    query = st.text_input("🔍 Search by name, specialty or clinic", "")
+with col2:
+    kind_label = st.selectbox("Type", list(KIND_OPTIONS))
+with col3:
+    disease_label = st.selectbox("Specialists for", list(DISEASE_OPTIONS), key='resource_disease_label')
+
+with st.expander("📍 Your location", expanded=False):
+    use_location = st.checkbox("Sort by distance", value=True)
+    lcol1, lcol2, lcol3 = st.columns(3)
+    lat = lcol1.number_input("Latitude", value=KOLKATA_CENTER[0], format="%.4f")
+    lon = lcol2.number_input("Longitude", value=KOLKATA_CENTER[1], format="%.4f")
+    limit = lcol3.number_input("Results", 1, 100, 10)
+
+results = search_providers(
+    query, KIND_OPTIONS[kind_label], DISEASE_OPTIONS[disease_label],
+    lat if use_location else None, lon if use_location else None, int(limit)
+)
+
+if results is not None:
+    heading = f"**{results['count']} of {results['total_providers']} providers**"
+    if results.get('specialty'):
+        heading += f" · {results['specialty']}"
+    st.markdown(heading)
+    for item in results['providers']:
+        details = [f"**{item['name']}**"]
+        if item.get('specialty'):
+            details.append(f"- **Specialty:** {item['specialty']}")
+        if item.get('clinic'):
+            details.append(f"- **Clinic:** {item['clinic']}")
+        if item.get('address') or item.get('location'):
+            details.append(f"- **Address:** {item.get('address') or item.get('location')}")
+        details.append(f"- **Phone:** `{item['phone']}`")
+        if 'distance_km' in item:
+            details.append(f"- **Distance:** {item['distance_km']} km")
+        st.markdown("\n".join(details))
+        st.divider()
+else:
+    st.warning("⚠️ Provider search is offline (start the API). Showing the built-in Kolkata list.")
+
+    # --- Display Logic (offline fallback) ---
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.header("🏥 Hospitals & 🚑 Ambulance")
     
-    with st.expander("**Click to see Emergency Ambulance Numbers**", expanded=True):
-        for item in MOCK_DATA["Ambulance Services (Kolkata)"]:
-            st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`")
-            st.divider()
+        with st.expander("**Click to see Emergency Ambulance Numbers**", expanded=True):
+            for item in MOCK_DATA["Ambulance Services (Kolkata)"]:
+                st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`")
+                st.divider()
             
-    with st.expander("**Click to see Major Hospitals**", expanded=True):
-        for item in MOCK_DATA["Hospitals (Kolkata)"]:
-            st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`\n- **Address:** {item['address']}")
-            st.divider()
+        with st.expander("**Click to see Major Hospitals**", expanded=True):
+            for item in MOCK_DATA["Hospitals (Kolkata)"]:
+                st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`\n- **Address:** {item['address']}")
+                st.divider()
             
-    with st.expander("**Click to see 24/7 Medical Shops**"):
-        for item in MOCK_DATA["Medical Shops (24/7, Kolkata)"]:
-            st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`\n- **Location:** {item['location']}")
-            st.divider()
+        with st.expander("**Click to see 24/7 Medical Shops**"):
+            for item in MOCK_DATA["Medical Shops (24/7, Kolkata)"]:
+                st.markdown(f"**{item['name']}**\n- **Phone:** `{item['phone']}`\n- **Location:** {item['location']}")
+                st.divider()
 
-with col2:
-    st.header("👨‍⚕️ Doctors by Specialization")
+    with col2:
+        st.header("👨‍⚕️ Doctors by Specialization")
     
-    with st.expander("**Click to see Specialists**", expanded=True):
-        for specialty, docs in MOCK_DATA["Doctors (by Specialization)"].items():
-            st.markdown(f"#### {specialty}")
-            for doc in docs:
-                st.markdown(f"• **{doc['name']}** at {doc['clinic']} (Phone: `{doc['phone']}`)")
-            st.markdown("---")
+        with st.expander("**Click to see Specialists**", expanded=True):
+            for specialty, docs in MOCK_DATA["Doctors (by Specialization)"].items():
+                st.markdown(f"#### {specialty}")
+                for doc in docs:
+                    st.markdown(f"• **{doc['name']}** at {doc['clinic']} (Phone: `{doc['phone']}`)")
+                st.markdown("---")
 
 # --- Sidebar Navigation ---
 # This just adds the links to the sidebar for this page
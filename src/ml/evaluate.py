@@ -0,0 +1,370 @@
+"""
+Cross-validated evaluation of candidate models for every disease.
+
+Runs stratified k-fold CV for each (disease, candidate) pair, scoring the
+folds of all pairs in parallel worker processes, then measures what each
+candidate costs to serve and writes one comparison report (JSON and
+Markdown): AUC, accuracy, Brier score and calibration (ECE plus a
+reliability table), model size pickled and compiled (ml.tree_ensemble),
+and inference latency per batch size.
+
+Fold assignments are cached per dataset, keyed by the file's content hash,
+k and seed, so every candidate and every rerun is scored on identical
+splits.
+
+Usage (from the repo root):
+    python src/ml/evaluate.py [--folds 5] [--jobs 4] [--diseases diabetes,cardio] [--candidates xgboost,random_forest]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# --- Configuration ---
+RAW_DATA_DIR = "data/raw/"
+REPORT_DIR = "data/processed/evaluation/"
+FOLD_CACHE_DIR = os.path.join(REPORT_DIR, "folds")
+SEED = 42
+BATCH_SIZES = (1, 8, 64, 256)
+CALIBRATION_BINS = 10
+LATENCY_ROUNDS = 20
+
+# disease -> (file in RAW_DATA_DIR, read_csv arguments, target column); preprocessed as in train.py
+DATASETS = {
+    'diabetes': ("diabetes.csv", {}, 'Outcome'),
+    'cardio': ("cardio_train.csv", {'sep': ';'}, 'cardio'),
+}
+
+# name -> description; built by make_model()
+CANDIDATES = {
+    'xgboost': "XGBoost, 100 trees (train.py)",
+    'xgboost_small': "XGBoost, 30 trees of depth 3",
+    'random_forest': "Random forest, 100 trees (shipped diabetes model)",
+    'random_forest_small': "Random forest, 25 trees of depth 8",
+    'logistic_regression': "Logistic regression",
+}
+
+
+def make_model(name):
+    """Unfitted estimator for a candidate; single-threaded, as folds already run in parallel."""
+    if name.startswith('xgboost'):
+        import xgboost as xgb
+
+        size = {'n_estimators': 30, 'max_depth': 3} if name == 'xgboost_small' else {}
+        return xgb.XGBClassifier(eval_metric='logloss', random_state=SEED, n_jobs=1, **size)
+    if name.startswith('random_forest'):
+        from sklearn.ensemble import RandomForestClassifier
+
+        size = {'n_estimators': 25, 'max_depth': 8} if name == 'random_forest_small' else {}
+        return RandomForestClassifier(random_state=SEED, n_jobs=1, **size)
+    if name == 'logistic_regression':
+        from sklearn.linear_model import LogisticRegression
+
+        return LogisticRegression(max_iter=1000)
+    raise ValueError(f"Unknown candidate: {name}")
+
+def candidate_available(name):
+    if name.startswith('xgboost'):
+        try:
+            import xgboost  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+# --- Data & folds ---
+
+def load_dataset(disease_type):
+    """
+    Features and labels prepared as in train.py.
+    Returns: (X float64 array, y int array, feature names, content hash of the file)
+    """
+    import numpy as np
+    import pandas as pd
+
+    file_name, read_kwargs, target = DATASETS[disease_type]
+    with open(os.path.join(RAW_DATA_DIR, file_name), 'rb') as f:
+        raw = f.read()
+    data = pd.read_csv(io.BytesIO(raw), **read_kwargs)
+    if 'id' in data.columns:
+        data = data.drop('id', axis=1)
+    if disease_type == 'cardio':
+        data['age'] = (data['age'] / 365.25).round().astype(int)
+    X = data.drop(target, axis=1)
+    return (X.to_numpy(dtype=np.float64), data[target].to_numpy(dtype=np.int64), list(X.columns),
+            hashlib.sha256(raw).hexdigest()[:12])
+
+def fold_assignments(disease_type, y, data_hash, k, seed=SEED):
+    """
+    Fold number of every row (StratifiedKFold), cached in FOLD_CACHE_DIR.
+    Returns: (folds int8 array, cache path)
+    """
+    import numpy as np
+
+    path = os.path.join(FOLD_CACHE_DIR, f"{disease_type}-{data_hash}-k{k}-s{seed}.npy")
+    if os.path.exists(path):
+        folds = np.load(path)
+        if len(folds) == len(y):
+            return folds, path
+
+    from sklearn.model_selection import StratifiedKFold
+
+    folds = np.empty(len(y), dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=k, shuffle=True, random_state=seed)
+    for fold, (_, test) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        folds[test] = fold
+    os.makedirs(FOLD_CACHE_DIR, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, folds)
+    os.replace(path + '.tmp', path)
+    return folds, path
+
+
+# --- Metrics ---
+
+def calibration_bins(y, proba, bins=CALIBRATION_BINS):
+    """Per probability bin: [rows, sum of predicted P, positives]; summable across folds."""
+    import numpy as np
+
+    index = np.minimum((proba * bins).astype(int), bins - 1)
+    return np.stack([
+        np.bincount(index, minlength=bins),
+        np.bincount(index, weights=proba, minlength=bins),
+        np.bincount(index, weights=y, minlength=bins)
+    ], axis=1).tolist()
+
+def reliability(bins):
+    """Expected calibration error and reliability table from summed calibration_bins()."""
+    total = sum(b[0] for b in bins) or 1
+    table, ece = [], 0.0
+    for i, (count, predicted, positives) in enumerate(bins):
+        if not count:
+            continue
+        mean_predicted, observed = predicted / count, positives / count
+        ece += count / total * abs(mean_predicted - observed)
+        table.append({
+            'bin': f"{i / len(bins):.1f}-{(i + 1) / len(bins):.1f}",
+            'rows': int(count),
+            'mean_predicted': round(mean_predicted, 4),
+            'observed_rate': round(observed, 4)
+        })
+    return round(ece, 4), table
+
+
+# --- Fold worker ---
+_worker_datasets = {}
+
+def _worker_dataset(disease_type, folds_path):
+    """Each worker process loads a dataset and its folds once."""
+    import numpy as np
+
+    if disease_type not in _worker_datasets:
+        X, y, _, _ = load_dataset(disease_type)
+        _worker_datasets[disease_type] = (X, y, np.load(folds_path))
+    return _worker_datasets[disease_type]
+
+def run_fold(disease_type, candidate, fold, folds_path, keep_model=False):
+    """
+    Fit a candidate on every fold but `fold` and score it on `fold`.
+    Returns: metrics dict; with keep_model also the fitted model and scaler
+    """
+    import numpy as np
+    from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+    X, y, folds = _worker_dataset(disease_type, folds_path)
+    train, test = folds != fold, folds == fold
+    scaler = StandardScaler().fit(X[train])
+    model = make_model(candidate)
+    start = time.perf_counter()
+    model.fit(scaler.transform(X[train]), y[train])
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(scaler.transform(X[test]))[:, 1]
+
+    result = {
+        'disease_type': disease_type,
+        'candidate': candidate,
+        'fold': fold,
+        'auc': float(roc_auc_score(y[test], proba)),
+        'accuracy': float(np.mean((proba >= 0.5) == y[test])),
+        'brier': float(brier_score_loss(y[test], proba)),
+        'log_loss': float(log_loss(y[test], np.clip(proba, 1e-15, 1 - 1e-15))),
+        'fit_seconds': fit_seconds,
+        'calibration': calibration_bins(y[test], proba)
+    }
+    if keep_model:
+        result['model'] = model
+        result['scaler'] = scaler
+    return result
+
+
+# --- Serving cost ---
+
+def best_ms(fn, rounds=LATENCY_ROUNDS):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4)
+
+def serving_cost(model, scaler, X):
+    """Pickled/compiled size and per-batch latency of a fitted model, measured in this process."""
+    import joblib
+
+    from ml.tree_ensemble import compile_model
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    cost = {
+        'pickle_kb': round(len(buffer.getvalue()) / 1024, 1),
+        'compiled_kb': None,
+        'latency_ms': {'predict_proba': {}, 'compiled': None}
+    }
+    for size in BATCH_SIZES:
+        batch = X[:size]
+        cost['latency_ms']['predict_proba'][str(size)] = best_ms(lambda: model.predict_proba(scaler.transform(batch)))
+    try:
+        compiled = compile_model(model, scaler)
+    except TypeError:
+        return cost  # Not a tree ensemble: served through predict_proba only
+    cost['compiled_kb'] = round(compiled.nbytes / 1024, 1)
+    cost['latency_ms']['compiled'] = {
+        str(size): best_ms(lambda: compiled.predict_proba(X[:size])) for size in BATCH_SIZES
+    }
+    return cost
+
+
+# --- Report ---
+
+def summarize(values):
+    import numpy as np
+
+    return {'mean': round(float(np.mean(values)), 4), 'std': round(float(np.std(values)), 4)}
+
+def markdown_report(report):
+    lines = [f"# Model evaluation ({report['folds']}-fold stratified CV, seed {report['seed']})", ""]
+    for disease_type, dataset in report['datasets'].items():
+        lines += [
+            f"## {disease_type} ({dataset['rows']:,} rows, {dataset['positive_rate']:.1%} positive)", "",
+            "| candidate | AUC | accuracy | Brier | ECE | pickle KB | compiled KB "
+            "| predict_proba ms (1 / 64) | compiled ms (1 / 64) | fit s |",
+            "|---|---|---|---|---|---|---|---|---|---|"
+        ]
+        for result in report['results']:
+            if result['disease_type'] != disease_type:
+                continue
+            metrics, cost = result['metrics'], result['serving']
+            proba_ms, compiled_ms = cost['latency_ms']['predict_proba'], cost['latency_ms']['compiled']
+            compiled_kb = "-" if cost['compiled_kb'] is None else f"{cost['compiled_kb']:,.0f}"
+            compiled_ms = "-" if compiled_ms is None else f"{compiled_ms['1']:.2f} / {compiled_ms['64']:.2f}"
+            lines.append(
+                f"| {result['candidate']} | {metrics['auc']['mean']:.3f} ± {metrics['auc']['std']:.3f} "
+                f"| {metrics['accuracy']['mean']:.3f} | {metrics['brier']['mean']:.3f} | {result['ece']:.3f} "
+                f"| {cost['pickle_kb']:,.0f} | {compiled_kb} | {proba_ms['1']:.2f} / {proba_ms['64']:.2f} "
+                f"| {compiled_ms} | {metrics['fit_seconds']['mean']:.1f} |"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def evaluate(diseases, candidates, k=5, jobs=None, seed=SEED):
+    """Run the CV for every (disease, candidate) and measure serving cost. Returns: report dict"""
+    datasets = {}
+    for disease_type in diseases:
+        try:
+            X, y, features, data_hash = load_dataset(disease_type)
+        except FileNotFoundError:
+            print(f"Error: '{DATASETS[disease_type][0]}' not found in {RAW_DATA_DIR}. Skipping {disease_type}.")
+            continue
+        folds, folds_path = fold_assignments(disease_type, y, data_hash, k, seed)
+        datasets[disease_type] = {
+            'X': X, 'folds_path': folds_path, 'rows': len(y), 'features': features,
+            'positive_rate': float(y.mean()), 'data_hash': data_hash
+        }
+
+    tasks = [(disease_type, candidate, fold, datasets[disease_type]['folds_path'], fold == 0)
+             for disease_type in datasets for candidate in candidates for fold in range(k)]
+    print(f"Scoring {len(tasks)} folds ({len(datasets)} diseases x {len(candidates)} candidates x {k}) "
+          f"with {jobs or os.cpu_count()} workers...")
+    fold_results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_fold, *task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            fold_results.append(result)
+            print(f"   [{done}/{len(tasks)}] {result['disease_type']}/{result['candidate']} fold {result['fold']}: "
+                  f"AUC {result['auc']:.3f} ({result['fit_seconds']:.1f}s)")
+
+    # Latency is measured serially, once the pool is idle, on the fold-0 models
+    results = []
+    for disease_type in datasets:
+        for candidate in candidates:
+            runs = sorted((r for r in fold_results
+                           if r['disease_type'] == disease_type and r['candidate'] == candidate),
+                          key=lambda r: r['fold'])
+            bins = [[sum(values) for values in zip(*rows)] for rows in zip(*(r['calibration'] for r in runs))]
+            ece, table = reliability(bins)
+            results.append({
+                'disease_type': disease_type,
+                'candidate': candidate,
+                'description': CANDIDATES[candidate],
+                'metrics': {name: summarize([r[name] for r in runs])
+                            for name in ('auc', 'accuracy', 'brier', 'log_loss', 'fit_seconds')},
+                'ece': ece,
+                'reliability': table,
+                'serving': serving_cost(runs[0]['model'], runs[0]['scaler'], datasets[disease_type]['X'])
+            })
+
+    return {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'folds': k,
+        'seed': seed,
+        'datasets': {disease_type: {key: value for key, value in dataset.items() if key != 'X'}
+                     for disease_type, dataset in datasets.items()},
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--diseases', default=','.join(DATASETS))
+    parser.add_argument('--candidates', default=','.join(CANDIDATES))
+    parser.add_argument('--output', default=REPORT_DIR, help="directory for report.json and report.md")
+    args = parser.parse_args()
+
+    candidates = []
+    for name in args.candidates.split(','):
+        if name not in CANDIDATES:
+            parser.error(f"unknown candidate {name!r} (choose from {', '.join(CANDIDATES)})")
+        if candidate_available(name):
+            candidates.append(name)
+        else:
+            print(f"⚠️ WARNING: xgboost is not installed. Skipping {name}.")
+    diseases = [d for d in args.diseases.split(',') if d]
+    for disease_type in diseases:
+        if disease_type not in DATASETS:
+            parser.error(f"unknown disease {disease_type!r} (choose from {', '.join(DATASETS)})")
+
+    report = evaluate(diseases, candidates, k=args.folds, jobs=args.jobs)
+    markdown = markdown_report(report)
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "report.json"), 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(args.output, "report.md"), 'w') as f:
+        f.write(markdown)
+    print("\n" + markdown)
+    print(f"Report written to {os.path.join(args.output, 'report.md')} (and report.json)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Continued training of a served model on confirmed outcomes.
+
+Instead of refitting from the full CSVs (ml/train.py), the current model
+is extended with a few more trees fitted on newly labeled rows:
+    XGBoost   boosting continues from the current booster (xgb_model=)
+    forests   warm start: new trees fitted on the new rows join the ensemble
+The fitted scaler is reused as is, so new trees see features on the same
+scale as the existing ones, and the scaler file (and its part of the
+version hash) does not change.
+
+An update is only written if it validates: on each validation set (held
+out feedback rows, and the test split train.py holds out of the original
+dataset) its log loss may exceed the current model's by at most
+`tolerance` (relative). The model pickle, and a recompiled .npz if one
+was being served, are then replaced atomically for the registry to
+hot-reload; the previous pickle is kept under history/.
+"""
+import copy
+import io
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.predict import FEATURE_CONFIGS
+from ml.registry import ARTIFACTS, artifact_version, compiled_name
+
+# --- Configuration ---
+ROUNDS = 20            # boosting rounds / trees added per update
+TOLERANCE = 0.01       # accepted relative increase in validation log loss
+HOLDOUT_SEED = 42      # train.py's train_test_split random_state
+HISTORY_DIR = "history"
+
+
+def feature_matrix(disease_type, health_rows):
+    """Model input rows from health_data dicts, as predict_with_model() builds them."""
+    import numpy as np
+
+    feature_order = FEATURE_CONFIGS[disease_type]['features']
+    return np.array([[health.get(key, 0) for key in feature_order] for health in health_rows], dtype=np.float64)
+
+
+def continue_training(model, X, y, rounds=ROUNDS):
+    """
+    A copy of `model` with `rounds` more trees fitted on scaled rows X.
+    Raises: TypeError for models that cannot be extended (e.g. compiled ones)
+    """
+    if hasattr(model, 'get_booster'):
+        import xgboost as xgb
+
+        params = {k: v for k, v in model.get_params().items() if k != 'use_label_encoder'}
+        updated = xgb.XGBClassifier(**dict(params, n_estimators=rounds))
+        updated.fit(X, y, xgb_model=model.get_booster())
+        return updated
+    if hasattr(model, 'estimators_') and 'warm_start' in model.get_params():
+        updated = copy.deepcopy(model)
+        updated.set_params(warm_start=True, n_estimators=len(model.estimators_) + rounds)
+        updated.fit(X, y)
+        updated.set_params(warm_start=False)
+        return updated
+    raise TypeError(f"cannot continue training {type(model).__name__}")
+
+
+def dataset_holdout(disease_type):
+    """
+    The test split train.py held out of the original dataset.
+    Returns: (X, y) unscaled, or None if there is no dataset for this disease
+    """
+    from ml.evaluate import DATASETS, load_dataset
+
+    if disease_type not in DATASETS:
+        return None
+    try:
+        X, y, _, _ = load_dataset(disease_type)
+    except FileNotFoundError:
+        return None
+
+    from sklearn.model_selection import train_test_split
+
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=HOLDOUT_SEED)
+    return X_test, y_test
+
+
+def evaluate(model, X, y):
+    """Log loss (and AUC when both classes occur) of a model on scaled rows."""
+    import numpy as np
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    proba = model.predict_proba(X)[:, 1]
+    return {
+        'rows': len(y),
+        'log_loss': float(log_loss(y, proba, labels=[0, 1])),
+        'auc': float(roc_auc_score(y, proba)) if len(np.unique(y)) == 2 else None
+    }
+
+
+def validate(current, updated, validation_sets, tolerance=TOLERANCE):
+    """
+    Compare two models on every (name, X scaled, y) validation set.
+    Returns: (True if `updated` does not regress on any set, {name: {'current': metrics, 'updated': metrics}})
+    """
+    report = {}
+    accepted = bool(validation_sets)
+    for name, X, y in validation_sets:
+        before, after = evaluate(current, X, y), evaluate(updated, X, y)
+        report[name] = {'current': before, 'updated': after}
+        if after['log_loss'] > before['log_loss'] * (1 + tolerance):
+            accepted = False
+    return accepted, report
+
+
+def _replace(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def write_model(model_dir, disease_type, model, scaler, scaler_blob, previous_blob, previous_version):
+    """
+    Replace the model pickle of `disease_type` in `model_dir`, keeping the
+    previous one as history/<previous version>.pkl. If a compiled .npz is
+    present it is recompiled first, so it never lags the pickle it came from.
+    Returns: (new version, previous .npz bytes or None)
+    Raises: TypeError if the model cannot be compiled (nothing is written then)
+    """
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    blob = buffer.getvalue()
+    version = artifact_version(disease_type, blob, scaler_blob)
+
+    history_dir = os.path.join(model_dir, HISTORY_DIR)
+    os.makedirs(history_dir, exist_ok=True)
+    _replace(os.path.join(history_dir, f"{previous_version}.pkl"), previous_blob)
+
+    compiled_path = os.path.join(model_dir, compiled_name(disease_type))
+    previous_compiled = None
+    if os.path.exists(compiled_path):
+        from ml.tree_ensemble import compile_model
+
+        compiled = compile_model(model, scaler, source_version=version)
+        with open(compiled_path, 'rb') as f:
+            previous_compiled = f.read()
+        buffer = io.BytesIO()
+        compiled.save(buffer)
+        _replace(compiled_path, buffer.getvalue())
+    _replace(os.path.join(model_dir, ARTIFACTS[disease_type][0]), blob)
+    return version, previous_compiled
+
+
+def restore_model(model_dir, disease_type, previous_blob, previous_compiled=None):
+    """Put back the files write_model() replaced (e.g. after the new model failed to load)."""
+    if previous_compiled is not None:
+        _replace(os.path.join(model_dir, compiled_name(disease_type)), previous_compiled)
+    _replace(os.path.join(model_dir, ARTIFACTS[disease_type][0]), previous_blob)
@@ -0,0 +1,194 @@
+"""
+Keyword NLP for symptom text.
+
+Standard library only, so CLI tools and the API can detect diseases from
+symptoms without importing numpy, scikit-learn or xgboost (the models are
+loaded by ml.predict on first use).
+"""
+import re
+
+# --- EXPANDED NLP Keyword Libraries for ALL Diseases ---
+DISEASE_KEYWORDS = {
+    'diabetes': {
+        'keywords': [
+            'fatigue', 'tired', 'exhausted', 'weakness',
+            'thirsty', 'thirst', 'dehydrated', 'excessive thirst',
+            'urination', 'urine', 'peeing', 'frequent bathroom', 'polyuria',
+            'blurred', 'vision', 'blurry', 'eyesight', 'eye problems',
+            'hungry', 'hunger', 'appetite', 'increased appetite',
+            'slow-healing', 'wounds', 'cuts', 'healing slowly',
+            'numbness', 'tingling', 'pins and needles', 'neuropathy',
+            'yeast', 'infection', 'itching', 'skin infection',
+            'weight loss', 'losing weight', 'unexplained weight loss',
+            'dry mouth', 'dry skin',
+            'glucose', 'sugar', 'blood sugar', 'high sugar'
+        ],
+        'weight': 1.0
+    },
+    
+    'cardio': {
+        'keywords': [
+            'chest pain', 'chest discomfort', 'angina', 'tightness', 'pressure',
+            'shortness of breath', 'breathless', 'difficulty breathing',
+            'dizzy', 'dizziness', 'lightheaded', 'vertigo',
+            'faint', 'fainting', 'syncope', 'blackout',
+            'fatigue', 'tired', 'exhausted', 'weakness',
+            'swollen', 'swelling', 'edema', 'puffy legs', 'puffy ankles',
+            'heartbeat', 'palpitations', 'racing heart', 'irregular heartbeat',
+            'skipped beat', 'fluttering', 'heart flutter',
+            'blood pressure', 'bp', 'hypertension', 'high blood pressure',
+            'sweating', 'cold sweat', 'nausea', 'vomiting',
+            'arm pain', 'jaw pain', 'neck pain', 'back pain',
+            'heart attack', 'stroke', 'cardiac'
+        ],
+        'weight': 1.0
+    },
+    
+    'respiratory': {
+        'keywords': [
+            'cough', 'coughing', 'persistent cough', 'chronic cough',
+            'shortness of breath', 'breathless', 'difficulty breathing', 'dyspnea',
+            'wheezing', 'wheeze', 'whistling sound',
+            'chest tightness', 'chest congestion',
+            'mucus', 'phlegm', 'sputum', 'coughing up mucus',
+            'asthma', 'asthmatic',
+            'pneumonia', 'bronchitis',
+            'fever', 'high temperature',
+            'sore throat', 'throat pain',
+            'nasal congestion', 'stuffy nose', 'runny nose',
+            'covid', 'coronavirus', 'covid-19',
+            'tuberculosis', 'tb',
+            'copd', 'emphysema',
+            'lung pain', 'breathing problem'
+        ],
+        'weight': 1.0
+    },
+    
+    'cancer': {
+        'keywords': [
+            'lump', 'mass', 'tumor', 'growth',
+            'unexplained weight loss', 'rapid weight loss',
+            'persistent pain', 'chronic pain',
+            'fatigue', 'extreme tiredness',
+            'night sweats', 'sweating at night',
+            'fever', 'persistent fever',
+            'bleeding', 'blood', 'abnormal bleeding',
+            'cough', 'persistent cough', 'blood in cough',
+            'difficulty swallowing', 'swallowing problem',
+            'skin changes', 'mole changes', 'skin lesion',
+            'jaundice', 'yellowing',
+            'lymph nodes', 'swollen lymph nodes',
+            'cancer', 'carcinoma', 'malignant'
+        ],
+        'weight': 1.2  # Higher weight due to severity
+    },
+    
+    'thyroid': {
+        'keywords': [
+            'weight gain', 'weight loss', 'unexplained weight change',
+            'fatigue', 'tired', 'exhausted',
+            'hair loss', 'thinning hair',
+            'cold intolerance', 'feeling cold', 'sensitivity to cold',
+            'heat intolerance', 'feeling hot', 'sweating',
+            'heart palpitations', 'rapid heartbeat',
+            'mood swings', 'anxiety', 'depression',
+            'constipation', 'bowel problems',
+            'dry skin', 'skin changes',
+            'neck swelling', 'goiter',
+            'thyroid', 'hyperthyroid', 'hypothyroid'
+        ],
+        'weight': 0.9
+    },
+    
+    'kidney': {
+        'keywords': [
+            'urination', 'frequent urination', 'decreased urination',
+            'blood in urine', 'dark urine', 'foamy urine',
+            'swelling', 'swollen legs', 'swollen ankles', 'edema',
+            'fatigue', 'weakness', 'tired',
+            'nausea', 'vomiting', 'loss of appetite',
+            'back pain', 'flank pain', 'side pain',
+            'high blood pressure', 'hypertension',
+            'shortness of breath',
+            'kidney', 'renal', 'kidney failure'
+        ],
+        'weight': 1.0
+    },
+    
+    'liver': {
+        'keywords': [
+            'jaundice', 'yellowing', 'yellow skin', 'yellow eyes',
+            'abdominal pain', 'stomach pain', 'belly pain',
+            'swelling', 'abdominal swelling', 'ascites',
+            'nausea', 'vomiting', 'loss of appetite',
+            'fatigue', 'weakness',
+            'dark urine', 'pale stool',
+            'itching', 'skin itching',
+            'liver', 'hepatitis', 'cirrhosis', 'fatty liver'
+        ],
+        'weight': 1.0
+    }
+}
+
+# Word-boundary pattern for every keyword, compiled once
+_KEYWORD_PATTERNS = {
+    disease: [(keyword, re.compile(r'\b' + re.escape(keyword) + r'\b')) for keyword in config['keywords']]
+    for disease, config in DISEASE_KEYWORDS.items()
+}
+
+def detect_disease_from_symptoms(symptoms_text):
+    """
+    Automatically detect which disease(s) the symptoms indicate.
+    Returns: List of (disease, confidence_score) tuples sorted by confidence
+    """
+    if not symptoms_text or not symptoms_text.strip():
+        return []
+    
+    symptoms_lower = symptoms_text.lower()
+    disease_scores = {}
+    
+    for disease, config in DISEASE_KEYWORDS.items():
+        keywords = config['keywords']
+        weight = config['weight']
+        matched_keywords = []
+        
+        for keyword, pattern in _KEYWORD_PATTERNS[disease]:
+            if pattern.search(symptoms_lower):
+                matched_keywords.append(keyword)
+        
+        if matched_keywords:
+            # Score = (number of matches * weight) / sqrt(total keywords)
+            # This normalizes scores across diseases with different keyword counts
+            score = (len(matched_keywords) * weight * 100) / (len(keywords) ** 0.5)
+            disease_scores[disease] = {
+                'score': min(score, 100),  # Cap at 100
+                'matched_keywords': list(set(matched_keywords)),
+                'match_count': len(matched_keywords)
+            }
+    
+    # Sort by score descending
+    sorted_diseases = sorted(
+        disease_scores.items(), 
+        key=lambda x: x[1]['score'], 
+        reverse=True
+    )
+    
+    return sorted_diseases
+
+def analyze_symptoms(symptoms_text, disease_type):
+    """
+    Analyze symptoms for a specific disease type.
+    Returns: (symptom_count, detected_symptoms_list)
+    """
+    if disease_type not in DISEASE_KEYWORDS:
+        return 0, []
+    
+    symptoms_lower = symptoms_text.lower()
+    detected_symptoms = []
+    
+    for keyword, pattern in _KEYWORD_PATTERNS[disease_type]:
+        if pattern.search(symptoms_lower):
+            detected_symptoms.append(keyword)
+    
+    unique_symptoms = list(set(detected_symptoms))
+    return len(unique_symptoms), unique_symptoms
@@ -1,161 +1,96 @@
-import joblib
-import numpy as np
+"""
+Disease risk prediction: keyword NLP (ml.keywords) combined with the
+trained models.
+
+Models, scalers and their heavy dependencies (joblib, numpy, scikit-learn,
+xgboost) are loaded on first use rather than at import, so importing this
+module is cheap; call load_models() to load them eagerly.
+
+The loaded models form a versioned snapshot (ml.registry). reload_models()
+loads changed artifacts, smoke-tests them and swaps the snapshot in one
+assignment; every prediction reports the model version that scored it.
+"""
 import os
-import re
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.keywords import DISEASE_KEYWORDS, analyze_symptoms, detect_disease_from_symptoms
+from ml.registry import build_registry
 
 # --- Configuration ---
 MODEL_DIR = "models/"
 
-# --- Load ALL Models & Scalers ---
+# --- Models & Scalers (loaded on first use) ---
+_registry = None  # current ml.registry.ModelRegistry; replaced as a whole, never mutated
+_registry_lock = threading.Lock()  # serializes the first load and reloads
+# Views of the current registry, kept for callers that read them directly
 models = {}
 scalers = {}
+model_status = {}  # disease -> 'loaded' / 'not_found'
+# Optional observer of every model score (see set_shadow())
+_shadow_submit = None
 
-# Load Diabetes Model
-try:
-    models['diabetes'] = joblib.load(os.path.join(MODEL_DIR, "diabetes_model.pkl"))
-    scalers['diabetes'] = joblib.load(os.path.join(MODEL_DIR, "diabetes_scaler.pkl"))
-    print("✅ Diabetes models loaded.")
-except FileNotFoundError:
-    print("⚠️ WARNING: Diabetes models not found.")
-    
-# Load Cardiovascular Model
-try:
-    models['cardio'] = joblib.load(os.path.join(MODEL_DIR, "cardio_model.pkl"))
-    scalers['cardio'] = joblib.load(os.path.join(MODEL_DIR, "cardio_scaler.pkl"))
-    print("✅ Cardiovascular models loaded.")
-except FileNotFoundError:
-    print("⚠️ WARNING: Cardiovascular models not found.")
 
-# Load Respiratory Model (if exists)
-try:
-    models['respiratory'] = joblib.load(os.path.join(MODEL_DIR, "respiratory_model.pkl"))
-    scalers['respiratory'] = joblib.load(os.path.join(MODEL_DIR, "respiratory_scaler.pkl"))
-    print("✅ Respiratory models loaded.")
-except FileNotFoundError:
-    print("⚠️ INFO: Respiratory model not found (optional).")
+class ModelValidationError(Exception):
+    """A newly loaded model failed its smoke inference and was not published."""
 
-# --- EXPANDED NLP Keyword Libraries for ALL Diseases ---
-DISEASE_KEYWORDS = {
-    'diabetes': {
-        'keywords': [
-            'fatigue', 'tired', 'exhausted', 'weakness',
-            'thirsty', 'thirst', 'dehydrated', 'excessive thirst',
-            'urination', 'urine', 'peeing', 'frequent bathroom', 'polyuria',
-            'blurred', 'vision', 'blurry', 'eyesight', 'eye problems',
-            'hungry', 'hunger', 'appetite', 'increased appetite',
-            'slow-healing', 'wounds', 'cuts', 'healing slowly',
-            'numbness', 'tingling', 'pins and needles', 'neuropathy',
-            'yeast', 'infection', 'itching', 'skin infection',
-            'weight loss', 'losing weight', 'unexplained weight loss',
-            'dry mouth', 'dry skin',
-            'glucose', 'sugar', 'blood sugar', 'high sugar'
-        ],
-        'weight': 1.0
-    },
-    
-    'cardio': {
-        'keywords': [
-            'chest pain', 'chest discomfort', 'angina', 'tightness', 'pressure',
-            'shortness of breath', 'breathless', 'difficulty breathing',
-            'dizzy', 'dizziness', 'lightheaded', 'vertigo',
-            'faint', 'fainting', 'syncope', 'blackout',
-            'fatigue', 'tired', 'exhausted', 'weakness',
-            'swollen', 'swelling', 'edema', 'puffy legs', 'puffy ankles',
-            'heartbeat', 'palpitations', 'racing heart', 'irregular heartbeat',
-            'skipped beat', 'fluttering', 'heart flutter',
-            'blood pressure', 'bp', 'hypertension', 'high blood pressure',
-            'sweating', 'cold sweat', 'nausea', 'vomiting',
-            'arm pain', 'jaw pain', 'neck pain', 'back pain',
-            'heart attack', 'stroke', 'cardiac'
-        ],
-        'weight': 1.0
-    },
-    
-    'respiratory': {
-        'keywords': [
-            'cough', 'coughing', 'persistent cough', 'chronic cough',
-            'shortness of breath', 'breathless', 'difficulty breathing', 'dyspnea',
-            'wheezing', 'wheeze', 'whistling sound',
-            'chest tightness', 'chest congestion',
-            'mucus', 'phlegm', 'sputum', 'coughing up mucus',
-            'asthma', 'asthmatic',
-            'pneumonia', 'bronchitis',
-            'fever', 'high temperature',
-            'sore throat', 'throat pain',
-            'nasal congestion', 'stuffy nose', 'runny nose',
-            'covid', 'coronavirus', 'covid-19',
-            'tuberculosis', 'tb',
-            'copd', 'emphysema',
-            'lung pain', 'breathing problem'
-        ],
-        'weight': 1.0
-    },
-    
-    'cancer': {
-        'keywords': [
-            'lump', 'mass', 'tumor', 'growth',
-            'unexplained weight loss', 'rapid weight loss',
-            'persistent pain', 'chronic pain',
-            'fatigue', 'extreme tiredness',
-            'night sweats', 'sweating at night',
-            'fever', 'persistent fever',
-            'bleeding', 'blood', 'abnormal bleeding',
-            'cough', 'persistent cough', 'blood in cough',
-            'difficulty swallowing', 'swallowing problem',
-            'skin changes', 'mole changes', 'skin lesion',
-            'jaundice', 'yellowing',
-            'lymph nodes', 'swollen lymph nodes',
-            'cancer', 'carcinoma', 'malignant'
-        ],
-        'weight': 1.2  # Higher weight due to severity
-    },
-    
-    'thyroid': {
-        'keywords': [
-            'weight gain', 'weight loss', 'unexplained weight change',
-            'fatigue', 'tired', 'exhausted',
-            'hair loss', 'thinning hair',
-            'cold intolerance', 'feeling cold', 'sensitivity to cold',
-            'heat intolerance', 'feeling hot', 'sweating',
-            'heart palpitations', 'rapid heartbeat',
-            'mood swings', 'anxiety', 'depression',
-            'constipation', 'bowel problems',
-            'dry skin', 'skin changes',
-            'neck swelling', 'goiter',
-            'thyroid', 'hyperthyroid', 'hypothyroid'
-        ],
-        'weight': 0.9
-    },
-    
-    'kidney': {
-        'keywords': [
-            'urination', 'frequent urination', 'decreased urination',
-            'blood in urine', 'dark urine', 'foamy urine',
-            'swelling', 'swollen legs', 'swollen ankles', 'edema',
-            'fatigue', 'weakness', 'tired',
-            'nausea', 'vomiting', 'loss of appetite',
-            'back pain', 'flank pain', 'side pain',
-            'high blood pressure', 'hypertension',
-            'shortness of breath',
-            'kidney', 'renal', 'kidney failure'
-        ],
-        'weight': 1.0
-    },
-    
-    'liver': {
-        'keywords': [
-            'jaundice', 'yellowing', 'yellow skin', 'yellow eyes',
-            'abdominal pain', 'stomach pain', 'belly pain',
-            'swelling', 'abdominal swelling', 'ascites',
-            'nausea', 'vomiting', 'loss of appetite',
-            'fatigue', 'weakness',
-            'dark urine', 'pale stool',
-            'itching', 'skin itching',
-            'liver', 'hepatitis', 'cirrhosis', 'fatty liver'
-        ],
-        'weight': 1.0
+
+def _publish(registry):
+    global _registry, models, scalers, model_status
+    models, scalers, model_status = registry.models, registry.scalers, registry.status
+    _registry = registry
+
+def current_registry():
+    """The published registry, or None if the models have not been loaded yet."""
+    return _registry
+
+def get_registry():
+    """Current registry snapshot, loading the models on first use (thread-safe)."""
+    registry = _registry
+    if registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _publish(build_registry(MODEL_DIR)[0])
+            registry = _registry
+    return registry
+
+def set_shadow(submit):
+    """
+    Register `submit(disease_type, features, probability, version)`, called
+    with the raw feature row after every model score (None to unregister).
+    It runs on the request path, so it must only enqueue.
+    """
+    global _shadow_submit
+    _shadow_submit = submit
+
+def load_models():
+    """Load all models & scalers once (thread-safe). Returns: the models dict"""
+    return get_registry().models
+
+def reload_models():
+    """
+    Load the artifacts in MODEL_DIR that changed since the current registry,
+    smoke-test the new models and publish the new registry. Predictions that
+    are already running finish on the registry they started with.
+    Returns: {'reloaded': [versions loaded], 'generation': n, 'versions': {disease: version}}
+    Raises: ModelValidationError or the unpickling error; the current registry stays published
+    """
+    with _registry_lock:
+        previous = _registry
+        registry, changed = build_registry(MODEL_DIR, previous)
+        if changed:
+            smoke_test(registry, changed)
+        if registry is not previous:
+            _publish(registry)
+    if changed and previous is not None:
+        print(f"✅ Model registry generation {registry.generation} published: {', '.join(registry.versions[d] for d in changed)}")
+    return {
+        'reloaded': [registry.versions[d] for d in changed],
+        'generation': registry.generation,
+        'versions': dict(registry.versions)
     }
-}
 
 # Feature configurations for each disease
 FEATURE_CONFIGS = {
@@ -175,75 +110,19 @@ FEATURE_CONFIGS = {
     }
 }
 
-def detect_disease_from_symptoms(symptoms_text):
-    """
-    Automatically detect which disease(s) the symptoms indicate.
-    Returns: List of (disease, confidence_score) tuples sorted by confidence
-    """
-    if not symptoms_text or not symptoms_text.strip():
-        return []
-    
-    symptoms_lower = symptoms_text.lower()
-    disease_scores = {}
-    
-    for disease, config in DISEASE_KEYWORDS.items():
-        keywords = config['keywords']
-        weight = config['weight']
-        matched_keywords = []
-        
-        for keyword in keywords:
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, symptoms_lower):
-                matched_keywords.append(keyword)
-        
-        if matched_keywords:
-            # Score = (number of matches * weight) / sqrt(total keywords)
-            # This normalizes scores across diseases with different keyword counts
-            score = (len(matched_keywords) * weight * 100) / (len(keywords) ** 0.5)
-            disease_scores[disease] = {
-                'score': min(score, 100),  # Cap at 100
-                'matched_keywords': list(set(matched_keywords)),
-                'match_count': len(matched_keywords)
-            }
-    
-    # Sort by score descending
-    sorted_diseases = sorted(
-        disease_scores.items(), 
-        key=lambda x: x[1]['score'], 
-        reverse=True
-    )
-    
-    return sorted_diseases
-
-def analyze_symptoms(symptoms_text, disease_type):
-    """
-    Analyze symptoms for a specific disease type.
-    Returns: (symptom_count, detected_symptoms_list)
-    """
-    if disease_type not in DISEASE_KEYWORDS:
-        return 0, []
-    
-    keywords = DISEASE_KEYWORDS[disease_type]['keywords']
-    symptoms_lower = symptoms_text.lower()
-    detected_symptoms = []
-    
-    for keyword in keywords:
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        if re.search(pattern, symptoms_lower):
-            detected_symptoms.append(keyword)
-    
-    unique_symptoms = list(set(detected_symptoms))
-    return len(unique_symptoms), unique_symptoms
-
-def predict_with_model(disease_type, health_data):
+def predict_with_model(disease_type, health_data, registry=None):
     """
     Make prediction using trained ML model if available.
     Returns: (ml_score, model_used)
     """
-    if disease_type not in models or models[disease_type] is None:
+    if registry is None:
+        registry = get_registry()
+    if registry.models.get(disease_type) is None:
         return None, False
     
     try:
+        import numpy as np
+
         feature_config = FEATURE_CONFIGS.get(disease_type, {})
         feature_order = feature_config.get('features', [])
         
@@ -251,10 +130,15 @@ def predict_with_model(disease_type, health_data):
         features = np.array([[health_data.get(key, 0) for key in feature_order]])
         
         # Scale features
-        features_scaled = scalers[disease_type].transform(features)
+        features_scaled = registry.scalers[disease_type].transform(features)
         
         # Get prediction probability
-        ml_score_prob = models[disease_type].predict_proba(features_scaled)[0][1]
+        ml_score_prob = registry.models[disease_type].predict_proba(features_scaled)[0][1]
+        if _shadow_submit is not None:
+            try:
+                _shadow_submit(disease_type, features, ml_score_prob, registry.versions[disease_type])
+            except Exception:
+                pass  # Shadow scoring must never affect the primary result
         ml_model_score = ml_score_prob * 100
         
         return ml_model_score, True
@@ -285,6 +169,9 @@ def make_prediction(disease_type, health_data, symptoms):
                 "error": "Could not detect any specific disease from symptoms. Please provide more detailed symptoms or select a specific disease type."
             }
         
+        # One registry snapshot for the whole request
+        registry = get_registry()
+
         # Return top 3 detected diseases
         results = {
             'detection_mode': 'auto',
@@ -296,7 +183,7 @@ def make_prediction(disease_type, health_data, symptoms):
             symptom_score = min(symptom_count * 5, 50)  # Cap at 50% from symptoms
             
             # Try to get ML score if model exists and data is available
-            ml_score, model_used = predict_with_model(disease, health_data)
+            ml_score, model_used = predict_with_model(disease, health_data, registry)
             
             if ml_score is not None:
                 final_score = (ml_score * 0.7) + (symptom_score * 0.3)
@@ -315,6 +202,7 @@ def make_prediction(disease_type, health_data, symptoms):
                 'matched_symptoms': info['matched_keywords'][:5],  # Top 5
                 'symptom_count': symptom_count,
                 'model_used': model_used,
+                'model_version': registry.versions.get(disease) if model_used else None,
                 'risk_category': 'HIGH' if final_score > 70 else 'MODERATE' if final_score > 40 else 'LOW'
             })
         
@@ -330,7 +218,8 @@ def make_prediction(disease_type, health_data, symptoms):
         symptom_risk_boost = symptom_count * 5
         
         # Try ML prediction
-        ml_score, model_used = predict_with_model(disease_type, health_data)
+        registry = get_registry()
+        ml_score, model_used = predict_with_model(disease_type, health_data, registry)
         
         if ml_score is None:
             # No model available - use symptom-based scoring
@@ -353,9 +242,88 @@ def make_prediction(disease_type, health_data, symptoms):
             'symptom_risk_boost': symptom_risk_boost,
             'final_risk_score': round(final_score, 2),
             'risk_category': risk_category,
-            'model_used': model_used
+            'model_used': model_used,
+            'model_version': registry.versions.get(disease_type) if model_used else None
         }
 
+# --- Warm-up ---
+
+# Typical inputs for synthetic warm-up inferences
+WARMUP_HEALTH_DATA = {
+    'Pregnancies': 1, 'Glucose': 120, 'BloodPressure': 80, 'SkinThickness': 20, 'Insulin': 80,
+    'BMI': 27.5, 'DiabetesPedigreeFunction': 0.5, 'Age': 50,
+    'age': 50, 'gender': 1, 'height': 168, 'weight': 75, 'ap_hi': 130, 'ap_lo': 85,
+    'cholesterol': 1, 'gluc': 1, 'smoke': 0, 'alco': 0, 'active': 1,
+    'smoking': 0, 'cough_duration': 0, 'fever': 0, 'oxygen_level': 97
+}
+WARMUP_SYMPTOMS = "tired and very thirsty, frequent urination, some chest pain and a persistent cough"
+
+def _synthetic_features(disease_type, size):
+    import numpy as np
+
+    row = [WARMUP_HEALTH_DATA.get(key, 0) for key in FEATURE_CONFIGS.get(disease_type, {}).get('features', [])]
+    # Jitter the rows a little so every tree path gets exercised
+    return np.array([row] * size, dtype=float) * np.linspace(0.8, 1.2, size)[:, None]
+
+def smoke_test(registry, diseases, size=8):
+    """
+    Score synthetic rows with each of `diseases` in `registry` and check that
+    predict_proba returns one finite probability pair per row.
+    Raises: ModelValidationError naming the model version
+    """
+    import numpy as np
+
+    for disease_type in diseases:
+        model = registry.models.get(disease_type)
+        if model is None:
+            continue
+        version = registry.versions[disease_type]
+        try:
+            proba = np.asarray(model.predict_proba(
+                registry.scalers[disease_type].transform(_synthetic_features(disease_type, size))))
+        except Exception as e:
+            raise ModelValidationError(f"{version}: smoke inference failed: {type(e).__name__}: {e}")
+        if proba.shape != (size, 2) or not np.isfinite(proba).all() or proba.min() < 0 or proba.max() > 1:
+            raise ModelValidationError(f"{version}: predict_proba returned invalid output of shape {proba.shape}")
+
+def warm_up(batch_sizes=(1, 8, 64), rounds=2):
+    """
+    Load the models and run synthetic inferences through each of them (one
+    scaler + predict_proba call per batch size) and through the keyword
+    matcher and make_prediction(), so first requests do not pay for lazy
+    initialization.
+    Returns: {name: {"<batch size>": ms}} for every model plus 'keywords'
+    """
+    import time
+
+    registry = get_registry()
+    timings = {}
+    for disease_type, model in registry.models.items():
+        scaler = registry.scalers[disease_type]
+        timings[disease_type] = {}
+        for size in batch_sizes:
+            features = _synthetic_features(disease_type, size)
+            best = None
+            for _ in range(rounds):
+                start = time.perf_counter()
+                model.predict_proba(scaler.transform(features))
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[disease_type][str(size)] = round(best, 2)
+
+    timings['keywords'] = {}
+    for size in batch_sizes:
+        start = time.perf_counter()
+        for _ in range(size):
+            detect_disease_from_symptoms(WARMUP_SYMPTOMS)
+        timings['keywords'][str(size)] = round((time.perf_counter() - start) * 1000, 2)
+
+    # Full prediction path once per mode
+    make_prediction('auto', WARMUP_HEALTH_DATA, WARMUP_SYMPTOMS)
+    for disease_type in DISEASE_KEYWORDS:
+        make_prediction(disease_type, WARMUP_HEALTH_DATA, WARMUP_SYMPTOMS)
+    return timings
+
 # --- Test function ---
 if __name__ == "__main__":
     print("\n" + "="*60)
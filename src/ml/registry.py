@@ -0,0 +1,196 @@
+"""
+Versioned model registry.
+
+A ModelRegistry is an immutable snapshot of the loaded models and scalers
+together with the version of every artifact pair. ml.predict keeps the
+current snapshot in a single module-level reference: a prediction reads
+that reference once and uses it throughout, so swapping in a new snapshot
+never changes the models under a request that is already running.
+
+Versions come from the artifact contents (first 12 hex digits of the
+SHA-256 of model + scaler file), so the same files get the same version in
+every worker process and across restarts.
+
+A compiled model (<disease>_model.npz, see ml.tree_ensemble and
+scripts/compile_models.py) is served instead of the pickled pair it was
+compiled from, under the same version; it is ignored if the pickles have
+changed since.
+"""
+import hashlib
+import io
+import os
+import time
+
+# disease -> (model file, scaler file, loaded message, missing message)
+ARTIFACTS = {
+    'diabetes': ("diabetes_model.pkl", "diabetes_scaler.pkl",
+                 "✅ Diabetes models loaded.", "⚠️ WARNING: Diabetes models not found."),
+    'cardio': ("cardio_model.pkl", "cardio_scaler.pkl",
+               "✅ Cardiovascular models loaded.", "⚠️ WARNING: Cardiovascular models not found."),
+    'respiratory': ("respiratory_model.pkl", "respiratory_scaler.pkl",
+                    "✅ Respiratory models loaded.", "⚠️ INFO: Respiratory model not found (optional)."),
+}
+
+
+def compiled_name(disease_type):
+    return f"{disease_type}_model.npz"
+
+def artifact_signature(model_dir, disease_type):
+    """
+    (size, mtime_ns) of the model, scaler and compiled files (None for a
+    missing one), or None if there is nothing to load. Cheap enough to poll.
+    """
+    signature = []
+    for name in ARTIFACTS[disease_type][:2] + (compiled_name(disease_type),):
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_size, stat.st_mtime_ns))
+    if signature[2] is None and None in signature[:2]:
+        return None
+    return tuple(signature)
+
+def scan_signatures(model_dir):
+    return {disease_type: artifact_signature(model_dir, disease_type) for disease_type in ARTIFACTS}
+
+
+class ModelRegistry:
+    """One generation of loaded models. Never mutated once published."""
+
+    __slots__ = ('models', 'scalers', 'status', 'versions', 'signatures', 'generation', 'loaded_at')
+
+    def __init__(self, models, scalers, status, versions, signatures, generation):
+        self.models = models            # disease -> fitted model
+        self.scalers = scalers          # disease -> fitted scaler
+        self.status = status            # disease -> 'loaded' / 'not_found'
+        self.versions = versions        # disease -> "<disease>-<content hash>"
+        self.signatures = signatures    # disease -> artifact_signature() at load time
+        self.generation = generation
+        self.loaded_at = time.time()
+
+    def describe(self):
+        """Generation plus status and version of every model."""
+        return {
+            'generation': self.generation,
+            'loaded_at': self.loaded_at,
+            'models': {
+                disease_type: {
+                    'status': self.status.get(disease_type, 'not_found'),
+                    'version': self.versions.get(disease_type),
+                    'format': model_format(self.models.get(disease_type))
+                }
+                for disease_type in ARTIFACTS
+            }
+        }
+
+
+def model_format(model):
+    if model is None:
+        return None
+    return 'compiled' if type(model).__name__ == 'TreeEnsemble' else 'pickle'
+
+def artifact_version(disease_type, model_blob, scaler_blob):
+    """Version of a model + scaler pair: "<disease>-<first 12 hex digits of their SHA-256>"."""
+    digest = hashlib.sha256(model_blob)
+    digest.update(scaler_blob)
+    return f"{disease_type}-{digest.hexdigest()[:12]}"
+
+def read_pickled(model_dir, disease_type):
+    """
+    Read the bytes of one model + scaler pair.
+    Returns: ([model bytes, scaler bytes], version)
+    Raises: FileNotFoundError if either file is missing
+    """
+    blobs = []
+    for name in ARTIFACTS[disease_type][:2]:
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            blobs.append(f.read())
+    return blobs, artifact_version(disease_type, *blobs)
+
+def load_artifact(model_dir, disease_type):
+    """
+    Load one model + scaler pair, or its compiled model if that is current.
+    The bytes are read once and both hashed and loaded from memory, so the
+    version always matches the loaded objects.
+    Returns: (model, scaler, version, signature)
+    Raises: FileNotFoundError if there is nothing to load
+    """
+    signature = artifact_signature(model_dir, disease_type)
+    if signature is None:
+        raise FileNotFoundError(f"no {disease_type} model in {model_dir}")
+    blobs, version = read_pickled(model_dir, disease_type) if None not in signature[:2] else (None, None)
+
+    if signature[2] is not None:
+        from ml.tree_ensemble import FOLDED_SCALER, TreeEnsemble
+
+        with open(os.path.join(model_dir, compiled_name(disease_type)), 'rb') as f:
+            compiled = TreeEnsemble.load(io.BytesIO(f.read()))
+        if version is None or compiled.source_version == version:
+            return compiled, FOLDED_SCALER, compiled.source_version or version, signature
+        print(f"⚠️ WARNING: {compiled_name(disease_type)} was compiled from {compiled.source_version}, "
+              f"not {version}; serving the pickled model.")
+    if blobs is None:
+        raise FileNotFoundError(f"no {disease_type} model in {model_dir}")
+
+    import joblib
+
+    model = joblib.load(io.BytesIO(blobs[0]))
+    scaler = joblib.load(io.BytesIO(blobs[1]))
+    return model, scaler, version, signature
+
+
+def build_registry(model_dir, previous=None, quiet=False):
+    """
+    Load the artifacts in `model_dir` into a new registry. With `previous`,
+    only pairs whose files changed are read again; unchanged models, and
+    models whose files have disappeared (e.g. half-way through a copy), are
+    carried over. `quiet` suppresses the load messages.
+    Returns: (registry, [diseases whose version changed]); `previous` itself if nothing changed
+    Raises: whatever unpickling a changed artifact raises
+    """
+    models, scalers, status, versions, signatures = {}, {}, {}, {}, {}
+    changed = []
+    for disease_type, (_, _, loaded_message, missing_message) in ARTIFACTS.items():
+        signature = artifact_signature(model_dir, disease_type)
+        old_version = previous.versions.get(disease_type) if previous else None
+        if previous is not None and (signature == previous.signatures.get(disease_type)
+                                     or (signature is None and old_version)):
+            if old_version:
+                models[disease_type] = previous.models[disease_type]
+                scalers[disease_type] = previous.scalers[disease_type]
+                versions[disease_type] = old_version
+            status[disease_type] = previous.status[disease_type]
+            signatures[disease_type] = previous.signatures[disease_type]
+            continue
+
+        try:
+            model, scaler, version, signature = load_artifact(model_dir, disease_type)
+        except FileNotFoundError:
+            status[disease_type] = 'not_found'
+            signatures[disease_type] = None
+            if previous is None and not quiet:
+                print(missing_message)
+            continue
+        models[disease_type] = model
+        scalers[disease_type] = scaler
+        versions[disease_type] = version
+        status[disease_type] = 'loaded'
+        signatures[disease_type] = signature
+        if version != old_version or model_format(model) != model_format(previous.models.get(disease_type)):
+            changed.append(disease_type)
+            if not quiet:
+                print(loaded_message if previous is None else f"🔄 Loaded {version} ({model_format(model)}).")
+        else:
+            # Touched but identical contents: keep the objects already in use
+            models[disease_type] = previous.models[disease_type]
+            scalers[disease_type] = previous.scalers[disease_type]
+
+    if previous is not None and not changed:
+        if signatures == previous.signatures:
+            return previous, changed
+        generation = previous.generation
+    else:
+        generation = previous.generation + 1 if previous else 1
+    return ModelRegistry(models, scalers, status, versions, signatures, generation), changed
@@ -0,0 +1,259 @@
+"""
+Array-backed tree ensembles for serving.
+
+compile_model() flattens a fitted tree ensemble (scikit-learn
+RandomForest/ExtraTrees/DecisionTree classifiers or a binary:logistic
+XGBoost model) into contiguous NumPy arrays: one row per node with the
+feature index, threshold, left/right child and leaf value. The fitted
+StandardScaler is folded into the thresholds
+    (x - mean) / scale < t   <=>   x < t * scale + mean   (scale > 0)
+so serving needs neither the scaler nor scikit-learn/xgboost: a compiled
+model is a single .npz file loaded with NumPy alone.
+
+Both libraries compare float32 features, so each split is first turned
+into the float64 boundary where the float32 rounding of the input flips
+the test; results then match predict_proba exactly, even for inputs equal
+to a training value.
+
+TreeEnsemble.predict_proba() walks all trees of a whole batch one level
+per step. Leaves point to themselves, so after `depth` steps every row
+sits on its leaf in every tree.
+"""
+import json
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class FoldedScaler:
+    """Stands in for the StandardScaler of a compiled model, which is folded into its thresholds."""
+
+    def transform(self, X):
+        return X
+
+FOLDED_SCALER = FoldedScaler()
+
+
+class TreeEnsemble:
+    """A flattened binary-classification tree ensemble with a predict_proba() like scikit-learn's."""
+
+    def __init__(self, feature, threshold, left, right, value, default_left, roots, depth,
+                 kind, base_margin=0.0, n_features=None, source_version=None):
+        self.feature = feature              # int32 feature index per node (0 for leaves)
+        self.threshold = threshold          # float64 folded threshold, tested x < t (+inf for leaves)
+        self.left = left                    # int32 node index taken when the test holds
+        self.right = right                  # int32 node index otherwise
+        self.value = value                  # float64 leaf value (P(class 1) or a margin)
+        self.default_left = default_left    # bool: where a missing (NaN) value goes
+        self.roots = roots                  # int32 root node index per tree
+        self.depth = depth
+        self.kind = kind                    # 'mean' (forests) or 'logistic' (boosting)
+        self.base_margin = base_margin
+        self.n_features_in_ = n_features
+        self.source_version = source_version  # registry version of the artifacts compiled
+        # [right, left] per node, indexed by the outcome of the test
+        self._children = np.stack((right, left), axis=1)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                      self.value, self.default_left, self.roots, self._children))
+
+    def predict_proba(self, X):
+        """Returns: (n_rows, 2) array of [P(class 0), P(class 1)]"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        missing = np.isnan(flat).any()
+
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        for _ in range(self.depth):
+            x = flat[row_offset + self.feature[node]]
+            go_left = x < self.threshold[node]
+            if missing:
+                go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            node = self._children[node, go_left.astype(np.intp)]
+
+        leaves = self.value[node]
+        if self.kind == 'mean':
+            positive = leaves.mean(axis=1)
+        else:
+            positive = 1.0 / (1.0 + np.exp(-(self.base_margin + leaves.sum(axis=1))))
+        return np.column_stack((1.0 - positive, positive))
+
+    # --- Persistence ---
+
+    def save(self, path):
+        meta = {
+            'format': FORMAT_VERSION, 'depth': self.depth, 'kind': self.kind,
+            'base_margin': self.base_margin, 'n_features': self.n_features_in_,
+            'source_version': self.source_version
+        }
+        if not hasattr(path, 'write'):
+            with open(path, 'wb') as f:
+                return self.save(f)
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 value=self.value, default_left=self.default_left, roots=self.roots,
+                 meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, source):
+        """Load from a path or binary file object written by save()."""
+        with np.load(source, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('format') != FORMAT_VERSION:
+                raise ValueError(f"unsupported compiled model format {meta.get('format')!r}")
+            return cls(
+                data['feature'], data['threshold'], data['left'], data['right'], data['value'],
+                data['default_left'], data['roots'], meta['depth'], meta['kind'],
+                meta['base_margin'], meta['n_features'], meta['source_version']
+            )
+
+
+# --- Conversion ---
+
+def _float32_boundary(threshold, inclusive):
+    """
+    The float64 value b such that, for float64 v,
+        float32(v) <= threshold  <=>  v < b   (inclusive, scikit-learn)
+        float32(v) <  threshold  <=>  v < b   (exclusive, xgboost)
+    """
+    up = np.float32(np.inf)
+    t32 = np.float32(threshold)
+    if inclusive:
+        if t32 > threshold:
+            t32 = np.nextafter(t32, -up)
+        return (float(t32) + float(np.nextafter(t32, up))) / 2
+    if t32 < threshold:
+        t32 = np.nextafter(t32, up)
+    return (float(np.nextafter(t32, -up)) + float(t32)) / 2
+
+
+class _Builder:
+    """Accumulates the nodes of all trees into flat lists."""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.value, self.default_left, self.roots = [], [], []
+        self.depth = 0
+
+    def add_tree(self, nodes, depth):
+        """nodes: list of (feature or None for a leaf, threshold, left, right, value, default_left), local indices."""
+        offset = len(self.feature)
+        self.roots.append(offset)
+        self.depth = max(self.depth, depth)
+        for index, (feature, threshold, left, right, value, default_left) in enumerate(nodes):
+            if feature is None:
+                # Leaves loop back to themselves
+                self.feature.append(0)
+                self.threshold.append(np.inf)
+                self.left.append(offset + index)
+                self.right.append(offset + index)
+                self.default_left.append(True)
+            else:
+                self.feature.append(feature)
+                self.threshold.append(threshold)
+                self.left.append(offset + left)
+                self.right.append(offset + right)
+                self.default_left.append(default_left)
+            self.value.append(value)
+
+    def build(self, mean, scale, **kwargs):
+        feature = np.array(self.feature, dtype=np.int32)
+        threshold = np.array(self.threshold, dtype=np.float64)
+        split = np.isfinite(threshold)
+        threshold[split] = threshold[split] * scale[feature[split]] + mean[feature[split]]
+        return TreeEnsemble(
+            feature, threshold,
+            np.array(self.left, dtype=np.int32), np.array(self.right, dtype=np.int32),
+            np.array(self.value, dtype=np.float64), np.array(self.default_left, dtype=bool),
+            np.array(self.roots, dtype=np.int32), self.depth, **kwargs
+        )
+
+
+def _sklearn_trees(model, builder):
+    if len(model.classes_) != 2:
+        raise TypeError("only binary classifiers can be compiled")
+    for estimator in getattr(model, 'estimators_', [model]):
+        tree = estimator.tree_
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        # value holds class counts (or fractions): normalize to P(class 1) per node
+        counts = tree.value[:, 0, :]
+        positive = counts[:, 1] / counts.sum(axis=1)
+        nodes = []
+        for i in range(tree.node_count):
+            if tree.children_left[i] == -1:
+                nodes.append((None, None, None, None, float(positive[i]), True))
+            else:
+                nodes.append((int(tree.feature[i]), _float32_boundary(tree.threshold[i], True), int(tree.children_left[i]),
+                              int(tree.children_right[i]), 0.0,
+                              bool(missing_left[i]) if missing_left is not None else False))
+        builder.add_tree(nodes, int(tree.max_depth))
+    return {'kind': 'mean'}
+
+
+def _xgboost_trees(model, builder):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective != 'binary:logistic':
+        raise TypeError(f"only binary:logistic boosters can be compiled, not {objective}")
+    base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    names = booster.feature_names
+
+    for dump in booster.get_dump(dump_format='json'):
+        tree = json.loads(dump)
+        flat = {}
+        depth = 0
+        stack = [(tree, 0)]
+        while stack:
+            node, level = stack.pop()
+            flat[node['nodeid']] = node
+            depth = max(depth, level)
+            stack.extend((child, level + 1) for child in node.get('children', ()))
+        # Renumber densely in nodeid order
+        index = {nodeid: i for i, nodeid in enumerate(sorted(flat))}
+        nodes = []
+        for nodeid in sorted(flat):
+            node = flat[nodeid]
+            if 'leaf' in node:
+                nodes.append((None, None, None, None, float(node['leaf']), True))
+            else:
+                split = node['split']
+                feature = names.index(split) if names and split in names else int(str(split).lstrip('f'))
+                nodes.append((feature, _float32_boundary(node['split_condition'], False), index[node['yes']], index[node['no']],
+                              0.0, node['missing'] == node['yes']))
+        builder.add_tree(nodes, depth)
+    return {'kind': 'logistic', 'base_margin': float(np.log(base_score / (1 - base_score)))}
+
+
+def compile_model(model, scaler=None, source_version=None):
+    """
+    Flatten a fitted model (and the scaler applied before it) into a TreeEnsemble.
+    Raises: TypeError for unsupported model types
+    """
+    builder = _Builder()
+    if hasattr(model, 'get_booster') or type(model).__name__ == 'Booster':
+        params = _xgboost_trees(model, builder)
+    elif hasattr(model, 'tree_') or hasattr(model, 'estimators_'):
+        if not hasattr(model, 'predict_proba') or type(model).__name__.startswith('GradientBoosting'):
+            raise TypeError(f"cannot compile {type(model).__name__}")
+        params = _sklearn_trees(model, builder)
+    else:
+        raise TypeError(f"cannot compile {type(model).__name__}")
+
+    n_features = int(getattr(scaler, 'n_features_in_', None) or getattr(model, 'n_features_in_', None)
+                     or max(builder.feature, default=0) + 1)
+    scale = getattr(scaler, 'scale_', None)
+    mean = getattr(scaler, 'mean_', None)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    return builder.build(mean, scale, n_features=n_features, source_version=source_version, **params)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The API is imported as the `api` package from src/, as uvicorn's --app-dir does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# No data directory, model warm-up or background workers during tests
+os.environ.setdefault("PATIENT_DATA_DIR", "")
+os.environ.setdefault("MODEL_WARMUP", "0")
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+os.environ.setdefault("SHADOW_MODEL_DIR", "")
+os.environ.setdefault("FEEDBACK_TRAIN_INTERVAL", "0")
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api import asgi, endpoints
+from api.admission import Budget, Overloaded, Slot, request_timeout
+
+
+def test_rejects_when_queue_is_full():
+    budget = Budget('test', limit=1, queue_size=0, deadline=1)
+    with Slot(budget):
+        with pytest.raises(Overloaded) as error:
+            budget.acquire()
+    assert error.value.retry_after >= 1
+    assert budget.stats()['rejected_queue_full'] == 1
+    assert budget.active == 0
+
+
+def test_rejects_after_deadline():
+    budget = Budget('test', limit=1, queue_size=1, deadline=0.05)
+    with Slot(budget):
+        with pytest.raises(Overloaded, match="deadline"):
+            budget.acquire()
+    assert budget.stats()['rejected_deadline'] == 1
+    assert budget.stats()['queued'] == 0
+
+
+def test_freed_slot_goes_to_the_oldest_waiter():
+    budget = Budget('test', limit=1, queue_size=2, deadline=5)
+    order = []
+    budget.acquire()
+
+    def wait(name):
+        with Slot(budget):
+            order.append(name)
+
+    threads = []
+    for name in ('first', 'second'):
+        threads.append(threading.Thread(target=wait, args=(name,)))
+        threads[-1].start()
+        while budget.stats()['queued'] < len(threads):
+            time.sleep(0.001)
+    budget.release()
+    for thread in threads:
+        thread.join()
+    assert order == ['first', 'second']
+    assert budget.active == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    budget = Budget('test', limit=1, queue_size=1, deadline=5)
+
+    async def scenario():
+        budget.acquire()
+        waiter = asyncio.ensure_future(budget.acquire_async())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        budget.release()
+
+    asyncio.run(scenario())
+    assert (budget.active, budget.stats()['queued']) == (0, 0)
+
+
+def test_request_timeout_only_shortens_the_deadline():
+    assert request_timeout({'X-Request-Timeout': '0.5'}, 2) == 0.5
+    assert request_timeout({'X-Request-Timeout': '60'}, 2) == 2
+    assert request_timeout({'X-Request-Timeout': 'soon'}, 2) == 2
+
+
+async def call(path, query=b''):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': []}
+    await asgi.app(scope, receive, send)
+    return messages[0]['status']
+
+
+def test_queued_read_does_not_block_the_event_loop():
+    budget = endpoints.READ_BUDGET
+    for _ in range(budget.limit):
+        budget.acquire()
+
+    async def scenario():
+        queued = asyncio.ensure_future(call('/api/drugs', b'prefix=a'))
+        await asyncio.sleep(0.05)
+        assert budget.stats()['queued'] == 1 and not queued.done()
+        # The loop keeps serving other requests meanwhile
+        assert await asyncio.wait_for(call('/health'), 1) == 200
+        budget.release()
+        return await asyncio.wait_for(queued, 5)
+
+    try:
+        assert asyncio.run(scenario()) == 200
+    finally:
+        for _ in range(budget.active):
+            budget.release()
+    assert budget.active == 0
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import threading
+
+from api import asgi, endpoints
+
+
+async def call(method, path, body=b''):
+    messages = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {'type': 'http.disconnect'}
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')]}
+    await asgi.app(scope, receive, send)
+    return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+
+def test_predictions_are_stored_off_the_event_loop(monkeypatch):
+    stored_on = []
+
+    async def fake_infer(params):
+        return {'detection_mode': 'auto', 'detected_diseases': []}
+
+    def fake_store(params, result):
+        stored_on.append(threading.current_thread())
+        return {'stored': True}, 200
+
+    monkeypatch.setattr(asgi, '_infer', fake_infer)
+    monkeypatch.setattr(endpoints, 'store_prediction', fake_store)
+
+    async def scenario():
+        loop_thread = threading.current_thread()
+        single = await call('POST', '/predict', json.dumps({'symptoms': 'thirsty'}).encode())
+        batch = await call('POST', '/predict/batch', json.dumps([{'symptoms': 'a'}, {'symptoms': 'b'}]).encode())
+        return loop_thread, single, batch
+
+    loop_thread, single, batch = asyncio.run(scenario())
+    assert single[0] == 200 and batch[0] == 200
+    assert len(stored_on) == 3
+    assert all(thread is not loop_thread for thread in stored_on)
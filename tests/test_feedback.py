@@ -0,0 +1,70 @@
+import json
+import threading
+
+import pytest
+
+from api import endpoints
+from api.endpoints import ApiError, ApiRequest
+from api.feedback import FeedbackTrainer, OutcomeLog
+from api.records import PatientRecord
+
+
+def test_run_async_claims_the_run_under_the_lock(monkeypatch):
+    trainer = FeedbackTrainer(OutcomeLog(), watcher=None)
+    release = threading.Event()
+    calls = []
+
+    def train(disease_type):
+        calls.append(disease_type)
+        release.wait(5)
+        return {'status': 'skipped'}
+
+    monkeypatch.setattr(trainer, 'train', train)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(trainer.run_async())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
+    assert trainer.running
+    assert trainer.run_once() == {}  # Already running
+    release.set()
+    while trainer.running:
+        threading.Event().wait(0.01)
+    assert len(calls) == len(set(calls))  # One pass over the diseases
+
+
+@pytest.fixture
+def patient():
+    record = PatientRecord(
+        patient_id="P9001", patient_info={'name': 'Outcome Test'}, symptoms='thirsty',
+        health_data={'Glucose': 150, 'BMI': 31, 'Age': 50}, primary_diagnosis='Diabetes', overall_risk=0.8,
+        report={'detection_mode': 'auto', 'detected_diseases': []}, created_at=1_700_000_000
+    )
+    endpoints.PATIENTS_DB.add(record)
+    yield record.patient_id
+    endpoints.PATIENTS_DB.delete(record.patient_id)
+    endpoints.OUTCOMES.forget(record.patient_id)
+
+
+def confirm(patient_id, body):
+    req = ApiRequest('POST', {}, {}, json.dumps(body).encode(), 'application/json')
+    return endpoints.confirm_outcome(req, patient_id)
+
+
+@pytest.mark.parametrize("body", [
+    [{'disease_type': 'diabetes', 'outcome': 1}],
+    {'disease_type': 'diabetes', 'outcome': 1, 'visit': 0},
+    {'disease_type': 'diabetes', 'outcome': 1, 'visit': 2},
+    {'disease_type': 'diabetes', 'outcome': 1, 'visit': True},
+])
+def test_confirm_outcome_rejects_bad_bodies(patient, body):
+    with pytest.raises(ApiError) as error:
+        confirm(patient, body)
+    assert error.value.status == 400
+
+
+def test_confirm_outcome_defaults_to_the_latest_visit(patient):
+    payload, status = confirm(patient, {'disease_type': 'diabetes', 'outcome': 1})
+    assert status == 200 and payload['visit'] == 1
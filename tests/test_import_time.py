@@ -0,0 +1,65 @@
+"""
+Cold-start checks: each module is imported in a fresh interpreter, must
+stay under its budget (best of REPEAT runs), must not load heavy modules,
+and must not start threads or touch the patient data directory.
+
+Budgets (ms) can be raised on slow machines with IMPORT_BUDGET_<TARGET>_MS,
+e.g. IMPORT_BUDGET_API_MAIN_MS=1500.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = 3
+
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'xgboost', 'joblib', 'scipy')
+API_HEAVY_MODULES = ('sklearn', 'xgboost', 'joblib', 'scipy', 'pandas')
+
+# target -> (budget in ms, heavy modules it must not import)
+TARGETS = {
+    'ml.keywords': (50, HEAVY_MODULES),
+    'ml.predict': (100, HEAVY_MODULES),
+    'api.endpoints': (500, API_HEAVY_MODULES),
+    'api.asgi': (500, API_HEAVY_MODULES),
+    'api.main': (500, API_HEAVY_MODULES),
+}
+
+PROBE = """
+import json, os, sys, threading, time
+start = time.perf_counter()
+import {target}
+print(json.dumps({{
+    'ms': (time.perf_counter() - start) * 1000,
+    'modules': sorted(sys.modules),
+    'threads': [thread.name for thread in threading.enumerate()],
+    'data_dir_created': os.path.exists(os.environ['PATIENT_DATA_DIR']),
+}}))
+"""
+
+
+def probe(target, data_dir):
+    # The service's defaults (warm-up, model watch, ...) stay on: importing must not start them
+    env = {k: v for k, v in os.environ.items()
+           if k not in ('MODEL_WARMUP', 'MODEL_WATCH_INTERVAL', 'SHADOW_MODEL_DIR', 'FEEDBACK_TRAIN_INTERVAL')}
+    env.update(PYTHONPATH=os.path.join(ROOT, 'src'), PATIENT_DATA_DIR=data_dir, PYTHONWARNINGS='ignore')
+    result = subprocess.run([sys.executable, '-c', PROBE.format(target=target)],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("target", list(TARGETS))
+def test_cold_import(target, tmp_path):
+    default_budget, heavy = TARGETS[target]
+    budget = float(os.environ.get(f"IMPORT_BUDGET_{target.upper().replace('.', '_')}_MS", default_budget))
+    runs = [probe(target, str(tmp_path / f"patients-{i}")) for i in range(REPEAT)]
+    best = min(runs, key=lambda run: run['ms'])
+
+    assert best['ms'] <= budget, f"{target} took {best['ms']:.0f} ms (budget {budget:.0f} ms)"
+    assert [m for m in heavy if m in best['modules']] == []
+    assert best['threads'] == ['MainThread']
+    assert not best['data_dir_created']
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from api.importer import import_records, iter_items, parse_record
+from api.store import PatientStore
+from api.vitals import VitalsStore, build_vitals_store
+
+
+def run_import(data, store=None, on_batch=None, batch_size=2):
+    store = store if store is not None else PatientStore()
+    counter = iter(range(1, 1000))
+    report = import_records(iter_items(io.BytesIO(data)), store, lambda record: f"P{next(counter):04d}",
+                            on_batch=on_batch, batch_size=batch_size)
+    return store, report
+
+
+def test_imports_jsonl_and_array():
+    lines = b'{"name": "Ann", "age": 40, "overall_risk": 0.2}\n\n{"name": "Bob", "overall_risk": 0.5}\n'
+    store, report = run_import(lines)
+    assert (report['imported'], report['failed']) == (2, 0)
+    assert sorted(store.get(pid).name for pid in ("P0001", "P0002")) == ["Ann", "Bob"]
+
+    store, report = run_import(b'[{"patient_id": "X1", "name": "Cy"}, {"patient_id": "X2", "name": "Di"}]')
+    assert report['imported'] == 2
+    assert store.get("X2").name == "Di"
+
+
+@pytest.mark.parametrize("vitals, message", [
+    ({"timestamps": ["2024-01-01", "not a date"], "glucose": [90, 95]}, "invalid vitals timestamp"),
+    ({"timestamps": ["2024-01-01", "2024-01-02"], "glucose": [90]}, "as long as timestamps"),
+    ({"timestamps": ["2024-01-01"], "glucose": ["high"]}, "numbers or nulls"),
+    ({"timestamps": [1e20]}, "invalid vitals timestamp"),
+    ({"glucose": [90]}, "timestamps list"),
+])
+def test_rejects_malformed_vitals(vitals, message):
+    with pytest.raises(ValueError, match=message):
+        parse_record({"name": "Ann", "vitals": vitals})
+
+
+def test_bad_vitals_are_item_errors():
+    data = (b'{"name": "Ann", "vitals": {"timestamps": ["2024-01-01"], "glucose": [90]}}\n'
+            b'{"name": "Bob", "vitals": {"timestamps": ["2024-01-01"], "glucose": "high"}}\n')
+    store, report = run_import(data)
+    assert (report['imported'], report['failed']) == (1, 1)
+    assert report['errors'][0]['index'] == 1
+
+
+def test_parse_error_stops_the_import_and_keeps_earlier_records():
+    store, report = run_import(b'{"name": "Ann"}\n{"name": \n{"name": "Bob"}\n')
+    assert report['imported'] == 1
+    assert report['errors'] == [{'index': 1, 'error': report['errors'][0]['error']}]
+    assert report['errors'][0]['error'].startswith("parse error")
+
+
+def test_index_failure_is_not_reported_as_parse_error():
+    def on_batch(entries, replaced):
+        raise ValueError("index broke")
+
+    store = PatientStore()
+    with pytest.raises(ValueError, match="index broke"):
+        run_import(b'{"name": "Ann"}\n{"name": "Bob"}\n', store=store, on_batch=on_batch)
+    # The batch was committed before the hook ran
+    assert len(store) == 2
+
+
+def test_vitals_store_skips_bad_readings(tmp_path):
+    store = VitalsStore()
+    store.extend_many([
+        ("P1", {"timestamps": ["2024-01-01", "garbage", "2024-01-03"], "glucose": [90, 91, "x"]}),
+        ("P2", "not a dict"),
+        ("P3", {"timestamps": [None, 1e20]}),
+    ])
+    snapshot = store.range("P1")
+    assert len(snapshot['timestamps']) == 1  # the third reading has no usable metric left
+    assert "P2" not in store and "P3" not in store
+
+    seed = tmp_path / "seed.json"
+    seed.write_text('[{"patient_id": "S1", "vitals": {"timestamps": ["bad"], "bmi": [22]}},'
+                    ' {"patient_id": "S2", "vitals": {"timestamps": ["2024-01-01"], "bmi": [22]}}, 7]')
+    assert "S2" in build_vitals_store(seed_path=str(seed))
@@ -0,0 +1,18 @@
+import gc
+
+from api.memory import gc_counts
+
+
+def test_frozen_objects_are_counted():
+    gc.collect()
+    before = gc_counts()
+    survivors = [[i] for i in range(1000)]  # Tracked containers
+    gc.freeze()
+    try:
+        after = gc_counts()
+        assert after['frozen_objects'] >= before['frozen_objects'] + len(survivors)
+        assert after['tracked_objects'] == after['collectable_objects'] + after['frozen_objects']
+        # Freezing moves objects out of the collector's view without making them disappear
+        assert after['tracked_objects'] >= before['tracked_objects'] + len(survivors)
+    finally:
+        gc.unfreeze()
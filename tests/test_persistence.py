@@ -0,0 +1,113 @@
+import glob
+import os
+
+import pytest
+
+from api.ids import IdAllocator
+from api.persistence import DataDirectoryLocked, PatientJournal
+from api.records import PatientRecord
+from api.store import PatientStore
+
+
+def make_record(patient_id, risk=0.3, created_at=1_700_000_000):
+    return PatientRecord(
+        patient_id=patient_id,
+        patient_info={'name': f"Patient {patient_id}", 'age': 40, 'gender': 'Female', 'phone': ''},
+        symptoms='thirsty', health_data={'Glucose': 120}, primary_diagnosis='Diabetes',
+        overall_risk=risk, report={'detection_mode': 'auto', 'detected_diseases': []}, created_at=created_at
+    )
+
+
+def open_store(directory):
+    store = PatientStore(PatientJournal(str(directory)))
+    high_water = store.open()
+    return store, high_water
+
+
+def test_recovers_puts_merges_and_deletes(tmp_path):
+    store, _ = open_store(tmp_path)
+    store.add(make_record("P1001"))
+    store.add_many([make_record("P1002"), make_record("P1003")])
+    store.merge_add(make_record("P1001", risk=0.8, created_at=1_700_100_000))
+    store.delete("P1002")
+    store.close()
+
+    store, high_water = open_store(tmp_path)
+    try:
+        assert sorted(record.patient_id for record in store) == ["P1001", "P1003"]
+        assert store.get("P1001").overall_risk == 0.8
+        assert len(store.get("P1001").history) == 1
+        assert high_water == 1003
+    finally:
+        store.close()
+
+
+def test_recovers_from_snapshot_plus_log_tail(tmp_path):
+    store, _ = open_store(tmp_path)
+    for number in range(1001, 1011):
+        store.add(make_record(f"P{number}"))
+    store.journal.snapshot()
+    store.delete("P1010")   # Deleted after the snapshot: the highest ID is gone from both
+    store.add(make_record("P1011"))
+    store.delete("P1011")
+    store.close()
+    assert len(glob.glob(os.path.join(tmp_path, "snapshot-*.jsonl"))) == 1
+
+    store, high_water = open_store(tmp_path)
+    try:
+        assert len(store) == 9 and store.get("P1010") is None
+        assert high_water == 1011
+    finally:
+        store.close()
+
+
+def test_ignores_a_torn_log_tail(tmp_path):
+    store, _ = open_store(tmp_path)
+    store.add(make_record("P1001"))
+    store.close()
+    log = sorted(glob.glob(os.path.join(tmp_path, "wal-*.log")))[-1]
+    with open(log, "ab") as f:
+        f.write(b'{"op": "put", "id": "P1002", "sta')
+
+    store, _ = open_store(tmp_path)
+    try:
+        assert [record.patient_id for record in store] == ["P1001"]
+    finally:
+        store.close()
+
+
+def test_allocator_continues_above_every_journaled_id(tmp_path):
+    store, high_water = open_store(tmp_path)
+    allocator = IdAllocator(floor=max(1000, high_water))
+    ids = [allocator.allocate() for _ in range(5)]
+    for patient_id in ids:
+        store.add(make_record(patient_id))
+    store.delete(ids[-1])
+    store.close()
+
+    store, high_water = open_store(tmp_path)
+    store.close()
+    allocator = IdAllocator(floor=max(1000, high_water))
+    assert allocator.allocate() == "P1006"
+    allocator.advance(2000)
+    assert allocator.allocate() == "P2001"
+    allocator.advance(1500)  # Never moves backwards
+    assert allocator.allocate() == "P2002"
+
+
+def test_data_directory_has_one_owner(tmp_path):
+    journal = PatientJournal(str(tmp_path))
+    journal.recover()
+    try:
+        with pytest.raises(DataDirectoryLocked):
+            PatientJournal(str(tmp_path)).recover()
+    finally:
+        journal.close()
+    journal = PatientJournal(str(tmp_path))
+    journal.recover()  # Released on close
+    journal.close()
+
+
+def test_creating_a_journal_touches_nothing(tmp_path):
+    PatientJournal(str(tmp_path / "patients"))
+    assert not (tmp_path / "patients").exists()
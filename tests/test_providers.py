@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from api import endpoints
+from api.endpoints import ApiError, ApiRequest
+from api.providers import MAX_RINGS, GRID_CELL_DEG, ProviderDirectory, haversine_km
+
+
+@pytest.fixture(scope="module")
+def providers():
+    rng = random.Random(3)
+    return [{'id': i, 'kind': 'specialist', 'specialty': rng.choice(['Cardiologist', 'Oncologist']),
+             'name': f"Dr. {i}", 'lat': 22.5 + rng.gauss(0, 0.3), 'lon': 88.3 + rng.gauss(0, 0.3)}
+            for i in range(3000)]
+
+
+def brute_force(providers, lat, lon, limit, specialty=None):
+    matching = [p for p in providers if specialty is None or p['specialty'] == specialty]
+    return [p['id'] for p in sorted(matching, key=lambda p: haversine_km(lat, lon, p['lat'], p['lon']))[:limit]]
+
+
+@pytest.mark.parametrize("lat, lon", [
+    (22.5, 88.3),                              # inside the data
+    (22.5 + MAX_RINGS * GRID_CELL_DEG, 88.3),  # near the ring cap
+    (-40.0, -70.0),                            # far away: full-scan fallback
+    (89.9, 179.9),
+])
+def test_nearest_matches_brute_force(providers, lat, lon):
+    directory = ProviderDirectory(providers)
+    assert [p['id'] for p in directory.search(lat=lat, lon=lon)] == brute_force(providers, lat, lon, 10)
+    got = [p['id'] for p in directory.search(specialty='Oncologist', lat=lat, lon=lon, limit=25)]
+    assert got == brute_force(providers, lat, lon, 25, 'Oncologist')
+
+
+def search(**args):
+    return endpoints.search_providers(ApiRequest('GET', args, {}, b'', None))
+
+
+@pytest.mark.parametrize("args", [
+    {'lat': 'nan', 'lon': '0'}, {'lat': '0', 'lon': 'inf'}, {'lat': '90.5', 'lon': '0'},
+    {'lat': '0', 'lon': '-180.01'}, {'lat': 'north', 'lon': '0'},
+])
+def test_search_rejects_bad_coordinates(args):
+    with pytest.raises(ApiError) as error:
+        search(**args)
+    assert error.value.status == 400
+
+
+def test_search_accepts_edge_coordinates():
+    payload, status = search(lat='-90', lon='180', limit='3')
+    assert status == 200 and payload['count'] == 3
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from api.records import PatientRecord
+from api.rollups import build_rollups, record_visits
+
+DAY = datetime(2024, 3, 5, 10, 30).timestamp()
+
+
+def make_record(patient_id, risk, diagnosis, created_at=DAY):
+    return PatientRecord(
+        patient_id=patient_id, patient_info={'name': patient_id}, symptoms='', health_data={},
+        primary_diagnosis=diagnosis, overall_risk=risk, report={'detected_diseases': []}, created_at=created_at
+    )
+
+
+def day_point(rollups):
+    return rollups.series('day', DAY, DAY)[0]
+
+
+def assert_consistent(point):
+    bands = point['high_risk'] + point['moderate_risk'] + point['low_risk']
+    assert point['assessments'] == bands == sum(point['diagnoses'].values())
+    assert min(point['assessments'], point['high_risk'], point['moderate_risk'], point['low_risk']) >= 0
+    assert all(count > 0 for count in point['diagnoses'].values())
+
+
+def test_incremental_counts_match_a_rebuild():
+    records = [make_record("P1", 0.9, "Diabetes"), make_record("P2", 0.5, "Asthma"), make_record("P3", 0.2, "Diabetes")]
+    rollups = build_rollups(records[:1])
+    rollups.add(record_visits(records[1]))
+    rollups.add(record_visits(records[2]))
+    rollups.remove(record_visits(records[0]))
+    assert rollups.series('hour', DAY, DAY) == build_rollups(records[1:]).series('hour', DAY, DAY)
+    assert day_point(rollups) == day_point(build_rollups(records[1:]))
+
+
+def test_remove_after_rebuild_never_goes_negative():
+    counted = make_record("P1", 0.9, "Diabetes")
+    written_before_rebuild = make_record("P2", 0.2, "Asthma")
+    rollups = build_rollups([counted])
+
+    # Not counted by the rebuild: removing it must leave the bucket alone
+    rollups.remove(record_visits(written_before_rebuild))
+    point = day_point(rollups)
+    assert (point['assessments'], point['high_risk'], point['low_risk']) == (1, 1, 0)
+    assert point['diagnoses'] == {'Diabetes': 1}
+
+    rollups.remove(record_visits(counted))
+    rollups.remove(record_visits(counted))  # Twice: the second is a no-op
+    point = day_point(rollups)
+    assert point['assessments'] == 0 and point['diagnoses'] == {}
+    assert_consistent(point)
+
+
+def test_mismatched_remove_keeps_bands_and_diagnoses_consistent():
+    rollups = build_rollups([make_record("P1", 0.9, "Diabetes"), make_record("P2", 0.2, "Asthma")])
+    rollups.remove([(DAY, 0.9, "Asthma"), (DAY, 0.5, "Diabetes"), (DAY, 0.2, "Cancer")])
+    assert_consistent(day_point(rollups))
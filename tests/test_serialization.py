@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from api import serialization
+from api.serialization import decode_body, encode_body
+
+PAYLOAD = {'z': 1, 'a': {'y': [1, 2], 'b': None}, 3: 'int key', 'scores': np.array([0.5, 1.5])}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+
+def test_json_responses_sort_keys_and_stringify_int_keys(encoder):
+    body, mimetype, _ = encode_body(PAYLOAD)
+    assert mimetype == 'application/json'
+    assert body == b'{"3":"int key","a":{"b":null,"y":[1,2]},"scores":[0.5,1.5],"z":1}'
+
+
+def test_encoders_agree_with_flask_jsonify_order(encoder):
+    payload = {'b': [{'d': 1, 'c': 2}], 'a': 'é'}
+    body, _, _ = encode_body(payload)
+    assert list(json.loads(body)) == ['a', 'b']
+    assert json.loads(body) == json.loads(json.dumps(payload, sort_keys=True))
+
+
+def test_msgpack_roundtrip():
+    if serialization.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    body, mimetype, _ = encode_body({'a': 1}, accept='application/msgpack')
+    assert decode_body(body, mimetype) == {'a': 1}
+
+
+def test_large_bodies_are_compressed():
+    body, _, headers = encode_body({'data': 'x' * 10000}, accept_encoding='gzip')
+    assert headers['Content-Encoding'] == 'gzip'